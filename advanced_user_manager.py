@@ -4,18 +4,17 @@
 Gestionnaire d'utilisateurs avancé avec système d'approbation et licences personnalisées
 """
 
-import json
-import os
 import hashlib
 from datetime import datetime, timedelta
 from typing import Dict, Tuple, Optional
+from licence_cache import get_licence_cache, licence_now
 
 class AdvancedUserManager:
     """Gestionnaire avancé avec approbation admin et licences personnalisées"""
     
     def __init__(self, users_file='users.json'):
         self.users_file = users_file
-        self.users = self.load_users()
+        self.licence_cache = get_licence_cache(users_file)
         self.plans = {
             "trial": {"duration_hours": 24, "price": "Gratuit", "max_redirections": 1},
             "semaine": {"duration_days": 7, "price": "1000f", "max_redirections": 10},
@@ -68,26 +67,19 @@ class AdvancedUserManager:
             )
         }
     
+    @property
+    def users(self) -> Dict:
+        """Utilisateurs partagés via le cache de licences"""
+        return self.licence_cache.users
+    
     def load_users(self) -> Dict:
-        """Charge les utilisateurs depuis le fichier JSON"""
-        try:
-            if os.path.exists(self.users_file):
-                with open(self.users_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            print(f"Erreur lecture utilisateurs: {e}")
-            return {}
+        """Recharge les utilisateurs depuis le fichier JSON"""
+        self.licence_cache.reload()
+        return self.users
     
-    def save_users(self) -> bool:
+    def save_users(self, *user_ids: str) -> bool:
         """Sauvegarde les utilisateurs"""
-        try:
-            with open(self.users_file, 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, indent=2, ensure_ascii=False)
-            return True
-        except Exception as e:
-            print(f"Erreur sauvegarde utilisateurs: {e}")
-            return False
+        return self.licence_cache.save(*user_ids)
     
     def generate_personal_license(self, user_id: str) -> str:
         """Génère une licence personnalisée : user_id + moitié_id + date + 7 + 23 + 90"""
@@ -125,7 +117,7 @@ class AdvancedUserManager:
         }
         
         self.users[str(user_id)] = user_data
-        self.save_users()
+        self.save_users(str(user_id))
         return user_data
     
     def approve_trial(self, user_id: str) -> Tuple[bool, str]:
@@ -137,7 +129,7 @@ class AdvancedUserManager:
         if user_data["status"] != "pending_approval":
             return False, "Utilisateur déjà traité"
         
-        now = datetime.now()
+        now = licence_now()
         expires = now + timedelta(hours=24)
         
         # Mettre à jour les données utilisateur
@@ -150,8 +142,8 @@ class AdvancedUserManager:
             "approved_at": now.isoformat()
         })
         
-        self.save_users()
-        return True, expires.strftime("%d/%m/%Y à %H:%M")
+        self.save_users(str(user_id))
+        return True, expires.strftime("%d/%m/%Y à %H:%M UTC")
     
     def request_payment(self, user_id: str, plan: str) -> Tuple[bool, str]:
         """Enregistre une demande de paiement"""
@@ -174,7 +166,7 @@ class AdvancedUserManager:
             self.users[str(user_id)]["payment_requests"] = []
         
         self.users[str(user_id)]["payment_requests"].append(payment_request)
-        self.save_users()
+        self.save_users(str(user_id))
         
         return True, self.plans[plan]["price"]
     
@@ -187,7 +179,7 @@ class AdvancedUserManager:
         if not user_data:
             return False, "Utilisateur non trouvé"
         
-        now = datetime.now()
+        now = licence_now()
         duration_days = self.plans[plan]["duration_days"]
         expires = now + timedelta(days=duration_days)
         
@@ -214,7 +206,7 @@ class AdvancedUserManager:
                     request["approved_at"] = now.isoformat()
                     break
         
-        self.save_users()
+        self.save_users(str(user_id))
         return True, license_key
     
     def validate_license(self, user_id: str, provided_license: str) -> bool:
@@ -236,7 +228,7 @@ class AdvancedUserManager:
             "activated_at": datetime.now().isoformat()
         })
         
-        self.save_users()
+        self.save_users(str(user_id))
         return True
     
     def check_user_access(self, user_id: str) -> bool:
@@ -248,14 +240,11 @@ class AdvancedUserManager:
         if user_data["status"] not in ["trial", "active"]:
             return False
         
-        if not user_data.get("expires"):
+        expires_date = self.licence_cache.expiry(user_id)
+        if expires_date is None:
             return False
         
-        try:
-            expires_date = datetime.fromisoformat(user_data["expires"])
-            return expires_date > datetime.now()
-        except:
-            return False
+        return expires_date > licence_now()
     
     def get_user_max_redirections(self, user_id: str) -> int:
         """Retourne le nombre maximum de redirections pour un utilisateur"""
@@ -283,7 +272,7 @@ class AdvancedUserManager:
         
         current = self.users[str(user_id)].get("current_redirections", 0)
         self.users[str(user_id)]["current_redirections"] = current + 1
-        self.save_users()
+        self.save_users(str(user_id))
         return True
     
     def remove_redirection(self, user_id: str) -> bool:
@@ -295,7 +284,7 @@ class AdvancedUserManager:
         current = user_data.get("current_redirections", 0)
         if current > 0:
             self.users[str(user_id)]["current_redirections"] = current - 1
-            self.save_users()
+            self.save_users(str(user_id))
             return True
         
         return False
@@ -329,49 +318,31 @@ class AdvancedUserManager:
     
     def get_pending_approvals(self) -> Dict:
         """Retourne les utilisateurs en attente d'approbation"""
-        pending = {}
-        for user_id, data in self.users.items():
-            if data["status"] == "pending_approval":
-                pending[user_id] = data
-        return pending
+        return {
+            user_id: self.users[user_id]
+            for user_id in self.licence_cache.user_ids("pending_approval")
+        }
     
     def get_pending_payments(self) -> Dict:
         """Retourne les demandes de paiement en attente"""
         pending = {}
-        for user_id, data in self.users.items():
-            if "payment_requests" in data:
-                for request in data["payment_requests"]:
-                    if request["status"] == "pending":
-                        if user_id not in pending:
-                            pending[user_id] = []
-                        pending[user_id].append(request)
+        for user_id in self.licence_cache.pending_payment_users():
+            pending[user_id] = [
+                request for request in self.users[user_id]["payment_requests"]
+                if request["status"] == "pending"
+            ]
         return pending
     
     def get_stats(self) -> Dict:
-        """Statistiques détaillées"""
-        stats = {
+        """Statistiques détaillées (lues dans l'index du cache de licences)"""
+        cache = self.licence_cache
+        cache.expire_due()
+        
+        return {
             "total_users": len(self.users),
-            "pending_approval": 0,
-            "trial_users": 0,
-            "active_users": 0,
-            "expired_users": 0,
-            "payment_requests": 0
+            "pending_approval": cache.count("pending_approval"),
+            "trial_users": cache.count("trial", valid=True),
+            "active_users": cache.count("active", valid=True),
+            "expired_users": cache.count("trial", valid=False) + cache.count("active", valid=False),
+            "payment_requests": sum(cache.pending_payment_users().values())
         }
-        
-        for user_id, data in self.users.items():
-            status = self.get_user_status(user_id)
-            
-            if status == "en_attente":
-                stats["pending_approval"] += 1
-            elif status == "essai_actif":
-                stats["trial_users"] += 1
-            elif status == "actif":
-                stats["active_users"] += 1
-            elif status in ["essai_expiré", "expiré"]:
-                stats["expired_users"] += 1
-            
-            # Compter les demandes de paiement
-            if "payment_requests" in data:
-                stats["payment_requests"] += len([r for r in data["payment_requests"] if r["status"] == "pending"])
-        
-        return stats
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Regroupement des albums Telegram : les parties d'un même grouped_id arrivent
+en plusieurs NewMessage et sont traitées ensemble, une fois l'album complet
+"""
+
+import time
+import asyncio
+
+# Un album Telegram compte au plus 10 médias
+MAX_ALBUM_SIZE = 10
+
+
+class PendingAlbum:
+    """Parties reçues d'un album en cours de collecte"""
+
+    __slots__ = ('events', 'received_at', 'last_at', 'task')
+
+    def __init__(self, received_at):
+        self.events = []
+        self.received_at = received_at
+        self.last_at = received_at
+        self.task = None
+
+
+class AlbumCollector:
+    """Collecte les parties d'albums, par (chat, grouped_id)
+
+    Un album est transmis à on_album(events, received_at) window secondes
+    après sa dernière partie reçue (ou dès sa 10e partie), les parties triées
+    par id. received_at est l'instant de réception de la première partie.
+    """
+
+    def __init__(self, window, on_album):
+        self.window = window
+        self.on_album = on_album
+        self._albums = {}
+        self.stats = {
+            'albums': 0,
+            'parts': 0
+        }
+
+    def add(self, event, received_at=None):
+        """Ajoute une partie d'album ; l'envoi est déclenché par la fin de la fenêtre"""
+        now = received_at if received_at is not None else time.monotonic()
+        key = (event.chat_id, event.grouped_id)
+        album = self._albums.get(key)
+        if album is None:
+            album = self._albums[key] = PendingAlbum(now)
+            album.task = asyncio.ensure_future(self._collect(key, album))
+        album.events.append(event)
+        album.last_at = now
+        self.stats['parts'] += 1
+        if len(album.events) >= MAX_ALBUM_SIZE:
+            album.task.cancel()
+            album.task = asyncio.ensure_future(self._dispatch(key))
+
+    async def _collect(self, key, album):
+        while True:
+            delay = album.last_at + self.window - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        await self._dispatch(key)
+
+    async def _dispatch(self, key):
+        album = self._albums.pop(key, None)
+        if album is None:
+            return
+        self.stats['albums'] += 1
+        events = sorted(album.events, key=lambda event: event.id)
+        try:
+            await self.on_album(events, album.received_at)
+        except Exception as e:
+            print(f"❌ Erreur traitement album {key[1]} de {key[0]}: {e}")
+
+    async def flush(self):
+        """Transmet immédiatement les albums en cours de collecte (arrêt du bot)"""
+        for key, album in list(self._albums.items()):
+            if album.task is not None:
+                album.task.cancel()
+            await self._dispatch(key)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['pending'] = len(self._albums)
+        return stats
+
+    def __len__(self):
+        return len(self._albums)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark des envois différés TeleFeed
+Compare, pour N envois en attente, une tâche asyncio endormie par message
+(asyncio.sleep puis envoi) au tas unique de DelayedDispatcher (une seule
+tâche, échéances journalisées) : temps de programmation, mémoire et tâches
+
+Usage : python benchmarks/bench_delayed.py [envois] [délai_s]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delayed_dispatch import DelayedDispatcher
+
+SOURCE_CHAT = -1001000000001
+
+
+class FakeEvent:
+    """Message source minimal"""
+
+    __slots__ = ('chat_id', 'id')
+
+    def __init__(self, chat_id, msg_id):
+        self.chat_id = chat_id
+        self.id = msg_id
+
+
+async def run_tasks(events, delay, on_due):
+    """Historique naïf : une tâche endormie par envoi"""
+    async def wait_and_send(event):
+        await asyncio.sleep(delay)
+        await on_due(None, [event])
+
+    return [asyncio.ensure_future(wait_and_send(event)) for event in events]
+
+
+async def run_heap(events, delay, on_due, journal_path):
+    dispatcher = DelayedDispatcher(journal_path, on_due)
+    for event in events:
+        dispatcher.schedule('bench', [event], delay)
+    dispatcher.write_journal()
+    return dispatcher
+
+
+async def schedule(count, delay, journal_path, on_due):
+    events = [FakeEvent(SOURCE_CHAT, i) for i in range(count)]
+    if journal_path is None:
+        return await run_tasks(events, delay, on_due)
+    return await run_heap(events, delay, on_due, journal_path)
+
+
+async def measure(label, count, delay, journal_path=None):
+    sent = []
+
+    async def on_due(record, due_events):
+        sent.append(due_events[0].id)
+
+    # Temps de programmation (sans tracemalloc, qui ralentit chaque allocation)
+    start = time.perf_counter()
+    handle = await schedule(count, delay, journal_path, on_due)
+    elapsed = time.perf_counter() - start
+    tasks = len(asyncio.all_tasks()) - 1
+    await asyncio.sleep(delay + 0.5)
+    if journal_path is None:
+        await asyncio.gather(*handle)
+    else:
+        handle.close()
+    assert len(sent) == count
+
+    # Mémoire occupée par les envois en attente (messages source compris)
+    tracemalloc.start()
+    handle = await schedule(count, delay, journal_path, on_due)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    if journal_path is None:
+        for task in handle:
+            task.cancel()
+    else:
+        handle.close()
+
+    print(f"{label:<26} {elapsed * 1000:9.1f} ms  {memory / 1024 / 1024:8.1f} Mo  {tasks:7} tâche(s)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    print(f"📊 {count} envois en attente, délai {delay:g} s")
+    asyncio.run(measure('une tâche par message', count, delay))
+    with tempfile.TemporaryDirectory(prefix='telefeed_bench_') as tmp:
+        asyncio.run(measure('tas DelayedDispatcher', count, delay, os.path.join(tmp, 'delayed.journal')))
+
+
+if __name__ == '__main__':
+    main()
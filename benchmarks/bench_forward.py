@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark du transfert côté serveur TeleFeed
+Compare, pour une rafale de messages d'un chat source sans transformation,
+le renvoi historique (un send_message par message et par destination) au
+transfert forward_messages regroupé par destination (jusqu'à 100 messages par appel)
+
+Le client est factice : chaque appel API coûte un aller-retour réseau simulé.
+Le cadencement (RateScheduler) est désactivé pour mesurer le seul chemin d'envoi.
+
+Usage : python benchmarks/bench_forward.py [messages] [destinations] [rtt_ms]
+"""
+
+import asyncio
+import functools
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telefeed_dispatcher import OutboundDispatcher, BatchSend
+
+SOURCE_CHAT = -1001000000001
+
+
+class FakeClient:
+    """Client Telethon factice : un aller-retour de rtt secondes par appel"""
+
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.calls = 0
+        self.delivered = 0
+        self._next_id = 0
+
+    def _message(self):
+        self._next_id += 1
+        return SimpleNamespace(id=self._next_id)
+
+    async def send_message(self, entity, message, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.rtt)
+        self.delivered += 1
+        return self._message()
+
+    async def forward_messages(self, entity, messages, from_peer=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.rtt)
+        self.delivered += len(messages)
+        return [self._message() for _ in messages]
+
+
+async def run(path, message_count, destinations, rtt):
+    client = FakeClient(rtt)
+    dispatcher = OutboundDispatcher(max_concurrency=8, queue_size=message_count)
+    mapping = {}
+
+    async def send_text(dest_id, event):
+        sent = await client.send_message(dest_id, event.raw_text)
+        mapping[(event.id, dest_id)] = sent.id
+
+    async def forward(dest_id, events):
+        sent = await client.forward_messages(dest_id, [event.id for event in events], from_peer=SOURCE_CHAT)
+        for event, message in zip(events, sent):
+            mapping[(event.id, dest_id)] = message.id
+
+    start = time.perf_counter()
+    for msg_id in range(1, message_count + 1):
+        event = SimpleNamespace(id=msg_id, chat_id=SOURCE_CHAT, raw_text=f"message {msg_id}")
+        if path == 'forward':
+            sends = [(dest_id, BatchSend(('forward', SOURCE_CHAT), event, functools.partial(forward, dest_id)))
+                     for dest_id in destinations]
+        else:
+            sends = [(dest_id, functools.partial(send_text, dest_id, event)) for dest_id in destinations]
+        await dispatcher.submit(time.monotonic(), sends)
+    await dispatcher.join()
+    elapsed = time.perf_counter() - start
+    dispatcher.close()
+
+    assert client.delivered == len(mapping) == message_count * len(destinations)
+    return elapsed, client.calls
+
+
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    destination_count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    rtt = (float(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+    destinations = [-1002000000000 - i for i in range(destination_count)]
+
+    print(f"📊 Rafale de {message_count} messages vers {destination_count} destination(s), "
+          f"aller-retour simulé {rtt * 1000:.0f} ms")
+    results = {}
+    for label, path in (('send_message par message', 'send'), ('forward_messages groupé', 'forward')):
+        elapsed, calls = asyncio.run(run(path, message_count, destinations, rtt))
+        results[label] = elapsed
+        rate = message_count * destination_count / elapsed
+        print(f"{label:<26} {elapsed:8.2f} s  {calls:6} appels API  {rate:10,.0f} envois/s")
+
+    send_time, forward_time = results.values()
+    print(f"Gain : x{send_time / forward_time:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark du journal de mutations TeleFeed
+Mesure le rejeu au démarrage d'un journal de N mutations, et compare le coût
+d'une écriture journalisée à la réécriture complète du fichier JSON
+
+Usage : python benchmarks/bench_journal.py [nombre_de_mutations]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telefeed_journal import MutationJournal, set_record, delete_record
+from telefeed_commands import save_json_data
+
+
+def synthetic_records(count, redirection_count=500):
+    """Mélange de créations/suppressions de redirections et de correspondances de messages"""
+    rng = random.Random(42)
+    records = []
+    for i in range(count):
+        if i % 10 == 0:
+            redirection_id = f"redir{rng.randrange(redirection_count)}"
+            if rng.random() < 0.2:
+                records.append(delete_record([redirection_id]))
+            else:
+                records.append(set_record([redirection_id], {
+                    'sources': [-1001000000000 - rng.randrange(5000)],
+                    'destinations': [-1002000000000 - rng.randrange(50)],
+                    'created_at': '2026-01-01T00:00:00',
+                    'active': True
+                }))
+        else:
+            source_key = f"-100117806215{i % 4}_{1_700_000 + i}"
+            records.append(set_record([source_key, '-4922594370'], 8_000 + i))
+    return records
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = synthetic_records(count)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = MutationJournal(os.path.join(tmp, 'store.journal'))
+
+        start = time.perf_counter()
+        for record in records:
+            journal.append(record)
+        append_seconds = time.perf_counter() - start
+        journal_bytes = journal.size()
+
+        data = {}
+        start = time.perf_counter()
+        applied = journal.replay(data)
+        replay_seconds = time.perf_counter() - start
+
+        snapshot_path = os.path.join(tmp, 'store.json')
+        start = time.perf_counter()
+        snapshot_bytes = save_json_data(snapshot_path, data)
+        snapshot_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            json.load(f)
+        snapshot_load_seconds = time.perf_counter() - start
+
+    print(f"📊 Journal de {count:,} mutations ({journal_bytes / 1e6:.1f} Mo)")
+    print(f"Ajout        : {append_seconds / count * 1e6:.1f} µs et {journal_bytes / count:.0f} octets par mutation")
+    print(f"Rejeu        : {replay_seconds * 1000:.0f} ms ({applied / replay_seconds:,.0f} mutations/s)")
+    print(f"Instantané   : {snapshot_bytes / 1e6:.1f} Mo, écrit en {snapshot_seconds * 1000:.0f} ms, "
+          f"relu en {snapshot_load_seconds * 1000:.0f} ms")
+    print(f"Sans journal : chaque mutation réécrirait jusqu'à {snapshot_bytes / 1e6:.1f} Mo "
+          f"(~{snapshot_seconds * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
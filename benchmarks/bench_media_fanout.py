@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'envoi d'un média TeleFeed vers plusieurs destinations
+Compare le chemin naïf (un téléchargement et un upload par destination) à
+MediaFanout, quand la référence du fichier est acceptée et quand elle est
+refusée (source protégée : téléchargement et upload uniques)
+
+Le client est factice : les transferts se partagent un lien au débit simulé et le
+téléchargement écrit réellement le fichier (empreinte SHA-256 comprise).
+
+Usage : python benchmarks/bench_media_fanout.py [taille_mo] [destinations] [débit_mo_s]
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telethon.errors import ChatForwardsRestrictedError
+from telethon.tl import types
+from media_fanout import MediaFanout
+
+RTT = 0.05
+
+
+class FakeClient:
+    """Client Telethon factice : transferts au débit simulé sur un lien partagé,
+    aller-retour de RTT par requête"""
+
+    def __init__(self, payload, bandwidth, protected):
+        self.payload = payload
+        self.bandwidth = bandwidth
+        self.protected = protected
+        self.transferred = 0
+        self.link = asyncio.Lock()
+
+    async def _transfer(self, size):
+        self.transferred += size
+        async with self.link:
+            await asyncio.sleep(RTT + size / self.bandwidth)
+
+    async def download_media(self, message, file):
+        await self._transfer(len(self.payload))
+        path = file + '.mp4'
+        with open(path, 'wb') as f:
+            f.write(self.payload)
+        return path
+
+    async def upload_file(self, file, file_name=None):
+        await self._transfer(os.path.getsize(file))
+        return types.InputFileBig(id=1, parts=1, name=file_name)
+
+    async def send_file(self, entity, file, caption=None, reply_to=None):
+        if self.protected and isinstance(file, types.MessageMediaDocument):
+            raise ChatForwardsRestrictedError(request=None)
+        await asyncio.sleep(RTT)
+        return SimpleNamespace(id=1)
+
+
+def video_message(size):
+    document = types.Document(
+        id=42, access_hash=0, file_reference=b'', date=None, mime_type='video/mp4',
+        size=size, dc_id=2, attributes=[types.DocumentAttributeVideo(duration=60, w=1280, h=720)]
+    )
+    return SimpleNamespace(
+        media=types.MessageMediaDocument(document=document),
+        file=SimpleNamespace(name='video.mp4')
+    )
+
+
+async def naive(client, message, destinations, cache_dir):
+    """Chaque destination télécharge puis uploade le média pour elle-même"""
+    async def send(dest_id):
+        path = await client.download_media(message, file=os.path.join(cache_dir, f"naive_{dest_id}"))
+        input_file = await client.upload_file(path, file_name='video.mp4')
+        return await client.send_file(dest_id, input_file)
+
+    await asyncio.gather(*(send(dest_id) for dest_id in destinations))
+
+
+async def fanout(client, message, destinations, cache_dir):
+    media = MediaFanout(client, cache_dir)
+    await asyncio.gather(*(media.send(dest_id, message) for dest_id in destinations))
+    return media.get_stats()
+
+
+def main():
+    size = int(float(sys.argv[1]) * 1024 * 1024) if len(sys.argv) > 1 else 20 * 1024 * 1024
+    destination_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    bandwidth = (float(sys.argv[3]) if len(sys.argv) > 3 else 20) * 1024 * 1024
+    payload = os.urandom(size)
+    message = video_message(size)
+    destinations = list(range(destination_count))
+
+    print(f"📊 Vidéo de {size / 1024 / 1024:.0f} Mo vers {destination_count} destinations, "
+          f"débit simulé {bandwidth / 1024 / 1024:.0f} Mo/s")
+    for protected in (False, True):
+        label = 'référence refusée' if protected else 'référence acceptée'
+        for path_label, run in (('naïf', naive), ('MediaFanout', fanout)):
+            cache_dir = tempfile.mkdtemp(prefix='bench_media_')
+            try:
+                client = FakeClient(payload, bandwidth, protected)
+                start = time.perf_counter()
+                asyncio.run(run(client, message, destinations, cache_dir))
+                elapsed = time.perf_counter() - start
+            finally:
+                shutil.rmtree(cache_dir)
+            print(f"{label:<19} {path_label:<12} {elapsed:7.2f} s  "
+                  f"{client.transferred / 1024 / 1024:8.0f} Mo transférés")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire du mapping des messages TeleFeed
+Compare le dictionnaire historique {"chat_msg": {"dest": id}} à la CompactMappingTable
+
+Usage : python benchmarks/bench_message_mapping.py [nombre_d_entrées]
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_mapping_store import CompactMappingTable
+
+SOURCE_CHATS = [-1001178062153, -1001234567890, -1009876543210, -1002222222222]
+DEST_CHATS = [-4922594370, -1003333333333]
+
+
+def synthetic_entries(count):
+    """Messages source croissants par chat, chacun envoyé vers toutes les destinations"""
+    next_ids = {chat: 1_700_000 for chat in SOURCE_CHATS}
+    dest_next = {chat: 8_000 for chat in DEST_CHATS}
+    produced = 0
+    while produced < count:
+        source_chat = SOURCE_CHATS[produced // len(DEST_CHATS) % len(SOURCE_CHATS)]
+        source_msg = next_ids[source_chat]
+        next_ids[source_chat] += 1
+        for dest_chat in DEST_CHATS:
+            if produced >= count:
+                break
+            dest_next[dest_chat] += 1
+            yield source_chat, source_msg, dest_chat, dest_next[dest_chat]
+            produced += 1
+
+
+def build_legacy(entries):
+    mapping = {}
+    for source_chat, source_msg, dest_chat, dest_msg in entries:
+        source_key = f"{source_chat}_{source_msg}"
+        if source_key not in mapping:
+            mapping[source_key] = {}
+        mapping[source_key][str(dest_chat)] = dest_msg
+    return mapping
+
+
+def build_compact(entries):
+    table = CompactMappingTable()
+    for entry in entries:
+        table.add(*entry)
+    return table
+
+
+def measure(label, builder, entries):
+    tracemalloc.start()
+    start = time.perf_counter()
+    structure = builder(entries)
+    build_seconds = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {current / len(entries):>8.1f} octets/entrée   "
+          f"{current / 1024 / 1024:>8.1f} Mo   construction {build_seconds:.2f} s")
+    return structure
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    entries = list(synthetic_entries(count))
+    print(f"📊 {count:,} correspondances synthétiques\n")
+
+    legacy = measure('dict', build_legacy, entries)
+    compact = measure('compact', build_compact, entries)
+
+    probes = random.Random(42).sample(entries, min(100_000, len(entries)))
+
+    start = time.perf_counter()
+    for source_chat, source_msg, dest_chat, dest_msg in probes:
+        assert legacy[f"{source_chat}_{source_msg}"][str(dest_chat)] == dest_msg
+    legacy_lookup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for source_chat, source_msg, dest_chat, dest_msg in probes:
+        assert compact.get(source_chat, source_msg, dest_chat) == dest_msg
+    compact_lookup = time.perf_counter() - start
+
+    print(f"\nRecherche (édition) : dict {legacy_lookup / len(probes) * 1e6:.2f} µs, "
+          f"compact {compact_lookup / len(probes) * 1e6:.2f} µs")
+
+
+if __name__ == '__main__':
+    main()
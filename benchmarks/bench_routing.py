@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark du routage des messages TeleFeed
+Compare le parcours historique de toutes les redirections (test `in` sur la
+liste des sources) à la table de routage compilée, sur un trafic composé
+surtout de chats sans redirection (bruit)
+
+Usage : python benchmarks/bench_routing.py [redirections] [messages_par_seconde]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telefeed_routing import RoutingTable
+
+NOISE_RATIO = 0.95
+
+
+def synthetic_redirections(count, rng):
+    redirections = {}
+    for i in range(count):
+        redirections[f"redir{i}"] = {
+            'sources': [-1001000000000 - rng.randrange(count * 2) for _ in range(rng.randint(1, 3))],
+            'destinations': [-1002000000000 - rng.randrange(100) for _ in range(rng.randint(1, 2))],
+            'active': True
+        }
+    return redirections
+
+
+def legacy_route(redirections, chat_id):
+    """Boucle historique de message_handler (sans filtres ni envoi)"""
+    matched = []
+    for redir_id, redir_data in redirections.items():
+        if not redir_data.get('active', True):
+            continue
+        if chat_id in redir_data.get('sources', []):
+            matched.append(redir_id)
+    return matched
+
+
+def compiled_route(table, chat_id):
+    return [route.redirection_id for route in table.get(chat_id)]
+
+
+def main():
+    redirection_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rate = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+
+    rng = random.Random(7)
+    redirections = synthetic_redirections(redirection_count, rng)
+    sources = sorted({source for data in redirections.values() for source in data['sources']})
+
+    # Une seconde de trafic : surtout des chats privés, groupes et canaux sans redirection
+    traffic = [
+        rng.randrange(1, 10**9) if rng.random() < NOISE_RATIO else rng.choice(sources)
+        for _ in range(rate)
+    ]
+
+    start = time.perf_counter()
+    table = RoutingTable(redirections)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    for chat_id in traffic[:1000]:
+        assert sorted(legacy_route(redirections, chat_id)) == sorted(compiled_route(table, chat_id))
+
+    results = {}
+    for label, route, state in (('boucle historique', legacy_route, redirections),
+                                ('table compilée', compiled_route, table)):
+        start = time.perf_counter()
+        for chat_id in traffic:
+            route(state, chat_id)
+        results[label] = time.perf_counter() - start
+
+    print(f"📊 {redirection_count} redirections, {rate:,} messages/s dont {NOISE_RATIO:.0%} de bruit")
+    print(f"Compilation de la table : {build_ms:.1f} ms ({len(table)} chats source)")
+    for label, seconds in results.items():
+        print(f"{label:<18}: {seconds / rate * 1e6:8.2f} µs/message, "
+              f"{seconds * 100:6.2f}% d'un cœur à {rate:,} msg/s")
+
+
+if __name__ == '__main__':
+    main()
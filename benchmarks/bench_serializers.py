@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark des sérialiseurs de stores TeleFeed
+Débit de sauvegarde et de chargement (JSON indenté historique vs marshal) pour
+les stores volumineux (liste des chats, mapping des messages) de tailles croissantes
+
+Usage : python benchmarks/bench_serializers.py [taille_max]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import store_serializers
+from telefeed_commands import load_json_data, save_json_data
+
+
+def synthetic_chats(count):
+    return [
+        {'id': -1001000000000 - i, 'title': f'Canal de pronostics numéro {i}', 'type': 'channel'}
+        for i in range(count)
+    ]
+
+
+def synthetic_mapping(count):
+    return {
+        f"-1001178062153_{1_700_000 + i}": {'-4922594370': 8_000 + i, '-1003333333333': 9_000 + i}
+        for i in range(count // 2)
+    }
+
+
+def measure(filename, data, serializer, repeats=3):
+    save_times, load_times = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        size = save_json_data(filename, data, serializer)
+        save_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        load_json_data(filename)
+        load_times.append(time.perf_counter() - start)
+    return size, min(save_times), min(load_times)
+
+
+def main():
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    sizes = [size for size in (1_000, 10_000, 100_000, 1_000_000) if size <= max_size]
+
+    print(f"{'store':<8} {'entrées':>9} {'format':<8} {'taille':>10} {'sauvegarde':>12} {'chargement':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for store, builder in (('chats', synthetic_chats), ('mapping', synthetic_mapping)):
+            for size in sizes:
+                data = builder(size)
+                for serializer in (store_serializers.JSON, store_serializers.MARSHAL):
+                    filename = os.path.join(tmp, f"{store}_{size}_{serializer.name}")
+                    written, save_seconds, load_seconds = measure(filename, data, serializer)
+                    print(f"{store:<8} {size:>9,} {serializer.name:<8} {written / 1e6:>8.2f}Mo "
+                          f"{written / 1e6 / save_seconds:>8.0f}Mo/s {written / 1e6 / load_seconds:>8.0f}Mo/s"
+                          f"  ({save_seconds * 1000:.1f} / {load_seconds * 1000:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
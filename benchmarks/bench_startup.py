@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark de démarrage à froid TeleFeed : temps entre le lancement du processus
+et l'envoi du premier message redirigé
+
+Chaque mesure lance un nouvel interpréteur Python dans un répertoire de données
+synthétiques (un compte, une redirection, une grande liste de chats), importe
+telefeed_commands, connecte un client factice et lui fait traiter un message.
+
+Usage : python benchmarks/bench_startup.py [nombre_de_chats] [répétitions]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PHONE = '22900000000'
+SOURCE_CHAT = -1001000000001
+DEST_CHAT = -1001000000002
+
+CHILD = r'''
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, {root!r})
+import telefeed_commands
+
+PHONE = {phone!r}
+
+class FakeClient:
+    """Client Telethon factice : enregistre les handlers et signale le premier envoi"""
+
+    def __init__(self):
+        self.handlers = []
+        self.sent = asyncio.Event()
+
+    def add_event_handler(self, callback, event=None):
+        self.handlers.append((callback, event))
+
+    def remove_event_handler(self, callback, event=None):
+        self.handlers = [(c, e) for c, e in self.handlers if c is not callback]
+
+    def __getattr__(self, name):
+        async def noop(*args, **kwargs):
+            return SimpleNamespace(id=1, broadcast=True, megagroup=False)
+        return noop
+
+    async def get_entity(self, entity):
+        return SimpleNamespace(id=entity, broadcast=True, megagroup=False)
+
+    async def get_input_entity(self, entity):
+        return entity
+
+    def _signal_send(self):
+        if not self.sent.is_set():
+            print(f"FIRST_SEND {{time.time()!r}}", flush=True)
+            self.sent.set()
+
+    async def send_message(self, *args, **kwargs):
+        self._signal_send()
+        return SimpleNamespace(id=1)
+
+    async def forward_messages(self, entity, messages, *args, **kwargs):
+        # Transfert côté serveur (chemin rapide des redirections sans transformation)
+        self._signal_send()
+        return [SimpleNamespace(id=i + 1) for i in range(len(messages))]
+
+async def main():
+    manager = telefeed_commands.get_telefeed_manager()
+    manager.load_account(PHONE)
+    client = FakeClient()
+    manager.clients[PHONE] = client
+    await manager.setup_redirection_handlers(client, PHONE)
+
+    event = SimpleNamespace(
+        chat_id={source}, id=1, raw_text='Nouveau pronostic', message=None,
+        media=None, grouped_id=None, reply_to_msg_id=None, client=client
+    )
+    callback = client.handlers[0][0]
+    await callback(event)
+    await asyncio.wait_for(client.sent.wait(), timeout=30)
+    await telefeed_commands.flush_pending_writes()
+
+asyncio.run(main())
+'''
+
+
+def prepare_data_dir(chat_count):
+    """Crée un répertoire de données TeleFeed synthétique"""
+    data_dir = tempfile.mkdtemp(prefix='telefeed_bench_')
+    account_dir = os.path.join(data_dir, 'telefeed_accounts', PHONE)
+    os.makedirs(account_dir)
+
+    def write(path, data):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    write(os.path.join(data_dir, 'telefeed_sessions.json'), {
+        PHONE: {'connected': True, 'session_file': f'telefeed_{PHONE}.session'}
+    })
+    write(os.path.join(account_dir, 'redirections.json'), {
+        'bench': {'sources': [SOURCE_CHAT], 'destinations': [DEST_CHAT], 'active': True}
+    })
+    write(os.path.join(account_dir, 'settings.json'), {'bench': {'process_edit': True}})
+    write(os.path.join(account_dir, 'chats.json'), [
+        {'id': -1001000000000 - i, 'title': f'Canal de test numéro {i}', 'type': 'channel'}
+        for i in range(chat_count)
+    ])
+    return data_dir
+
+
+def run_once(data_dir):
+    script = CHILD.format(root=ROOT, phone=PHONE, source=SOURCE_CHAT)
+    start = time.time()
+    result = subprocess.run(
+        [sys.executable, '-c', script], cwd=data_dir,
+        capture_output=True, text=True, timeout=120
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith('FIRST_SEND '):
+            return float(line.split()[1]) - start
+    raise RuntimeError(f"Aucun envoi détecté :\n{result.stdout}\n{result.stderr}")
+
+
+def run_import_only(data_dir):
+    start = time.time()
+    subprocess.run(
+        [sys.executable, '-c', f'import sys; sys.path.insert(0, {ROOT!r}); import telefeed_commands'],
+        cwd=data_dir, check=True, capture_output=True
+    )
+    return time.time() - start
+
+
+def main():
+    chat_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    data_dir = prepare_data_dir(chat_count)
+    print(f"📊 Démarrage à froid, {chat_count:,} chats enregistrés, {repeats} mesures")
+
+    # Première exécution : migrations éventuelles (mapping, fichiers plats)
+    run_once(data_dir)
+
+    imports = [run_import_only(data_dir) for _ in range(repeats)]
+    first_messages = [run_once(data_dir) for _ in range(repeats)]
+
+    print(f"Import de telefeed_commands : médiane {statistics.median(imports) * 1000:.0f} ms")
+    print(f"Premier message redirigé    : médiane {statistics.median(first_messages) * 1000:.0f} ms "
+          f"(min {min(first_messages) * 1000:.0f} ms, max {max(first_messages) * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,8 @@ class BotHandlers:
         self.bot = bot
         self.user_manager = user_manager
         self.register_handlers()
+        # Expiration des licences à leur échéance, sur la boucle du bot
+        self.user_manager.start_expiry_sweeper(self.bot.loop)
     
     def register_handlers(self):
         """Enregistre tous les handlers du bot"""
@@ -368,7 +370,7 @@ class BotHandlers:
             f"📂 **Fichiers de données :**\n"
             f"• users.json : {'✅' if os.path.exists('users.json') else '❌'}\n"
             f"• telefeed_sessions.json : {'✅' if os.path.exists('telefeed_sessions.json') else '❌'}\n"
-            f"• telefeed_redirections.json : {'✅' if os.path.exists('telefeed_redirections.json') else '❌'}"
+            f"• telefeed_accounts/ (redirections par compte) : {'✅' if os.path.isdir('telefeed_accounts') else '❌'}"
         )
         
         await event.reply(config_info, parse_mode='markdown')
@@ -378,6 +380,12 @@ class BotHandlers:
         if event.sender_id != ADMIN_ID:
             return
         
+        parts = event.raw_text.split()
+        action = parts[1] if len(parts) > 1 else None
+        if (action == 'set' and len(parts) == 4) or (action in ('show', 'remove') and len(parts) == 3):
+            await self.apply_delay_command(event, action, parts[2], parts[3] if action == 'set' else None)
+            return
+        
         await event.reply(
             "⏱️ **CONFIGURATION DES DÉLAIS**\n\n"
             "🔧 **Commandes disponibles :**\n"
@@ -393,11 +401,65 @@ class BotHandlers:
             "redirigés pour éviter les limitations Telegram."
         )
     
+    async def apply_delay_command(self, event, action, redirection_id, seconds):
+        """Exécute /delay set|show|remove pour une redirection (tous comptes confondus)"""
+        import math
+        from telefeed_commands import get_telefeed_manager, MAX_ROUTE_DELAY
+        manager = get_telefeed_manager()
+        
+        if action == 'set':
+            try:
+                seconds = float(seconds)
+            except ValueError:
+                await event.reply("❌ Le délai doit être un nombre de secondes")
+                return
+            if not math.isfinite(seconds) or seconds < 0:
+                await event.reply("❌ Le délai doit être un nombre de secondes positif")
+                return
+            if seconds > MAX_ROUTE_DELAY:
+                await event.reply(f"❌ Le délai ne peut pas dépasser {MAX_ROUTE_DELAY:g} secondes")
+                return
+            phones = manager.set_route_delay(redirection_id, seconds)
+            if not phones:
+                await event.reply(f"❌ Redirection `{redirection_id}` introuvable", parse_mode='markdown')
+                return
+            await event.reply(
+                f"✅ Délai de `{redirection_id}` : {seconds:g}s\n"
+                f"📱 Compte(s) : {', '.join(phones)}",
+                parse_mode='markdown'
+            )
+        elif action == 'remove':
+            phones = manager.set_route_delay(redirection_id, None)
+            if not phones:
+                await event.reply(f"❌ Redirection `{redirection_id}` introuvable", parse_mode='markdown')
+                return
+            await event.reply(f"✅ Délai de `{redirection_id}` supprimé", parse_mode='markdown')
+        else:
+            phones = [
+                phone for phone in manager.redirections.phones()
+                if redirection_id in manager.redirections.get(phone, {})
+            ]
+            if not phones:
+                await event.reply(f"❌ Redirection `{redirection_id}` introuvable", parse_mode='markdown')
+                return
+            message = f"⏱️ **Délai de `{redirection_id}`**\n\n"
+            for phone in phones:
+                delay = manager.route_delay(phone, redirection_id)
+                spread = manager.settings.get(phone, {}).get(redirection_id, {}).get('delay_spread_mode', False)
+                message += f"• {phone} : {f'{delay:g}s' if delay else 'aucun'}"
+                message += " (mode étalé)\n" if delay and spread else "\n"
+            await event.reply(message, parse_mode='markdown')
+    
     async def settings_handler(self, event):
         """Handler pour la commande /settings (admin seulement)"""
         if event.sender_id != ADMIN_ID:
             return
         
+        parts = event.raw_text.split()
+        if len(parts) in (3, 4) and parts[1] == 'duplicates':
+            await self.apply_duplicates_command(event, parts[2], parts[3] if len(parts) == 4 else None)
+            return
+        
         await event.reply(
             "⚙️ **PARAMÈTRES SYSTÈME TELEFEED**\n\n"
             "🔧 **Catégories disponibles :**\n"
@@ -409,12 +471,46 @@ class BotHandlers:
             "📋 **Commandes rapides :**\n"
             "• `/redirection <numéro>` - Voir redirections\n"
             "• `/transformation active on <numéro>` - Voir transformations\n"
-            "• `/chats <numéro>` - Voir chats disponibles\n\n"
+            "• `/chats <numéro>` - Voir chats disponibles\n"
+            "• `/settings duplicates <redirection> on|off` - Écarter les doublons\n\n"
             "💡 **Support :**\n"
             "Utilisez `/guide` pour un tutoriel complet\n"
             "ou `/help` pour voir toutes les commandes."
         )
     
+    async def apply_duplicates_command(self, event, redirection_id, state):
+        """Active, désactive (state 'on'/'off') ou affiche drop_duplicates d'une redirection"""
+        from telefeed_commands import get_telefeed_manager
+        manager = get_telefeed_manager()
+        
+        if state is not None:
+            if state not in ('on', 'off'):
+                await event.reply("❌ Utilisez `on` ou `off`", parse_mode='markdown')
+                return
+            phones = manager.set_route_setting(redirection_id, 'drop_duplicates', state == 'on')
+            if not phones:
+                await event.reply(f"❌ Redirection `{redirection_id}` introuvable", parse_mode='markdown')
+                return
+            await event.reply(
+                f"✅ Doublons de `{redirection_id}` : {'écartés' if state == 'on' else 'transmis'}\n"
+                f"📱 Compte(s) : {', '.join(phones)}",
+                parse_mode='markdown'
+            )
+            return
+        
+        phones = [
+            phone for phone in manager.redirections.phones()
+            if redirection_id in manager.redirections.get(phone, {})
+        ]
+        if not phones:
+            await event.reply(f"❌ Redirection `{redirection_id}` introuvable", parse_mode='markdown')
+            return
+        message = f"🔁 **Doublons de `{redirection_id}`**\n\n"
+        for phone in phones:
+            enabled = manager.settings.get(phone, {}).get(redirection_id, {}).get('drop_duplicates', False)
+            message += f"• {phone} : {'écartés' if enabled else 'transmis'}\n"
+        await event.reply(message, parse_mode='markdown')
+    
     async def menu_handler(self, event):
         """Handler pour la commande /menu - Interface à boutons"""
         user_id = str(event.sender_id)
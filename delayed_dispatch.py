@@ -0,0 +1,327 @@
+"""
+Envois différés TeleFeed (délai d'une redirection, mode étalé delay_spread_mode)
+Les envois en attente sont rangés dans un tas ordonné par échéance, parcouru
+par une seule tâche par compte, et journalisés pour survivre à un redémarrage
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+from telefeed_journal import MutationJournal, set_record, delete_record
+
+
+def delayed_key(redirection_id, chat_id, msg_id):
+    """Clé d'un envoi différé (chaîne : elle sert aussi de chemin dans le journal)"""
+    return f"{redirection_id}:{chat_id}:{msg_id}"
+
+
+class DelayedItem:
+    """Envoi différé d'une redirection : messages source et échéance
+
+    events est None pour un envoi relu du journal : les messages sont alors
+    récupérés à l'échéance.
+    """
+
+    __slots__ = ('redirection', 'chat', 'msgs', 'due', 'received', 'events', 'seq')
+
+    def __init__(self, redirection, chat, msgs, due, received, events=None, seq=0):
+        self.redirection = redirection
+        self.chat = chat
+        self.msgs = msgs
+        self.due = due
+        self.received = received
+        self.events = events
+        self.seq = seq
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record['redirection'], record['chat'], tuple(record['msgs']),
+                   record['due'], record.get('received', record['due']))
+
+    def record(self):
+        """Enregistrement journalisé (et transmis à on_due)"""
+        return {
+            'redirection': self.redirection,
+            'chat': self.chat,
+            'msgs': list(self.msgs),
+            'due': self.due,
+            'received': self.received
+        }
+
+
+class DelayedDispatcher:
+    """Envois différés d'un compte, transmis à on_due(record, events) à leur échéance
+
+    schedule() ajoute (échéance, numéro, clé) au tas en O(log n) : aucune tâche
+    ni minuterie par message. La tâche unique dort jusqu'à l'échéance la plus
+    proche et est réveillée si un envoi plus proche est ajouté. Un envoi annulé
+    reste dans le tas et est ignoré à sa sortie.
+
+    Les échéances sont en temps réel (time.time()) pour rester valables après un
+    redémarrage. En mode étalé, le délai est l'attente maximale d'un envoi : les
+    envois successifs d'une redirection sont espacés de délai / spread_slots au
+    lieu de partir ensemble après une rafale, sans jamais dépasser maintenant +
+    délai. Sous un trafic soutenu, attente et envois en attente restent bornés.
+
+    Chaque ajout ou retrait est une ligne du journal, écrite en un seul ajout
+    par itération de la boucle pour une rafale ; le journal est réécrit avec les
+    seuls envois en attente dès qu'il contient plus de compact_records lignes et
+    plus du double des envois en attente. Un envoi n'est retiré du journal qu'une
+    fois on_due terminé : interrompu par close(), il repart au redémarrage.
+    """
+
+    def __init__(self, journal_path, on_due, compact_records=1000, spread_slots=10):
+        self.journal = MutationJournal(journal_path)
+        self.on_due = on_due
+        self.compact_records = compact_records
+        self.spread_slots = max(1, spread_slots)
+        # Tas de (échéance, numéro, clé)
+        self._heap = []
+        # {clé: DelayedItem}
+        self._pending = {}
+        # {message source: [clés]} pour les éditions et suppressions
+        self._by_message = {}
+        # {redirection: dernière échéance programmée} (mode étalé)
+        self._last_due = {}
+        # {clé: DelayedItem} en cours d'envoi (retirés du tas, encore journalisés)
+        self._in_flight = {}
+        self._seq = itertools.count()
+        self._records = 0
+        # Mutations pas encore écrites (écriture groupée en fin d'itération de la boucle)
+        self._unwritten = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.stats = {
+            'scheduled': 0,
+            'spread': 0,
+            'sent': 0,
+            'cancelled': 0,
+            'updated': 0,
+            'restored': 0
+        }
+
+    def load(self):
+        """Reprogramme les envois journalisés (redémarrage) et retourne leur nombre"""
+        data = {}
+        self._records = self.journal.replay(data)
+        for key, record in data.items():
+            self._add(key, DelayedItem.from_record(record))
+        self.stats['restored'] += len(data)
+        if self._records > len(data):
+            self._compact()
+        return len(data)
+
+    def schedule(self, redirection_id, events, delay, spread=False):
+        """Programme l'envoi de messages source (un message ou les parties d'un album)"""
+        now = time.time()
+        due = now + delay
+        if spread:
+            # Créneau suivant de la redirection, au plus tard à l'échéance sans étalement
+            slot = max(now, self._last_due.get(redirection_id, 0)) + delay / self.spread_slots
+            due = min(slot, due)
+            self.stats['spread'] += 1
+
+        first = events[0]
+        key = delayed_key(redirection_id, first.chat_id, first.id)
+        item = DelayedItem(redirection_id, first.chat_id, tuple(event.id for event in events),
+                           due, now, list(events))
+        self._add(key, item)
+        self._append(set_record([key], item.record()))
+        self.stats['scheduled'] += 1
+        return due
+
+    def _add(self, key, item):
+        self._insert(key, item)
+
+        # Nouvelle échéance la plus proche : réveiller la tâche
+        if self._heap[0][2] == key:
+            self._wakeup.set()
+        self._ensure_task()
+
+    def _insert(self, key, item):
+        previous = self._pending.get(key)
+        if previous is not None:
+            self._unindex(key, previous)
+        item.seq = next(self._seq)
+        self._pending[key] = item
+        heapq.heappush(self._heap, (item.due, item.seq, key))
+        for msg_id in item.msgs:
+            self._by_message.setdefault(msg_id, []).append(key)
+
+        if item.due > self._last_due.get(item.redirection, 0):
+            self._last_due[item.redirection] = item.due
+
+    def _unindex(self, key, item):
+        for msg_id in item.msgs:
+            keys = self._by_message.get(msg_id)
+            if keys is not None and key in keys:
+                keys.remove(key)
+                if not keys:
+                    del self._by_message[msg_id]
+
+    def _remove(self, key):
+        item = self._pending.pop(key, None)
+        if item is not None:
+            self._unindex(key, item)
+        return item
+
+    def _matching(self, msg_id, chats):
+        """Clés des envois en attente contenant le message msg_id d'un des chats"""
+        return [
+            key for key in self._by_message.get(msg_id, ())
+            if self._pending[key].chat in chats
+        ]
+
+    def update(self, event):
+        """Remplace un message source encore en attente par sa version éditée
+
+        Retourne les redirections concernées : l'envoi différé partira avec le
+        texte édité, il n'y a rien à éditer dans leurs destinations.
+        """
+        redirections = set()
+        for key in self._matching(event.id, (event.chat_id,)):
+            item = self._pending[key]
+            if item.events is not None:
+                item.events = [event if e.id == event.id else e for e in item.events]
+            redirections.add(item.redirection)
+            self.stats['updated'] += 1
+        return redirections
+
+    def cancel(self, chats, msg_ids, redirections=None):
+        """Annule les envois en attente de messages supprimés ; retourne leur nombre
+
+        Avec redirections, seuls les envois de ces redirections sont annulés.
+        """
+        removed = []
+        for msg_id in msg_ids:
+            for key in self._matching(msg_id, chats):
+                if redirections is None or self._pending[key].redirection in redirections:
+                    self._remove(key)
+                    removed.append(delete_record([key]))
+        if removed:
+            self._append(*removed)
+            self.stats['cancelled'] += len(removed)
+        return len(removed)
+
+    def _append(self, *records):
+        if not self._unwritten:
+            try:
+                asyncio.get_running_loop().call_soon(self.write_journal)
+            except RuntimeError:
+                self._unwritten.extend(records)
+                self.write_journal()
+                return
+        self._unwritten.extend(records)
+
+    def write_journal(self):
+        """Écrit les mutations en attente dans le journal (compacté si nécessaire)"""
+        if not self._unwritten:
+            return
+        records, self._unwritten = self._unwritten, []
+        self.journal.append(*records)
+        self._records += len(records)
+        if self._records > max(self.compact_records, 2 * len(self._pending)):
+            self._compact()
+
+    def _compact(self):
+        """Réécrit le journal avec les seuls envois en attente (ou en cours d'envoi)"""
+        # L'instantané inclut les mutations non écrites
+        self._unwritten = []
+        kept = {**self._in_flight, **self._pending}
+        if not kept:
+            if self.journal.exists():
+                os.remove(self.journal.path)
+            self._records = 0
+            return
+
+        tmp_path = f"{self.journal.path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        MutationJournal(tmp_path).append(*(
+            set_record([key], item.record()) for key, item in kept.items()
+        ))
+        os.replace(tmp_path, self.journal.path)
+        self._records = len(kept)
+
+    def _ensure_task(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Démarrée au premier ajout depuis la boucle
+        self._task = asyncio.ensure_future(self._run())
+
+    def start(self):
+        """Démarre la tâche si des envois sont en attente (après load())"""
+        if self._pending:
+            self._ensure_task()
+
+    def _next_delay(self):
+        """Secondes avant la prochaine échéance (None si rien n'est en attente)"""
+        heap = self._heap
+        while heap:
+            due, seq, key = heap[0]
+            item = self._pending.get(key)
+            if item is None or item.seq != seq:
+                heapq.heappop(heap)  # Envoi annulé ou reprogrammé
+                continue
+            return due - time.time()
+        return None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._next_delay()
+            if delay is None:
+                await self._wakeup.wait()
+                continue
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._dispatch_due()
+
+    async def _dispatch_due(self):
+        """Transmet les envois arrivés à échéance, dans l'ordre des échéances"""
+        now = time.time()
+        while self._next_delay() is not None and self._heap[0][0] <= now:
+            _, _, key = heapq.heappop(self._heap)
+            item = self._remove(key)
+            self._in_flight[key] = item
+            try:
+                await self.on_due(item.record(), item.events)
+                self.stats['sent'] += 1
+            except asyncio.CancelledError:
+                # Arrêt pendant l'envoi : il reste en attente, et dans le journal
+                del self._in_flight[key]
+                if key not in self._pending:
+                    self._insert(key, item)
+                raise
+            except Exception as e:
+                print(f"❌ Erreur envoi différé {key}: {e}")
+            del self._in_flight[key]
+            # Retiré du journal une fois transmis (sauf s'il a été reprogrammé entre-temps)
+            if key not in self._pending:
+                self._append(delete_record([key]))
+
+    def close(self):
+        """Arrête la tâche ; les envois en attente restent dans le journal"""
+        self.write_journal()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['pending'] = len(self._pending)
+        delay = self._next_delay()
+        stats['next_due_s'] = None if delay is None else round(max(delay, 0), 1)
+        return stats
+
+    def __len__(self):
+        return len(self._pending)
@@ -0,0 +1,132 @@
+"""
+Cache des destinations TeleFeed : entité, input peer et type de chat par client
+Évite un get_entity par message et par destination sur le chemin d'envoi
+"""
+
+import time
+import asyncio
+from telethon import utils
+from telethon.errors import (
+    ChannelInvalidError,
+    ChannelPrivateError,
+    ChatAdminRequiredError,
+    ChatForbiddenError,
+    ChatWriteForbiddenError,
+    PeerIdInvalidError,
+    UserBannedInChannelError
+)
+
+# Erreurs d'envoi indiquant que l'entité en cache n'est plus utilisable
+INVALIDATING_ERRORS = (
+    ChannelInvalidError,
+    ChannelPrivateError,
+    ChatAdminRequiredError,
+    ChatForbiddenError,
+    ChatWriteForbiddenError,
+    PeerIdInvalidError,
+    UserBannedInChannelError
+)
+
+
+def chat_kind(entity):
+    """Type de destination : 'channel', 'megagroup' ou 'chat' (groupe simple, utilisateur)"""
+    if getattr(entity, 'broadcast', False):
+        return 'channel'
+    if getattr(entity, 'megagroup', False):
+        return 'megagroup'
+    return 'chat'
+
+
+class Destination:
+    """Destination résolue : entité complète, input peer utilisable pour l'envoi et type"""
+
+    __slots__ = ('dest_id', 'entity', 'peer', 'kind', 'expires_at')
+
+    def __init__(self, dest_id, entity, ttl):
+        self.dest_id = dest_id
+        self.entity = entity
+        try:
+            self.peer = utils.get_input_peer(entity)
+        except TypeError:
+            self.peer = entity
+        self.kind = chat_kind(entity)
+        self.expires_at = time.monotonic() + ttl
+
+
+class DestinationCache:
+    """Destinations résolues d'un client, rafraîchies après ttl secondes
+
+    Les résolutions simultanées d'une même destination partagent un seul
+    appel get_entity.
+    """
+
+    def __init__(self, client, ttl=3600):
+        self.client = client
+        self.ttl = ttl
+        self._entries = {}
+        self._pending = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0
+        }
+
+    async def get(self, dest_id):
+        """Retourne la Destination de dest_id (résolue si absente ou expirée)"""
+        entry = self._entries.get(dest_id)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self.stats['hits'] += 1
+            return entry
+
+        self.stats['misses'] += 1
+        future = self._pending.get(dest_id)
+        if future is None:
+            future = asyncio.ensure_future(self._resolve(dest_id))
+            self._pending[dest_id] = future
+            future.add_done_callback(lambda _: self._pending.pop(dest_id, None))
+        return await asyncio.shield(future)
+
+    async def _resolve(self, dest_id):
+        entity = await self.client.get_entity(dest_id)
+        entry = Destination(dest_id, entity, self.ttl)
+        self._entries[dest_id] = entry
+        return entry
+
+    def invalidate(self, dest_id):
+        """Oublie une destination (droits retirés, canal devenu privé...)"""
+        if self._entries.pop(dest_id, None) is not None:
+            self.stats['invalidations'] += 1
+
+    def invalidate_on_error(self, dest_id, error):
+        """Invalide la destination si l'erreur d'envoi la rend inutilisable"""
+        if isinstance(error, INVALIDATING_ERRORS):
+            self.invalidate(dest_id)
+            return True
+        return False
+
+    async def warm(self, dest_ids):
+        """Résout à l'avance des destinations ; retourne le nombre de succès"""
+        results = await asyncio.gather(*(self.get(dest_id) for dest_id in dest_ids), return_exceptions=True)
+        for dest_id, result in zip(dest_ids, results):
+            if isinstance(result, Exception):
+                print(f"⚠️ Destination {dest_id} non résolue: {result}")
+        return sum(1 for result in results if not isinstance(result, Exception))
+
+    def schedule_warm(self, dest_ids):
+        """Lance warm() en tâche de fond depuis la boucle asyncio (sans effet hors boucle)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        missing = [dest_id for dest_id in dict.fromkeys(dest_ids) if dest_id not in self._entries]
+        if not missing:
+            return None
+        return loop.create_task(self.warm(missing))
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['size'] = len(self._entries)
+        return stats
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,87 @@
+"""
+Suppression des doublons TeleFeed (paramètre drop_duplicates d'une redirection, désactivé par défaut)
+Un message dont le contenu normalisé (texte et médias) a déjà été redirigé
+récemment est écarté avant tout appel réseau
+"""
+
+import re
+import time
+import hashlib
+from collections import OrderedDict
+from media_fanout import media_key
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Texte comparé : casse ignorée, espaces consécutifs réduits"""
+    return WHITESPACE.sub(' ', text or '').strip().casefold()
+
+
+def content_hash(messages):
+    """Empreinte du contenu d'un message ou d'un album (texte normalisé et ids des médias)
+
+    Retourne None pour un contenu vide (jamais considéré comme doublon).
+    """
+    texts = []
+    media_ids = []
+    for message in messages:
+        text = normalize_text(getattr(message, 'raw_text', None))
+        if text:
+            texts.append(text)
+        key = media_key(getattr(message, 'media', None))
+        if key is not None:
+            media_ids.append(f"{key[0]}:{key[1]}")
+    if not texts and not media_ids:
+        return None
+    content = '\n'.join(texts) + '\0' + ','.join(media_ids)
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+
+
+class DuplicateFilter:
+    """Empreintes des messages redirigés pendant les window dernières secondes
+
+    Au plus max_entries empreintes sont conservées (les plus anciennes sont
+    oubliées en premier) : la mémoire reste bornée quel que soit le trafic.
+    """
+
+    def __init__(self, window=3600, max_entries=10000):
+        self.window = window
+        self.max_entries = max(1, max_entries)
+        # {empreinte: instant de la dernière occurrence}, de la plus ancienne à la plus récente
+        self._seen = OrderedDict()
+        self.checked = 0
+        self.hits = 0
+
+    def _expire(self, now):
+        while self._seen:
+            digest, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.window and len(self._seen) <= self.max_entries:
+                break
+            del self._seen[digest]
+
+    def is_duplicate(self, digest):
+        """Vrai si digest a été vu dans la fenêtre ; sinon l'enregistre"""
+        if digest is None:
+            return False
+        now = time.monotonic()
+        self._expire(now)
+        self.checked += 1
+        duplicate = digest in self._seen
+        if duplicate:
+            self.hits += 1
+            self._seen.move_to_end(digest)
+        self._seen[digest] = now
+        self._expire(now)
+        return duplicate
+
+    def get_stats(self):
+        return {
+            'checked': self.checked,
+            'hits': self.hits,
+            'hit_rate': round(self.hits / self.checked, 3) if self.checked else 0.0,
+            'size': len(self._seen)
+        }
+
+    def __len__(self):
+        return len(self._seen)
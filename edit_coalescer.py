@@ -0,0 +1,115 @@
+"""
+Éditions TeleFeed : regroupement des rafales d'éditions d'un même message et
+suppression des éditions qui ne changent pas le texte envoyé à une destination
+"""
+
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+
+def text_hash(text):
+    """Empreinte courte d'un texte envoyé"""
+    return hashlib.blake2b((text or '').encode('utf-8'), digest_size=8).digest()
+
+
+class PendingEdit:
+    """Dernière édition reçue d'un message source en attente d'envoi"""
+
+    __slots__ = ('event', 'received_at')
+
+    def __init__(self, event, received_at):
+        self.event = event
+        self.received_at = received_at
+
+
+class EditCoalescer:
+    """Regroupe les éditions d'un message source, par (chat, message)
+
+    La première édition ouvre une fenêtre de window secondes ; les éditions
+    suivantes du même message remplacent celle en attente, et seule la dernière
+    est transmise à on_edit(event, received_at) à la fin de la fenêtre.
+    received_at est l'instant de réception de la première édition.
+    """
+
+    def __init__(self, window, on_edit):
+        self.window = window
+        self.on_edit = on_edit
+        self._pending = {}
+        self._tasks = {}
+        self.stats = {
+            'received': 0,
+            'coalesced': 0
+        }
+
+    def add(self, event, received_at=None):
+        """Met en attente une édition (remplace l'édition en attente du même message)"""
+        key = (event.chat_id, event.id)
+        self.stats['received'] += 1
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.event = event
+            self.stats['coalesced'] += 1
+            return
+        now = received_at if received_at is not None else time.monotonic()
+        self._pending[key] = PendingEdit(event, now)
+        self._tasks[key] = asyncio.ensure_future(self._wait(key))
+
+    async def _wait(self, key):
+        await asyncio.sleep(self.window)
+        await self._dispatch(key)
+
+    async def _dispatch(self, key):
+        self._tasks.pop(key, None)
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        try:
+            await self.on_edit(pending.event, pending.received_at)
+        except Exception as e:
+            print(f"❌ Erreur traitement édition {key[1]} de {key[0]}: {e}")
+
+    async def flush(self):
+        """Transmet immédiatement les éditions en attente (arrêt du bot)"""
+        for key in list(self._pending):
+            task = self._tasks.get(key)
+            if task is not None:
+                task.cancel()
+            await self._dispatch(key)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['pending'] = len(self._pending)
+        return stats
+
+
+class SentTextHashes:
+    """Empreinte du dernier texte envoyé pour (chat source, message source, destination)
+
+    Au plus max_entries empreintes sont conservées, les moins récemment utilisées
+    étant oubliées en premier.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max(1, max_entries)
+        self._hashes = OrderedDict()
+        self.skipped = 0
+
+    def record(self, key, text):
+        self._hashes[key] = text_hash(text)
+        self._hashes.move_to_end(key)
+        while len(self._hashes) > self.max_entries:
+            self._hashes.popitem(last=False)
+
+    def unchanged(self, key, text):
+        """Vrai si text est identique au dernier texte envoyé pour key"""
+        previous = self._hashes.get(key)
+        if previous is None or previous != text_hash(text):
+            return False
+        self._hashes.move_to_end(key)
+        self.skipped += 1
+        return True
+
+    def __len__(self):
+        return len(self._hashes)
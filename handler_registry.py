@@ -0,0 +1,59 @@
+"""
+Registre des gestionnaires d'événements des clients TeleFeed
+Un seul gestionnaire par (compte, type d'événement) : réenregistrer remplace
+"""
+
+
+class HandlerRegistry:
+    """Gestionnaires enregistrés, indexés par (téléphone, type d'événement)
+
+    register() retire le gestionnaire précédent de la même clé (sur l'ancien
+    client s'il a changé) avant d'ajouter le nouveau : une restauration ou une
+    reconnexion répétée ne multiplie pas les traitements d'un message.
+    """
+
+    def __init__(self):
+        # {(téléphone, type d'événement): (client, callback)}
+        self._handlers = {}
+        self.replaced = 0
+
+    @staticmethod
+    def event_type(builder):
+        """Type d'événement d'un builder (instance ou classe)"""
+        return builder if isinstance(builder, type) else type(builder)
+
+    def register(self, phone_number, client, callback, builder):
+        """Enregistre callback pour builder sur client, en remplaçant le précédent ; True si remplacé"""
+        key = (str(phone_number), self.event_type(builder))
+        previous = self._handlers.get(key)
+        if previous is not None:
+            previous_client, previous_callback = previous
+            previous_client.remove_event_handler(previous_callback)
+            self.replaced += 1
+        client.add_event_handler(callback, builder)
+        self._handlers[key] = (client, callback)
+        return previous is not None
+
+    def unregister(self, phone_number):
+        """Retire tous les gestionnaires d'un compte ; retourne leur nombre"""
+        phone_number = str(phone_number)
+        keys = [key for key in self._handlers if key[0] == phone_number]
+        for key in keys:
+            client, callback = self._handlers.pop(key)
+            client.remove_event_handler(callback)
+        return len(keys)
+
+    def count(self, phone_number):
+        """Nombre de gestionnaires enregistrés pour un compte"""
+        phone_number = str(phone_number)
+        return sum(1 for key in self._handlers if key[0] == phone_number)
+
+    def handlers_per_client(self):
+        """{téléphone: gestionnaires réellement attachés au client} (contrôle des doublons)"""
+        clients = {}
+        for (phone_number, _), (client, _) in self._handlers.items():
+            clients[phone_number] = client
+        return {
+            phone_number: len(client.list_event_handlers())
+            for phone_number, client in clients.items()
+        }
@@ -0,0 +1,281 @@
+"""
+Cache partagé des licences utilisateurs (users.json)
+Une seule copie en mémoire par processus, rechargée quand le fichier change sur disque
+"""
+
+import json
+import os
+import time
+import heapq
+import asyncio
+import inspect
+from datetime import datetime
+
+# Date d'expiration illisible : la licence est considérée comme expirée
+INVALID_EXPIRY = datetime.min
+
+
+def licence_now():
+    """Horloge des licences : UTC naïf, la référence des dates 'expires' de users.json"""
+    return datetime.utcnow()
+
+
+def parse_expiry(value):
+    """Convertit la valeur 'expires' d'un utilisateur en datetime (None si absente)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        return INVALID_EXPIRY
+
+
+class LicenceCache:
+    """Copie en mémoire de users.json avec dates d'expiration pré-analysées
+
+    Le fichier n'est relu que si son mtime a changé, et son mtime n'est vérifié
+    qu'au plus une fois par CHECK_INTERVAL secondes : les vérifications de
+    licence sont de simples lectures de dictionnaires.
+
+    Un index secondaire est maintenu à chaque écriture : un tas (min-heap) des
+    expirations à venir et des paniers (statut, licence valide) → utilisateurs,
+    pour compter ou lister les utilisateurs d'un statut sans parcourir tout le
+    fichier. La validité est évaluée en UTC (licence_now), comme les dates écrites.
+    """
+
+    # Intervalle minimal (secondes) entre deux vérifications du fichier
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self, users_file='users.json'):
+        self.users_file = users_file
+        self._users = {}
+        self._expires = {}
+        self._heap = []
+        self._buckets = {}
+        self._user_bucket = {}
+        self._pending_payments = {}
+        self._wakeup = None
+        self._file_stamp = None
+        self._last_check = 0.0
+        self.reload()
+
+    @property
+    def users(self):
+        """Dictionnaire des utilisateurs (partagé par tous les gestionnaires)"""
+        self.refresh()
+        return self._users
+
+    def _stat_file(self):
+        try:
+            stat = os.stat(self.users_file)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Recharge le fichier s'il a été modifié par un autre processus"""
+        now = time.monotonic()
+        if now - self._last_check < self.CHECK_INTERVAL:
+            return
+        self._last_check = now
+
+        if self._stat_file() != self._file_stamp:
+            self.reload()
+
+    def reload(self):
+        """Relit users.json et reconstruit l'index des expirations"""
+        self._file_stamp = self._stat_file()
+        self._last_check = time.monotonic()
+
+        users = {}
+        if self._file_stamp is not None:
+            try:
+                with open(self.users_file, 'r', encoding='utf-8') as f:
+                    users = json.load(f)
+            except Exception as e:
+                print(f"Erreur lecture utilisateurs: {e}")
+                users = {}
+
+        self._users = users
+        self.reindex()
+
+    def reindex(self, *user_ids):
+        """Met à jour l'index des utilisateurs donnés (tous si aucun)"""
+        now = licence_now()
+        previous_next = self._heap[0][0] if self._heap else None
+
+        if not user_ids:
+            self._expires = {}
+            self._heap = []
+            self._buckets = {}
+            self._user_bucket = {}
+            self._pending_payments = {}
+            user_ids = list(self._users)
+
+        for user_id in user_ids:
+            self._index_user(str(user_id), now)
+
+        # Le tas garde des entrées périmées (suppression paresseuse) : le reconstruire s'il grossit trop
+        if len(self._heap) > 2 * len(self._users) + 64:
+            self._heap = [(expires_at, user_id) for user_id, expires_at in self._expires.items()
+                          if self._user_bucket[user_id][1]]
+            heapq.heapify(self._heap)
+
+        # Réveiller le sweeper si une échéance plus proche est apparue
+        if self._heap and self._wakeup is not None:
+            if previous_next is None or self._heap[0][0] < previous_next:
+                self._wakeup.set()
+
+    def _index_user(self, user_id, now):
+        previous_expiry = self._expires.pop(user_id, None)
+        previous_key = self._user_bucket.pop(user_id, None)
+        if previous_key is not None:
+            self._buckets[previous_key].discard(user_id)
+        self._pending_payments.pop(user_id, None)
+
+        data = self._users.get(user_id)
+        if not isinstance(data, dict):
+            return
+
+        expires_at = parse_expiry(data.get('expires'))
+        valid = expires_at is not None and expires_at > now
+        self._expires[user_id] = expires_at
+        if valid and not (previous_key and previous_key[1] and previous_expiry == expires_at):
+            heapq.heappush(self._heap, (expires_at, user_id))
+
+        key = (data.get('status'), valid)
+        self._buckets.setdefault(key, set()).add(user_id)
+        self._user_bucket[user_id] = key
+
+        pending = sum(1 for request in data.get('payment_requests') or []
+                      if request.get('status') == 'pending')
+        if pending:
+            self._pending_payments[user_id] = pending
+
+    def save(self, *user_ids):
+        """Écrit users.json et met à jour l'index (des utilisateurs donnés, ou de tous)"""
+        try:
+            payload = json.dumps(self._users, indent=2, ensure_ascii=False).encode('utf-8')
+            tmp_file = f"{self.users_file}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_file, self.users_file)
+        except Exception as e:
+            print(f"Erreur sauvegarde utilisateurs: {e}")
+            return False
+
+        self._file_stamp = self._stat_file()
+        self.reindex(*user_ids)
+        return True
+
+    def get(self, user_id):
+        """Données d'un utilisateur ou None"""
+        return self.users.get(str(user_id))
+
+    def expiry(self, user_id):
+        """Date d'expiration analysée (None si absente, INVALID_EXPIRY si illisible)"""
+        self.refresh()
+        return self._expires.get(str(user_id))
+
+    def expire_due(self, now=None):
+        """Marque comme échues les licences arrivées à expiration et retourne leurs IDs
+
+        Seules les entrées en tête du tas sont examinées : O(k log n) pour k échéances.
+        """
+        self.refresh()
+        now = now or licence_now()
+
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, user_id = heapq.heappop(self._heap)
+            key = self._user_bucket.get(user_id)
+            if key is None or not key[1] or self._expires.get(user_id) != expires_at:
+                continue  # Entrée périmée
+
+            self._buckets[key].discard(user_id)
+            new_key = (key[0], False)
+            self._buckets.setdefault(new_key, set()).add(user_id)
+            self._user_bucket[user_id] = new_key
+            expired.append(user_id)
+
+        return expired
+
+    def next_expiry(self):
+        """Prochaine échéance connue (None s'il n'y en a pas)"""
+        while self._heap:
+            expires_at, user_id = self._heap[0]
+            key = self._user_bucket.get(user_id)
+            if key is not None and key[1] and self._expires.get(user_id) == expires_at:
+                return expires_at
+            heapq.heappop(self._heap)
+        return None
+
+    def user_ids(self, status, valid=None):
+        """IDs des utilisateurs d'un statut (filtrés sur la validité de la licence si précisé)"""
+        if valid is None:
+            return self._buckets.get((status, True), set()) | self._buckets.get((status, False), set())
+        return set(self._buckets.get((status, valid), set()))
+
+    def count(self, status, valid=None):
+        """Nombre d'utilisateurs d'un statut, en O(1)"""
+        if valid is None:
+            return len(self._buckets.get((status, True), ())) + len(self._buckets.get((status, False), ()))
+        return len(self._buckets.get((status, valid), ()))
+
+    def pending_payment_users(self):
+        """{user_id: nombre de demandes de paiement en attente}"""
+        return dict(self._pending_payments)
+
+    def wakeup_event(self):
+        """Événement signalé quand une échéance plus proche est ajoutée"""
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+
+# Une instance par fichier pour tout le processus
+_caches = {}
+
+
+def get_licence_cache(users_file='users.json'):
+    """Retourne le cache partagé associé à un fichier d'utilisateurs"""
+    key = os.path.abspath(users_file)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = LicenceCache(users_file)
+        _caches[key] = cache
+    return cache
+
+
+async def run_expiry_sweeper(cache, on_expired, max_sleep=300):
+    """Tâche de fond : signale les licences au moment exact de leur expiration
+
+    on_expired(user_ids) est appelée (ou attendue si c'est une coroutine) avec
+    les IDs échus. Le sommeil est borné par max_sleep pour détecter les
+    modifications de users.json faites par un autre processus.
+    """
+    wakeup = cache.wakeup_event()
+    while True:
+        try:
+            wakeup.clear()
+            expired = cache.expire_due()
+            if expired:
+                result = on_expired(expired)
+                if inspect.isawaitable(result):
+                    await result
+
+            next_expiry = cache.next_expiry()
+            delay = max_sleep
+            if next_expiry is not None:
+                delay = min(max(0.0, (next_expiry - licence_now()).total_seconds()), max_sleep)
+
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Erreur sweeper des licences: {e}")
+            await asyncio.sleep(60)
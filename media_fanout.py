@@ -0,0 +1,244 @@
+"""
+Envoi des médias TeleFeed vers plusieurs destinations
+Un média source est d'abord réutilisé par sa référence de fichier ; si la
+destination la refuse, il est téléchargé une fois dans un cache local adressé
+par contenu puis uploadé une fois, et le fichier uploadé sert à toutes les destinations
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+from telethon.tl import types
+from telethon.errors import (
+    ChatForwardsRestrictedError,
+    FilePart0MissingError,
+    FilePartMissingError,
+    FilePartsInvalidError,
+    FileReferenceEmptyError,
+    FileReferenceExpiredError,
+    FileReferenceInvalidError,
+    MediaEmptyError
+)
+
+# Référence de fichier refusée pour la destination : le média doit être uploadé
+REUPLOAD_ERRORS = (
+    ChatForwardsRestrictedError,
+    FileReferenceEmptyError,
+    FileReferenceExpiredError,
+    FileReferenceInvalidError,
+    MediaEmptyError
+)
+
+# Fichier uploadé expiré côté serveur : il doit être uploadé à nouveau
+EXPIRED_UPLOAD_ERRORS = (
+    FilePart0MissingError,
+    FilePartMissingError,
+    FilePartsInvalidError
+)
+
+
+def media_key(media):
+    """Identifiant d'un média photo/document ('photo' ou 'document', id), None sinon"""
+    if isinstance(media, types.MessageMediaPhoto) and isinstance(media.photo, types.Photo):
+        return ('photo', media.photo.id)
+    if isinstance(media, types.MessageMediaDocument) and isinstance(media.document, types.Document):
+        return ('document', media.document.id)
+    return None
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Empreinte SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def uploaded_input_media(media, input_file):
+    """InputMedia d'envoi d'un fichier uploadé, avec le type et les attributs du média source"""
+    if isinstance(media, types.MessageMediaPhoto):
+        return types.InputMediaUploadedPhoto(file=input_file, spoiler=media.spoiler)
+    document = media.document
+    return types.InputMediaUploadedDocument(
+        file=input_file,
+        mime_type=document.mime_type,
+        attributes=document.attributes,
+        spoiler=media.spoiler
+    )
+
+
+class UploadedMedia:
+    """Média uploadé une fois, réutilisable pour chaque destination jusqu'à expires_at"""
+
+    __slots__ = ('digest', 'path', 'input_media', 'expires_at')
+
+    def __init__(self, digest, path, input_media, ttl):
+        self.digest = digest
+        self.path = path
+        self.input_media = input_media
+        self.expires_at = time.monotonic() + ttl
+
+
+class MediaFanout:
+    """Envois de médias d'un client
+
+    Les médias dont la référence a été refusée sont uploadés au plus une fois
+    par upload_ttl secondes : les envois simultanés d'un même média partagent
+    le même téléchargement et le même upload_file. Les fichiers téléchargés sont
+    nommés par leur empreinte SHA-256 dans cache_dir (un contenu identique n'est
+    uploadé qu'une fois) ; les plus anciens sont supprimés au-delà de max_cache_bytes.
+    """
+
+    def __init__(self, client, cache_dir, upload_ttl=1800, max_cache_bytes=500 * 1024 * 1024):
+        self.client = client
+        self.cache_dir = cache_dir
+        self.upload_ttl = upload_ttl
+        self.max_cache_bytes = max_cache_bytes
+        # {media_key: Future[UploadedMedia]} des médias à envoyer par upload
+        self._uploads = {}
+        # {empreinte: UploadedMedia}
+        self._by_digest = {}
+        # {media_key: (chemin, empreinte)} des médias déjà téléchargés dans le cache
+        self._downloaded = {}
+        self.stats = {
+            'by_reference': 0,
+            'by_upload': 0,
+            'downloads': 0,
+            'downloaded_bytes': 0,
+            'uploads': 0,
+            'cache_hits': 0
+        }
+
+    @staticmethod
+    def is_media(message):
+        """Vrai si le message porte une photo ou un document transférable"""
+        return media_key(getattr(message, 'media', None)) is not None
+
+    async def send(self, peer, message, caption='', reply_to=None):
+        """Envoie le média d'un message (légende caption) vers peer, en réponse à reply_to"""
+        if media_key(message.media) not in self._uploads:
+            try:
+                sent_message = await self.client.send_file(peer, message.media, caption=caption, reply_to=reply_to)
+                self.stats['by_reference'] += 1
+                return sent_message
+            except REUPLOAD_ERRORS as e:
+                print(f"📤 Référence du média refusée ({e.__class__.__name__}), upload unique")
+        return await self._send_uploaded(peer, [message], caption, reply_to)
+
+    async def send_album(self, peer, messages, captions, reply_to=None):
+        """Envoie les médias de plusieurs messages en un album (une légende par partie)"""
+        if all(media_key(message.media) not in self._uploads for message in messages):
+            try:
+                sent_messages = await self.client.send_file(
+                    peer, [message.media for message in messages], caption=captions, reply_to=reply_to
+                )
+                self.stats['by_reference'] += 1
+                return sent_messages
+            except REUPLOAD_ERRORS as e:
+                print(f"📤 Références de l'album refusées ({e.__class__.__name__}), upload unique")
+        return await self._send_uploaded(peer, messages, captions, reply_to)
+
+    async def _send_uploaded(self, peer, messages, caption, reply_to=None):
+        for attempt in range(2):
+            uploaded = [await self.uploaded(message) for message in messages]
+            files = [media.input_media for media in uploaded]
+            try:
+                sent = await self.client.send_file(
+                    peer, files if len(files) > 1 else files[0], caption=caption, reply_to=reply_to
+                )
+                self.stats['by_upload'] += 1
+                return sent
+            except EXPIRED_UPLOAD_ERRORS:
+                if attempt:
+                    raise
+                for message, media in zip(messages, uploaded):
+                    self._forget(media_key(message.media), media)
+
+    async def uploaded(self, message):
+        """UploadedMedia du média d'un message (téléchargé et uploadé au premier appel)"""
+        key = media_key(message.media)
+        future = self._uploads.get(key)
+        if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+            if future.result().expires_at <= time.monotonic():
+                self._forget(key, future.result())
+                future = None
+        if future is None:
+            future = asyncio.ensure_future(self._upload(message))
+            self._uploads[key] = future
+            future.add_done_callback(lambda done: self._upload_done(key, done))
+        return await asyncio.shield(future)
+
+    def _upload_done(self, key, future):
+        # Échec : le prochain envoi retentera le téléchargement et l'upload
+        if (future.cancelled() or future.exception() is not None) and self._uploads.get(key) is future:
+            del self._uploads[key]
+
+    def _forget(self, key, media):
+        future = self._uploads.get(key)
+        if future is not None and future.done() and not future.cancelled() \
+                and future.exception() is None and future.result() is media:
+            del self._uploads[key]
+        if self._by_digest.get(media.digest) is media:
+            del self._by_digest[media.digest]
+
+    async def _upload(self, message):
+        key = media_key(message.media)
+        downloaded = self._downloaded.get(key)
+        if downloaded is not None and os.path.exists(downloaded[0]):
+            path, digest = downloaded
+            os.utime(path)
+        else:
+            path, digest = self._downloaded[key] = await self._download(message)
+        uploaded = self._by_digest.get(digest)
+        if uploaded is not None and uploaded.expires_at > time.monotonic():
+            return uploaded
+
+        input_file = await self.client.upload_file(path, file_name=message.file.name or os.path.basename(path))
+        uploaded = UploadedMedia(digest, path, uploaded_input_media(message.media, input_file), self.upload_ttl)
+        self._by_digest[digest] = uploaded
+        self.stats['uploads'] += 1
+        return uploaded
+
+    async def _download(self, message):
+        """Télécharge le média dans le cache ; retourne (chemin, empreinte)"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = await self.client.download_media(
+            message, file=os.path.join(self.cache_dir, f".{uuid.uuid4().hex}")
+        )
+        self.stats['downloads'] += 1
+        self.stats['downloaded_bytes'] += os.path.getsize(temp_path)
+
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, file_digest, temp_path)
+        path = os.path.join(self.cache_dir, digest + os.path.splitext(temp_path)[1])
+        if os.path.exists(path):
+            os.remove(temp_path)
+            self.stats['cache_hits'] += 1
+        else:
+            os.replace(temp_path, path)
+        os.utime(path)
+        self._evict(keep=path)
+        return path, digest
+
+    def _evict(self, keep):
+        """Supprime les fichiers les plus anciens du cache au-delà de max_cache_bytes"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.startswith('.'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            if path != keep:
+                os.remove(path)
+                total -= size
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['uploaded'] = len(self._by_digest)
+        return stats
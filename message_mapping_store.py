@@ -0,0 +1,443 @@
+"""
+Stockage des correspondances de messages TeleFeed (message source → message destination)
+Deux backends interchangeables : JSON (historique) et SQLite indexé avec rétention
+"""
+
+import os
+import sqlite3
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from store_serializers import load_file
+from telefeed_journal import MutationJournal, JOURNAL_SUFFIX, set_record, delete_record
+
+
+def journal_path_for(json_path):
+    """Journal de mutations associé au fichier JSON du mapping"""
+    return os.path.splitext(json_path)[0] + JOURNAL_SUFFIX
+
+
+def parse_source_key(source_key):
+    """Découpe une clé historique "{chat_id}_{msg_id}" en (chat_id, msg_id)"""
+    chat_id, msg_id = source_key.rsplit('_', 1)
+    return int(chat_id), int(msg_id)
+
+
+class _SourceColumns:
+    """Colonnes triées (message source, index du chat destination, message destination) d'un chat source"""
+
+    __slots__ = ('source_msgs', 'dest_chats', 'dest_msgs')
+
+    def __init__(self):
+        self.source_msgs = array('q')
+        self.dest_chats = array('q')
+        self.dest_msgs = array('q')
+
+
+class CompactMappingTable:
+    """Représentation compacte en mémoire du mapping des messages
+
+    Une correspondance occupe trois entiers de 8 octets dans des array('q')
+    triés par (message source, chat destination) pour chaque chat source, au
+    lieu d'une clé texte et d'un dictionnaire par message. Les recherches se
+    font par bisection (O(log n)) ; les messages arrivant dans l'ordre, un
+    ajout est presque toujours un simple append.
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._dest_chat_ids = []
+        self._dest_chat_index = {}
+        self._count = 0
+
+    def _dest_index(self, dest_chat):
+        index = self._dest_chat_index.get(dest_chat)
+        if index is None:
+            index = len(self._dest_chat_ids)
+            self._dest_chat_ids.append(dest_chat)
+            self._dest_chat_index[dest_chat] = index
+        return index
+
+    def add(self, source_chat, source_msg, dest_chat, dest_msg):
+        columns = self._sources.get(source_chat)
+        if columns is None:
+            columns = self._sources[source_chat] = _SourceColumns()
+        dest_index = self._dest_index(dest_chat)
+
+        size = len(columns.source_msgs)
+        if size == 0 or (source_msg, dest_index) > (columns.source_msgs[-1], columns.dest_chats[-1]):
+            columns.source_msgs.append(source_msg)
+            columns.dest_chats.append(dest_index)
+            columns.dest_msgs.append(dest_msg)
+            self._count += 1
+            return
+
+        position = bisect_left(columns.source_msgs, source_msg)
+        while position < size and columns.source_msgs[position] == source_msg:
+            if columns.dest_chats[position] == dest_index:
+                columns.dest_msgs[position] = dest_msg
+                return
+            if columns.dest_chats[position] > dest_index:
+                break
+            position += 1
+
+        columns.source_msgs.insert(position, source_msg)
+        columns.dest_chats.insert(position, dest_index)
+        columns.dest_msgs.insert(position, dest_msg)
+        self._count += 1
+
+    def get(self, source_chat, source_msg, dest_chat):
+        columns = self._sources.get(source_chat)
+        dest_index = self._dest_chat_index.get(dest_chat)
+        if columns is None or dest_index is None:
+            return None
+
+        size = len(columns.source_msgs)
+        position = bisect_left(columns.source_msgs, source_msg)
+        while position < size and columns.source_msgs[position] == source_msg:
+            if columns.dest_chats[position] == dest_index:
+                return columns.dest_msgs[position]
+            position += 1
+        return None
+
+    def get_all(self, source_chat, source_msg):
+        columns = self._sources.get(source_chat)
+        if columns is None:
+            return {}
+
+        dests = {}
+        size = len(columns.source_msgs)
+        position = bisect_left(columns.source_msgs, source_msg)
+        while position < size and columns.source_msgs[position] == source_msg:
+            dests[self._dest_chat_ids[columns.dest_chats[position]]] = columns.dest_msgs[position]
+            position += 1
+        return dests
+
+    def find_by_source_msg(self, source_msg):
+        """Recherche inverse {chat source: {chat destination: message destination}} d'un id de message
+
+        Une bisection par chat source : les chats source sont peu nombreux.
+        """
+        found = {}
+        for source_chat in self._sources:
+            dests = self.get_all(source_chat, source_msg)
+            if dests:
+                found[source_chat] = dests
+        return found
+
+    def remove(self, source_chat, source_msg):
+        """Supprime les correspondances d'un message source ; retourne leur nombre"""
+        columns = self._sources.get(source_chat)
+        if columns is None:
+            return 0
+
+        start = bisect_left(columns.source_msgs, source_msg)
+        end = bisect_right(columns.source_msgs, source_msg, start)
+        if start == end:
+            return 0
+        del columns.source_msgs[start:end]
+        del columns.dest_chats[start:end]
+        del columns.dest_msgs[start:end]
+        if not columns.source_msgs:
+            del self._sources[source_chat]
+        self._count -= end - start
+        return end - start
+
+    def items(self):
+        """Itère sur (chat source, message source, chat destination, message destination)"""
+        for source_chat, columns in self._sources.items():
+            for source_msg, dest_index, dest_msg in zip(columns.source_msgs, columns.dest_chats, columns.dest_msgs):
+                yield source_chat, source_msg, self._dest_chat_ids[dest_index], dest_msg
+
+    def nbytes(self):
+        """Octets occupés par les colonnes"""
+        return sum(
+            columns.source_msgs.itemsize * len(columns.source_msgs) * 3
+            for columns in self._sources.values()
+        )
+
+    def __len__(self):
+        return self._count
+
+
+class JsonMessageMapping:
+    """Backend historique : fichier {"chat_msg": {"dest": id}} réécrit en entier
+
+    En mémoire, les correspondances sont gardées dans une CompactMappingTable ;
+    le format JSON n'est reconstruit qu'au moment de la sauvegarde. Avec un
+    journal, chaque ajout y est écrit en une ligne et le fichier complet n'est
+    réécrit qu'à la compaction.
+    """
+
+    # Le contenu est sauvegardé par TeleFeedManager.save_all_data
+    persists_itself = False
+
+    def __init__(self, data=None, journal=None):
+        self.table = CompactMappingTable()
+        self.journal = journal
+
+        data = data or {}
+        if journal is not None:
+            journal.replay(data)
+
+        rows = []
+        for source_key, dests in data.items():
+            try:
+                source_chat, source_msg = parse_source_key(source_key)
+            except ValueError:
+                continue
+            for dest_chat, dest_msg in dests.items():
+                rows.append((source_chat, source_msg, int(dest_chat), int(dest_msg)))
+
+        # Insertion dans l'ordre pour ne faire que des appends
+        rows.sort()
+        for row in rows:
+            self.table.add(*row)
+
+    def get(self, source_chat, source_msg, dest_chat):
+        """Retourne l'ID du message destination ou None"""
+        return self.table.get(source_chat, source_msg, dest_chat)
+
+    def get_all(self, source_chat, source_msg):
+        """Retourne {dest_chat: dest_msg} pour un message source"""
+        return self.table.get_all(source_chat, source_msg)
+
+    def add(self, source_chat, source_msg, dest_chat, dest_msg):
+        """Enregistre une correspondance"""
+        self.table.add(source_chat, source_msg, dest_chat, dest_msg)
+        if self.journal is not None:
+            self.journal.append(set_record([f"{source_chat}_{source_msg}", str(dest_chat)], dest_msg))
+
+    def find_by_source_msg(self, source_msg):
+        """Retourne {chat source: {dest_chat: dest_msg}} pour un id de message source"""
+        return self.table.find_by_source_msg(source_msg)
+
+    def remove(self, source_chat, source_msg):
+        """Supprime les correspondances d'un message source ; retourne leur nombre"""
+        removed = self.table.remove(source_chat, source_msg)
+        if removed and self.journal is not None:
+            self.journal.append(delete_record([f"{source_chat}_{source_msg}"]))
+        return removed
+
+    def commit(self):
+        """Chaque mutation est déjà journalisée : rien à valider"""
+
+    def evict_expired(self):
+        """Pas d'horodatage dans le format JSON : aucune éviction possible"""
+        return 0
+
+    def to_dict(self):
+        """Données au format du fichier telefeed_message_mapping.json"""
+        data = {}
+        for source_chat, source_msg, dest_chat, dest_msg in self.table.items():
+            data.setdefault(f"{source_chat}_{source_msg}", {})[str(dest_chat)] = dest_msg
+        return data
+
+    def __len__(self):
+        return len(self.table)
+
+
+class SQLiteMessageMapping:
+    """Backend SQLite : une ligne par (chat source, message source, chat destination)
+
+    La clé primaire sert d'index pour les recherches d'édition (O(log n)), chaque
+    envoi est une insertion d'une seule ligne, et un index sur created_at permet
+    d'évincer les lignes plus anciennes que la fenêtre de rétention. Un index sur
+    source_msg sert aux suppressions dont le chat source est inconnu.
+
+    Les insertions et suppressions ne sont pas validées une à une : commit()
+    les valide en une seule transaction, appelé par la sauvegarde différée
+    du gestionnaire (et par close()).
+    """
+
+    persists_itself = True
+
+    # Nombre d'insertions entre deux évictions
+    EVICT_EVERY = 500
+
+    def __init__(self, db_path, retention_days=30):
+        self.db_path = db_path
+        self.retention_seconds = retention_days * 86400 if retention_days else None
+        self._inserts_since_evict = 0
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS message_mapping ('
+            ' source_chat INTEGER NOT NULL,'
+            ' source_msg INTEGER NOT NULL,'
+            ' dest_chat INTEGER NOT NULL,'
+            ' dest_msg INTEGER NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' PRIMARY KEY (source_chat, source_msg, dest_chat)'
+            ') WITHOUT ROWID'
+        )
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_message_mapping_created_at '
+            'ON message_mapping (created_at)'
+        )
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_message_mapping_source_msg '
+            'ON message_mapping (source_msg)'
+        )
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.commit()
+
+        self.evict_expired()
+
+    def get(self, source_chat, source_msg, dest_chat):
+        """Retourne l'ID du message destination ou None"""
+        row = self.conn.execute(
+            'SELECT dest_msg FROM message_mapping '
+            'WHERE source_chat = ? AND source_msg = ? AND dest_chat = ?',
+            (source_chat, source_msg, dest_chat)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_all(self, source_chat, source_msg):
+        """Retourne {dest_chat: dest_msg} pour un message source"""
+        rows = self.conn.execute(
+            'SELECT dest_chat, dest_msg FROM message_mapping '
+            'WHERE source_chat = ? AND source_msg = ?',
+            (source_chat, source_msg)
+        ).fetchall()
+        return dict(rows)
+
+    def find_by_source_msg(self, source_msg):
+        """Retourne {chat source: {dest_chat: dest_msg}} pour un id de message source"""
+        found = {}
+        for source_chat, dest_chat, dest_msg in self.conn.execute(
+            'SELECT source_chat, dest_chat, dest_msg FROM message_mapping WHERE source_msg = ?',
+            (source_msg,)
+        ):
+            found.setdefault(source_chat, {})[dest_chat] = dest_msg
+        return found
+
+    def remove(self, source_chat, source_msg):
+        """Supprime les correspondances d'un message source ; retourne leur nombre"""
+        cursor = self.conn.execute(
+            'DELETE FROM message_mapping WHERE source_chat = ? AND source_msg = ?',
+            (source_chat, source_msg)
+        )
+        return cursor.rowcount
+
+    def add(self, source_chat, source_msg, dest_chat, dest_msg):
+        """Enregistre une correspondance (insertion d'une seule ligne)"""
+        self.conn.execute(
+            'INSERT OR REPLACE INTO message_mapping '
+            '(source_chat, source_msg, dest_chat, dest_msg, created_at) VALUES (?, ?, ?, ?, ?)',
+            (source_chat, source_msg, dest_chat, dest_msg, time.time())
+        )
+
+        self._inserts_since_evict += 1
+        if self._inserts_since_evict >= self.EVICT_EVERY:
+            self.evict_expired()
+
+    def commit(self):
+        """Valide les correspondances ajoutées ou supprimées depuis le dernier commit"""
+        if self.conn.in_transaction:
+            self.conn.commit()
+
+    def evict_expired(self):
+        """Supprime les correspondances plus anciennes que la fenêtre de rétention"""
+        self._inserts_since_evict = 0
+        if not self.retention_seconds:
+            return 0
+
+        cursor = self.conn.execute(
+            'DELETE FROM message_mapping WHERE created_at < ?',
+            (time.time() - self.retention_seconds,)
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def migrate_from_json(self, json_path):
+        """Importe une seule fois le fichier JSON historique
+
+        Retourne le nombre de correspondances importées (0 si déjà migré).
+        """
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return 0
+
+        try:
+            data = load_file(json_path)
+        except Exception as e:
+            print(f"Erreur lors de la migration {json_path}: {e}")
+            return 0
+        MutationJournal(journal_path_for(json_path)).replay(data)
+
+        # Les anciennes entrées n'ont pas de date : elles démarrent la fenêtre de rétention
+        now = time.time()
+        rows = []
+        for source_key, dests in data.items():
+            try:
+                source_chat, source_msg = parse_source_key(source_key)
+            except ValueError:
+                continue
+            for dest_chat, dest_msg in dests.items():
+                rows.append((source_chat, source_msg, int(dest_chat), int(dest_msg), now))
+
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO message_mapping '
+            '(source_chat, source_msg, dest_chat, dest_msg, created_at) VALUES (?, ?, ?, ?, ?)',
+            rows
+        )
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+            (str(time.time()),)
+        )
+        self.conn.commit()
+        print(f"📦 Migration du mapping JSON vers SQLite : {len(rows)} correspondances")
+        return len(rows)
+
+    def to_dict(self):
+        """Export au format du fichier JSON historique"""
+        data = {}
+        for source_chat, source_msg, dest_chat, dest_msg in self.conn.execute(
+            'SELECT source_chat, source_msg, dest_chat, dest_msg FROM message_mapping'
+        ):
+            data.setdefault(f"{source_chat}_{source_msg}", {})[str(dest_chat)] = dest_msg
+        return data
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM message_mapping').fetchone()[0]
+
+
+def backup_database(db_path, dest_path):
+    """Copie cohérente d'une base SQLite en WAL (API de sauvegarde de SQLite)
+
+    Copier le seul fichier .db oublierait les transactions encore dans le
+    fichier -wal ; la copie obtenue est autonome (sans -wal ni -shm).
+    """
+    source = sqlite3.connect(db_path)
+    try:
+        dest = sqlite3.connect(dest_path)
+        try:
+            source.backup(dest)
+        finally:
+            dest.close()
+    finally:
+        source.close()
+
+
+def open_message_mapping(backend, json_path, db_path, retention_days=30):
+    """Ouvre le backend de mapping demandé ('sqlite' ou 'json')"""
+    if backend == 'sqlite':
+        mapping = SQLiteMessageMapping(db_path, retention_days)
+        mapping.migrate_from_json(json_path)
+        return mapping
+
+    if backend != 'json':
+        print(f"⚠️ Backend de mapping inconnu '{backend}', utilisation de JSON")
+
+    try:
+        data = load_file(json_path)
+    except Exception as e:
+        print(f"Erreur lors du chargement {json_path}: {e}")
+        data = {}
+    return JsonMessageMapping(data, MutationJournal(journal_path_for(json_path)))
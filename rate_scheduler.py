@@ -0,0 +1,138 @@
+"""
+Cadencement des envois Telegram par seaux à jetons (compte et chat)
+Les envois sont espacés avant de déclencher un FloodWait ; un FloodWait ne met
+en pause que le chat concerné, et l'envoi est conservé puis retenté
+"""
+
+import time
+import asyncio
+from telethon.errors.rpcbaseerrors import FloodError
+
+
+def flood_wait_seconds(error):
+    """Attente imposée par le serveur pour une erreur FloodWait / SlowModeWait (None sinon)"""
+    if isinstance(error, FloodError):
+        return getattr(error, 'seconds', None)
+    return None
+
+
+class TokenBucket:
+    """Seau de capacity jetons rechargé de rate jetons par seconde"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'paused_until')
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now):
+        """Secondes avant qu'un jeton soit disponible (0 si tout de suite)"""
+        self._refill(now)
+        wait = max(0.0, self.paused_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def consume(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, seconds, now):
+        """Vide le seau et bloque sa recharge pendant seconds secondes"""
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+    def is_paused(self, now):
+        return self.paused_until > now
+
+
+class RateScheduler:
+    """Budgets d'envoi d'un compte : un seau global et un seau par chat
+
+    acquire(chat_id) attend qu'un jeton soit disponible dans les deux seaux.
+    run(chat_id, send) y ajoute la gestion des FloodWait : le seau du chat est
+    mis en pause pour la durée indiquée par le serveur, puis l'envoi est retenté
+    (il n'est jamais abandonné). Les autres chats du compte continuent d'être servis.
+    """
+
+    def __init__(self, account_rate=25.0, account_burst=25, chat_rate=20 / 60, chat_burst=20):
+        self.account = TokenBucket(account_rate, account_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._chats = {}
+        self.stats = {
+            'sent': 0,
+            'throttled': 0,
+            'throttled_seconds': 0.0,
+            'flood_waits': 0,
+            'flood_wait_seconds': 0
+        }
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def acquire(self, chat_id):
+        """Attend le droit d'envoyer un message vers chat_id"""
+        chat_bucket = self._chat_bucket(chat_id)
+        throttled = False
+        while True:
+            now = time.monotonic()
+            wait = max(self.account.wait_time(now), chat_bucket.wait_time(now))
+            if wait <= 0:
+                self.account.consume(now)
+                chat_bucket.consume(now)
+                return
+            if not throttled:
+                throttled = True
+                self.stats['throttled'] += 1
+            self.stats['throttled_seconds'] += wait
+            await asyncio.sleep(wait)
+
+    def flood_wait(self, chat_id, seconds):
+        """Met en pause le seau d'un chat après un FloodWait"""
+        self._chat_bucket(chat_id).pause(seconds, time.monotonic())
+        self.stats['flood_waits'] += 1
+        self.stats['flood_wait_seconds'] += seconds
+
+    async def run(self, chat_id, send):
+        """Exécute send() (fonction async) dans le budget de chat_id, retentée après chaque FloodWait"""
+        while True:
+            await self.acquire(chat_id)
+            try:
+                result = await send()
+            except Exception as e:
+                seconds = flood_wait_seconds(e)
+                if seconds is None:
+                    raise
+                print(f"⏳ FloodWait de {seconds}s pour {chat_id} : envoi conservé et retenté")
+                self.flood_wait(chat_id, seconds)
+                continue
+            self.stats['sent'] += 1
+            return result
+
+    def paused_chats(self):
+        """{chat_id: secondes de pause restantes}"""
+        now = time.monotonic()
+        return {
+            chat_id: round(bucket.paused_until - now, 1)
+            for chat_id, bucket in self._chats.items()
+            if bucket.is_paused(now)
+        }
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['throttled_seconds'] = round(stats['throttled_seconds'], 1)
+        stats['paused_chats'] = self.paused_chats()
+        return stats
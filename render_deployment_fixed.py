@@ -6,17 +6,21 @@ Correction : Système de persistance Redis/Variables d'environnement pour sessio
 """
 
 import os
-import json
 import asyncio
 import logging
 from datetime import datetime, timedelta
 from telethon import TelegramClient, events, Button
-from telethon.errors import SessionPasswordNeededError, FloodWaitError
+from telethon.errors import SessionPasswordNeededError
 from flask import Flask, request, jsonify
 import threading
 import time
+import functools
 import base64
 import pickle
+from licence_cache import get_licence_cache, run_expiry_sweeper, licence_now
+from rate_scheduler import RateScheduler
+from telefeed_dispatcher import OutboundDispatcher
+from handler_registry import HandlerRegistry
 
 # Configuration
 API_ID = int(os.getenv('API_ID', '29177661'))
@@ -24,6 +28,14 @@ API_HASH = os.getenv('API_HASH', 'a8639172fa8d35dbfd8ea46286d349ab')
 BOT_TOKEN = os.getenv('BOT_TOKEN', '7573497633:AAHk9K15yTCiJP-zruJrc9v8eK8I9XhjyH4')
 ADMIN_ID = int(os.getenv('ADMIN_ID', '1190237801'))
 
+# Envois TeleFeed : mêmes réglages que telefeed_commands (concurrence, files, budgets)
+FANOUT_CONCURRENCY = int(os.getenv('TELEFEED_FANOUT_CONCURRENCY', '8'))
+OUTBOUND_QUEUE_SIZE = int(os.getenv('TELEFEED_OUTBOUND_QUEUE_SIZE', '100'))
+OUTBOUND_OVERFLOW_POLICY = os.getenv('TELEFEED_OUTBOUND_OVERFLOW_POLICY', 'block')
+ACCOUNT_SEND_RATE = float(os.getenv('TELEFEED_ACCOUNT_SEND_RATE', '25'))
+CHAT_SENDS_PER_MINUTE = float(os.getenv('TELEFEED_CHAT_SENDS_PER_MINUTE', '20'))
+OUTBOUND_DRAIN_TIMEOUT = float(os.getenv('TELEFEED_OUTBOUND_DRAIN_TIMEOUT', '10'))
+
 # Configuration Flask
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -102,32 +114,42 @@ class TelefootBot:
     
     def __init__(self):
         self.client = TelegramClient('telefoot_bot', API_ID, API_HASH)
-        self.users = self.load_users()
+        self.licence_cache = get_licence_cache('users.json')
         self.telefeed_sessions = PersistentStorage.load_sessions()
         self.telefeed_redirections = PersistentStorage.load_redirections()
         self.telefeed_clients = {}
+        self.dispatchers = {}
+        self.handler_registry = HandlerRegistry()
         self.running = False
         self.last_heartbeat = datetime.now()
         
+    @property
+    def users(self):
+        """Utilisateurs partagés via le cache de licences"""
+        return self.licence_cache.users
+    
     def load_users(self):
-        """Charge les utilisateurs"""
-        try:
-            if os.path.exists('users.json'):
-                with open('users.json', 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except:
-            return {}
+        """Recharge les utilisateurs"""
+        self.licence_cache.reload()
+        return self.users
     
-    def save_users(self):
+    def save_users(self, *user_ids):
         """Sauvegarde les utilisateurs"""
-        try:
-            with open('users.json', 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, indent=2, ensure_ascii=False)
+        if self.licence_cache.save(*user_ids):
             return True
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde utilisateurs : {e}")
-            return False
+        logger.error("Erreur sauvegarde utilisateurs")
+        return False
+    
+    def expire_licences(self, user_ids):
+        """Passe au statut 'expired' les licences actives arrivées à échéance"""
+        expired = [user_id for user_id in user_ids
+                   if self.users.get(user_id, {}).get('status') == 'active']
+        for user_id in expired:
+            self.users[user_id]['status'] = 'expired'
+        
+        if expired:
+            self.save_users(*expired)
+            logger.info(f"Licences expirées : {', '.join(expired)}")
     
     async def start(self):
         """Démarre le bot"""
@@ -147,6 +169,9 @@ class TelefootBot:
             # Démarrer le heartbeat
             asyncio.create_task(self.heartbeat_loop())
             
+            # Expirer les licences dès leur échéance
+            asyncio.create_task(run_expiry_sweeper(self.licence_cache, self.expire_licences))
+            
         except Exception as e:
             logger.error(f"Erreur démarrage bot : {e}")
             raise
@@ -159,13 +184,15 @@ class TelefootBot:
             
             for phone_number, session_data in sessions.items():
                 try:
-                    # Créer le client TeleFeed
-                    client = TelegramClient(f'telefeed_{phone_number}', API_ID, API_HASH)
-                    
-                    # Démarrer le client
-                    await client.start()
+                    client = self.telefeed_clients.get(phone_number)
+                    if client is None or not client.is_connected():
+                        # Créer le client TeleFeed
+                        client = TelegramClient(f'telefeed_{phone_number}', API_ID, API_HASH)
+                        
+                        # Démarrer le client
+                        await client.start()
                     
-                    # Configurer les handlers de redirection
+                    # Configurer les handlers de redirection (remplace ceux d'une restauration précédente)
                     await self.setup_redirection_handlers(client, phone_number)
                     
                     # Stocker le client
@@ -189,22 +216,41 @@ class TelefootBot:
             logger.error(f"Erreur restauration sessions TeleFeed : {e}")
     
     async def setup_redirection_handlers(self, client, phone_number):
-        """Configure les handlers de redirection pour un client TeleFeed"""
+        """Configure les handlers de redirection pour un client TeleFeed (un seul par type d'événement)"""
         
-        @client.on(events.NewMessage)
         async def handle_new_message(event):
             await self.process_telefeed_message(event, phone_number, False)
         
-        @client.on(events.MessageEdited)
         async def handle_edited_message(event):
             await self.process_telefeed_message(event, phone_number, True)
         
-        logger.info(f"Handlers de redirection configurés pour {phone_number}")
+        self.handler_registry.register(phone_number, client, handle_new_message, events.NewMessage())
+        self.handler_registry.register(phone_number, client, handle_edited_message, events.MessageEdited())
+        
+        logger.info(f"Handlers de redirection configurés pour {phone_number} "
+                    f"({self.handler_registry.count(phone_number)} enregistrés)")
+    
+    def dispatcher(self, phone_number):
+        """Files d'envoi d'un compte TeleFeed (un FloodWait ne bloque que la file du chat)"""
+        dispatcher = self.dispatchers.get(phone_number)
+        if dispatcher is None:
+            dispatcher = self.dispatchers[phone_number] = OutboundDispatcher(
+                FANOUT_CONCURRENCY,
+                OUTBOUND_QUEUE_SIZE,
+                OUTBOUND_OVERFLOW_POLICY,
+                RateScheduler(
+                    ACCOUNT_SEND_RATE, ACCOUNT_SEND_RATE,
+                    CHAT_SENDS_PER_MINUTE / 60, CHAT_SENDS_PER_MINUTE
+                )
+            )
+        return dispatcher
     
     async def process_telefeed_message(self, event, phone_number, is_edit=False):
         """Traite un message pour redirection TeleFeed"""
         try:
+            received_at = time.monotonic()
             redirections = self.telefeed_redirections.get(phone_number, {})
+            sends = []
             
             for redir_id, redir_data in redirections.items():
                 if not redir_data.get('active', True):
@@ -223,12 +269,16 @@ class TelefootBot:
                                 # Message édité - à implémenter selon besoins
                                 logger.info(f"Message édité détecté de {event.chat_id} vers {dest_id}")
                             else:
-                                # Nouveau message - redirection
-                                await client.send_message(dest_id, text)
-                                logger.info(f"Message redirigé de {event.chat_id} vers {dest_id}")
+                                # Nouveau message - mis en file : l'envoi est cadencé et retenté
+                                # après un FloodWait par le worker de la destination
+                                sends.append((dest_id, functools.partial(client.send_message, dest_id, text)))
                                 
                         except Exception as e:
                             logger.error(f"Erreur redirection : {e}")
+            
+            if sends:
+                await self.dispatcher(phone_number).submit(received_at, sends)
+                logger.info(f"Message de {event.chat_id} mis en file vers {len(sends)} destination(s)")
                             
         except Exception as e:
             logger.error(f"Erreur traitement message TeleFeed : {e}")
@@ -249,7 +299,7 @@ class TelefootBot:
                     'first_name': user_info.first_name,
                     'registered_at': datetime.now().isoformat()
                 }
-                self.save_users()
+                self.save_users(user_id)
                 
                 # Notifier l'admin
                 await self.client.send_message(
@@ -364,7 +414,7 @@ class TelefootBot:
                     return
                 
                 # Activer l'utilisateur
-                expires = datetime.now() + timedelta(days=duration_days)
+                expires = licence_now() + timedelta(days=duration_days)
                 
                 self.users[user_id] = {
                     **self.users.get(user_id, {}),
@@ -374,14 +424,14 @@ class TelefootBot:
                     'activated_at': datetime.now().isoformat()
                 }
                 
-                self.save_users()
+                self.save_users(user_id)
                 
                 # Notifier l'utilisateur
                 await self.client.send_message(
                     int(user_id),
                     f"🎉 **Votre licence a été activée !**\n\n"
                     f"📋 **Plan :** {plan.capitalize()}\n"
-                    f"⏰ **Expire le :** {expires.strftime('%Y-%m-%d %H:%M')}\n\n"
+                    f"⏰ **Expire le :** {expires.strftime('%Y-%m-%d %H:%M')} UTC\n\n"
                     f"🚀 **Commandes disponibles :**\n"
                     f"• `/menu` - Interface utilisateur\n"
                     f"• `/connect` - Connecter un compte\n"
@@ -413,12 +463,10 @@ class TelefootBot:
             if not user_data or user_data.get('status') != 'active':
                 return False
             
-            # Vérifier expiration
-            expires = user_data.get('expires')
-            if expires:
-                expire_date = datetime.fromisoformat(expires)
-                if datetime.now() > expire_date:
-                    return False
+            # Vérifier expiration (date analysée par le cache de licences)
+            expire_date = self.licence_cache.expiry(user_id)
+            if expire_date is not None and licence_now() > expire_date:
+                return False
             
             return True
         except:
@@ -450,6 +498,7 @@ class TelefootBot:
                 # Vérifier les sessions TeleFeed
                 active_sessions = len([s for s in self.telefeed_sessions.values() if s.get('connected', False)])
                 logger.info(f"Sessions TeleFeed actives : {active_sessions}")
+                logger.info(f"Handlers par client TeleFeed : {self.handler_registry.handlers_per_client()}")
                 
                 await asyncio.sleep(300)  # 5 minutes
                 
@@ -461,6 +510,26 @@ class TelefootBot:
         """Arrête le bot"""
         self.running = False
         
+        # Écrire les données TeleFeed encore en attente
+        try:
+            from telefeed_commands import flush_pending_writes
+            await flush_pending_writes()
+        except Exception as e:
+            logger.error(f"Erreur écriture des données TeleFeed : {e}")
+        
+        # Terminer les envois TeleFeed en file (au plus OUTBOUND_DRAIN_TIMEOUT secondes)
+        dispatchers = list(self.dispatchers.values())
+        if dispatchers:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(dispatcher.join() for dispatcher in dispatchers)),
+                    OUTBOUND_DRAIN_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.warning("Envois TeleFeed encore en file abandonnés à l'arrêt")
+            for dispatcher in dispatchers:
+                dispatcher.close()
+        
         # Fermer les clients TeleFeed
         for client in self.telefeed_clients.values():
             try:
@@ -487,7 +556,8 @@ def health_check():
                 'uptime': str(uptime),
                 'last_heartbeat': bot.last_heartbeat.isoformat(),
                 'telefeed_sessions': len(bot.telefeed_sessions),
-                'active_redirections': len(bot.telefeed_redirections)
+                'active_redirections': len(bot.telefeed_redirections),
+                'handlers_per_client': bot.handler_registry.handlers_per_client()
             })
         else:
             return jsonify({'status': 'unhealthy', 'error': 'Bot not running'}), 500
@@ -517,7 +587,8 @@ def get_status():
                 'users_count': len(bot.users),
                 'telefeed_sessions': len(bot.telefeed_sessions),
                 'telefeed_redirections': len(bot.telefeed_redirections),
-                'active_clients': len(bot.telefeed_clients)
+                'active_clients': len(bot.telefeed_clients),
+                'handlers_per_client': bot.handler_registry.handlers_per_client()
             })
         else:
             return jsonify({'status': 'Bot not initialized'}), 500
@@ -0,0 +1,84 @@
+"""
+Réponses TeleFeed (paramètre process_reply) : message destination auquel répondre
+La résolution est locale (aucun appel réseau) : correspondances récentes en
+mémoire, sinon mapping des messages, et cache négatif des absences
+"""
+
+import time
+from collections import OrderedDict
+
+
+class ReplyResolver:
+    """Résout (chat source, message répondu, destination) → message destination
+
+    Les correspondances des max_entries derniers messages source redirigés sont
+    gardées dans un dictionnaire (O(1)) ; au-delà, le mapping est consulté
+    (lookup, recherche locale indexée). Un message répondu absent du mapping
+    (antérieur à la redirection, filtré...) est mémorisé negative_ttl secondes
+    pour ne pas refaire la recherche à chaque réponse.
+    """
+
+    def __init__(self, lookup, max_entries=10000, negative_ttl=600):
+        self.lookup = lookup
+        self.max_entries = max(1, max_entries)
+        self.negative_ttl = negative_ttl
+        # {(chat source, message source): {destination: message destination}}
+        self._recent = OrderedDict()
+        # {(chat source, message source, destination): instant d'expiration}
+        self._misses = OrderedDict()
+        self.stats = {
+            'recent_hits': 0,
+            'mapping_hits': 0,
+            'misses': 0,
+            'negative_hits': 0
+        }
+
+    def remember(self, source_chat, source_msg, dest_chat, dest_msg):
+        """Enregistre un message redirigé (appelé à chaque nouvelle correspondance)"""
+        key = (source_chat, source_msg)
+        dests = self._recent.get(key)
+        if dests is None:
+            dests = self._recent[key] = {}
+        else:
+            self._recent.move_to_end(key)
+        dests[dest_chat] = dest_msg
+        self._misses.pop((source_chat, source_msg, dest_chat), None)
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+    def forget(self, source_chat, source_msg):
+        """Oublie un message source (supprimé)"""
+        self._recent.pop((source_chat, source_msg), None)
+
+    def resolve(self, source_chat, reply_to_msg_id, dest_chat):
+        """Message destination correspondant au message répondu, None si inconnu"""
+        dest_msg = self._recent.get((source_chat, reply_to_msg_id), {}).get(dest_chat)
+        if dest_msg is not None:
+            self.stats['recent_hits'] += 1
+            return dest_msg
+
+        miss_key = (source_chat, reply_to_msg_id, dest_chat)
+        now = time.monotonic()
+        expires_at = self._misses.get(miss_key)
+        if expires_at is not None:
+            if expires_at > now:
+                self.stats['negative_hits'] += 1
+                return None
+            del self._misses[miss_key]
+
+        dest_msg = self.lookup(source_chat, reply_to_msg_id, dest_chat)
+        if dest_msg is not None:
+            self.stats['mapping_hits'] += 1
+            return dest_msg
+
+        self.stats['misses'] += 1
+        self._misses[miss_key] = now + self.negative_ttl
+        while len(self._misses) > self.max_entries:
+            self._misses.popitem(last=False)
+        return None
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['recent'] = len(self._recent)
+        stats['negative'] = len(self._misses)
+        return stats
@@ -0,0 +1,88 @@
+"""
+Sérialiseurs des stores TeleFeed
+JSON lisible (historique) ou binaire compact (marshal), détecté à la lecture
+"""
+
+import json
+import marshal
+import os
+
+
+class JsonSerializer:
+    """Format historique : JSON indenté, lisible et éditable à la main"""
+
+    name = 'json'
+
+    def dumps(self, data):
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+    def loads(self, payload):
+        return json.loads(payload.decode('utf-8'))
+
+
+class MarshalSerializer:
+    """Format binaire compact basé sur marshal (bibliothèque standard)
+
+    Le contenu est précédé d'un en-tête qui permet de reconnaître le format à
+    la lecture : un même fichier peut donc passer de JSON à marshal (et
+    inversement) sans migration. marshal ne gère que les types natifs
+    (dict, list, str, int, float, bool, None), ce qui couvre les stores TeleFeed.
+    """
+
+    name = 'marshal'
+    MAGIC = b'TFMARSHAL\x04\n'
+    # Version 4 du format marshal, stable depuis Python 3.4
+    VERSION = 4
+
+    def dumps(self, data):
+        return self.MAGIC + marshal.dumps(data, self.VERSION)
+
+    def loads(self, payload):
+        return marshal.loads(payload[len(self.MAGIC):])
+
+    def matches(self, payload):
+        return payload.startswith(self.MAGIC)
+
+
+JSON = JsonSerializer()
+MARSHAL = MarshalSerializer()
+
+SERIALIZERS = {
+    JSON.name: JSON,
+    MARSHAL.name: MARSHAL
+}
+
+
+def get_serializer(name):
+    """Retourne le sérialiseur demandé (JSON si le nom est inconnu)"""
+    serializer = SERIALIZERS.get(name)
+    if serializer is None:
+        print(f"⚠️ Format de store inconnu '{name}', utilisation de JSON")
+        return JSON
+    return serializer
+
+
+def detect_serializer(payload):
+    """Sérialiseur correspondant au contenu d'un fichier"""
+    if MARSHAL.matches(payload):
+        return MARSHAL
+    return JSON
+
+
+def dumps(data, serializer=JSON):
+    """Sérialise data, en revenant au JSON si le format binaire ne gère pas son contenu"""
+    if serializer is not JSON:
+        try:
+            return serializer.dumps(data)
+        except (ValueError, TypeError) as e:
+            print(f"⚠️ Sérialisation {serializer.name} impossible ({e}), utilisation de JSON")
+    return JSON.dumps(data)
+
+
+def load_file(filename):
+    """Lit un fichier de store quel que soit son format ({} s'il n'existe pas)"""
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, 'rb') as f:
+        payload = f.read()
+    return detect_serializer(payload).loads(payload)
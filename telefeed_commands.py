@@ -3,14 +3,32 @@ TeleFeed Commands Implementation for Téléfoot Bot
 Integrates advanced message redirection and transformation features
 """
 
-import json
 import os
-import re
+import copy
+import math
+import time
 import asyncio
+import functools
 from datetime import datetime
-from telethon import TelegramClient, events
+from telethon import TelegramClient, events, utils
 from telethon.errors import SessionPasswordNeededError, PhoneCodeExpiredError
-from telethon.tl.types import User, Chat, Channel
+from telethon.tl.types import User, Chat, Channel, PeerChannel
+from message_mapping_store import open_message_mapping, backup_database
+from licence_cache import get_licence_cache, licence_now
+import store_serializers
+from telefeed_routing import RoutingTable, CompiledPipeline
+from destination_cache import DestinationCache
+from telefeed_dispatcher import OutboundDispatcher, BatchSend
+from album_collector import AlbumCollector
+from media_fanout import MediaFanout
+from handler_registry import HandlerRegistry
+from duplicate_filter import DuplicateFilter, content_hash
+from edit_coalescer import EditCoalescer, SentTextHashes
+from reply_resolver import ReplyResolver
+from delayed_dispatch import DelayedDispatcher
+from rate_scheduler import RateScheduler, flood_wait_seconds
+from telefeed_events import FilterStats, CountingNewMessage, CountingMessageEdited
+from telefeed_journal import MutationJournal, JOURNAL_SUFFIX, set_record, delete_record, apply_mutation
 
 # Configuration des admins
 ADMIN_IDS = ['1190237801']  # ID admin principal
@@ -25,98 +43,812 @@ DATA_FILES = {
     'blacklist': 'telefeed_blacklist.json',
     'settings': 'telefeed_settings.json',
     'chats': 'telefeed_chats.json',
-    'delay': 'telefeed_delay.json'
+    'delay': 'telefeed_delay.json',
+    'message_mapping': 'telefeed_message_mapping.json'
 }
 
+# Stores découpés en un fichier par compte : telefeed_accounts/<téléphone>/<store>.json
+ACCOUNTS_DIR = 'telefeed_accounts'
+SHARDED_STORES = (
+    'redirections',
+    'transformations',
+    'filters',
+    'whitelist',
+    'blacklist',
+    'settings',
+    'chats',
+    'delay'
+)
+
+# Stores lus à la connexion d'un compte (nécessaires au routage des messages) ;
+# les autres (chats) ne sont lus qu'à leur premier accès
+ACCOUNT_HOT_STORES = (
+    'redirections',
+    'transformations',
+    'filters',
+    'whitelist',
+    'blacklist',
+    'settings',
+    'delay'
+)
+
+# Stores dont dépend la table de routage compilée d'un compte
+ROUTING_STORES = (
+    'redirections',
+    'transformations',
+    'whitelist',
+    'blacklist',
+    'settings'
+)
+
+# Durée de validité (secondes) d'une destination résolue dans le cache d'un client
+DESTINATION_CACHE_TTL = float(os.getenv('TELEFEED_DESTINATION_CACHE_TTL', '3600'))
+
+# Nombre maximal d'envois simultanés par compte lors du fan-out vers les destinations
+FANOUT_CONCURRENCY = int(os.getenv('TELEFEED_FANOUT_CONCURRENCY', '8'))
+
+# File d'envoi de chaque destination : taille maximale et politique quand elle est pleine
+# ('block', 'drop_oldest' ou 'coalesce')
+OUTBOUND_QUEUE_SIZE = int(os.getenv('TELEFEED_OUTBOUND_QUEUE_SIZE', '100'))
+OUTBOUND_OVERFLOW_POLICY = os.getenv('TELEFEED_OUTBOUND_OVERFLOW_POLICY', 'block')
+# Budgets d'envoi (seaux à jetons) : par compte (messages/seconde) et par chat (messages/minute)
+ACCOUNT_SEND_RATE = float(os.getenv('TELEFEED_ACCOUNT_SEND_RATE', '25'))
+CHAT_SENDS_PER_MINUTE = float(os.getenv('TELEFEED_CHAT_SENDS_PER_MINUTE', '20'))
+
+# Redirection sans filtre ni transformation : transfert côté serveur (forward_messages
+# avec drop_author) au lieu d'un renvoi du texte, jusqu'à FORWARD_BATCH_SIZE messages par appel
+FORWARD_FAST_PATH = os.getenv('TELEFEED_FORWARD_FAST_PATH', '1') != '0'
+FORWARD_BATCH_SIZE = min(100, int(os.getenv('TELEFEED_FORWARD_BATCH_SIZE', '100')))
+
+# Fenêtre de collecte (secondes) des parties d'un album après la dernière reçue (0 : désactivé)
+ALBUM_COLLECT_WINDOW = float(os.getenv('TELEFEED_ALBUM_COLLECT_WINDOW', '0.5'))
+
+# Médias refusés par référence : cache local des téléchargements (adressé par contenu),
+# taille maximale (Mo) et durée de réutilisation (secondes) d'un fichier uploadé
+MEDIA_CACHE_DIR = os.getenv('TELEFEED_MEDIA_CACHE_DIR', 'telefeed_media_cache')
+MEDIA_CACHE_MAX_MB = int(os.getenv('TELEFEED_MEDIA_CACHE_MAX_MB', '500'))
+MEDIA_UPLOAD_TTL = float(os.getenv('TELEFEED_MEDIA_UPLOAD_TTL', '1800'))
+
+# Doublons (drop_duplicates, activé par `/settings duplicates <redirection> on`) : fenêtre (secondes)
+# et nombre maximal d'empreintes par redirection
+# process_duplicates, déjà enregistré à True par les redirections existantes, garde son sens :
+# les doublons sont traités comme les autres messages
+DEDUPE_WINDOW = float(os.getenv('TELEFEED_DEDUPE_WINDOW', '3600'))
+DEDUPE_MAX_ENTRIES = int(os.getenv('TELEFEED_DEDUPE_MAX_ENTRIES', '10000'))
+
+# Éditions : fenêtre (secondes) de regroupement des éditions d'un même message (0 : désactivé)
+# et nombre maximal d'empreintes de textes envoyés conservées (éditions sans effet ignorées)
+EDIT_DEBOUNCE_WINDOW = float(os.getenv('TELEFEED_EDIT_DEBOUNCE_WINDOW', '1'))
+SENT_HASH_MAX_ENTRIES = int(os.getenv('TELEFEED_SENT_HASH_MAX_ENTRIES', '10000'))
+
+# Réponses (process_reply) : correspondances récentes gardées en mémoire et durée (secondes)
+# du cache négatif des messages répondus absents du mapping
+REPLY_CACHE_SIZE = int(os.getenv('TELEFEED_REPLY_CACHE_SIZE', '10000'))
+REPLY_NEGATIVE_TTL = float(os.getenv('TELEFEED_REPLY_NEGATIVE_TTL', '600'))
+
+# Suppressions propagées (process_delete) : messages par appel delete_messages (limite Telegram)
+DELETE_BATCH_SIZE = 100
+
+# Délais par redirection (telefeed_delay du compte, sinon delay.json du bot historique) :
+# envois en attente journalisés dans telefeed_accounts/<téléphone>/ et reprogrammés au redémarrage
+LEGACY_DELAY_FILE = 'delay.json'
+DELAYED_JOURNAL_NAME = 'delayed_sends.journal'
+DELAYED_COMPACT_RECORDS = int(os.getenv('TELEFEED_DELAYED_COMPACT_RECORDS', '1000'))
+# Mode étalé (delay_spread_mode) : le délai devient l'attente maximale, et les envois d'une
+# rafale y sont espacés de délai / DELAY_SPREAD_SLOTS
+DELAY_SPREAD_SLOTS = int(os.getenv('TELEFEED_DELAY_SPREAD_SLOTS', '10'))
+# Délai maximal (secondes) accepté pour une redirection
+MAX_ROUTE_DELAY = float(os.getenv('TELEFEED_MAX_ROUTE_DELAY', str(24 * 3600)))
+
+# Attente maximale (secondes) des envois en file à l'arrêt du bot
+OUTBOUND_DRAIN_TIMEOUT = float(os.getenv('TELEFEED_OUTBOUND_DRAIN_TIMEOUT', '10'))
+
+# Backend du mapping des messages : 'sqlite' (indexé, avec rétention) ou 'json' (historique)
+# Le passage à 'sqlite' importe une seule fois le fichier JSON existant
+MAPPING_BACKEND = os.getenv('TELEFEED_MAPPING_BACKEND', 'sqlite')
+MAPPING_DB_FILE = 'telefeed_message_mapping.db'
+MAPPING_RETENTION_DAYS = int(os.getenv('TELEFEED_MAPPING_RETENTION_DAYS', '30'))
+
+# Écriture différée : délai avant écriture et nombre de modifications déclenchant une écriture immédiate
+FLUSH_INTERVAL = float(os.getenv('TELEFEED_FLUSH_INTERVAL', '2'))
+FLUSH_MAX_CHANGES = int(os.getenv('TELEFEED_FLUSH_MAX_CHANGES', '50'))
+
+# Format des stores volumineux (liste des chats, mapping JSON) : 'json' (par défaut, lisible par
+# les outils externes et /backup) ou 'marshal' (binaire compact, sur option : son format peut
+# changer d'une version de Python à l'autre). La lecture reconnaît les deux formats, un fichier
+# marshal existant est donc relu puis réécrit en JSON à sa prochaine sauvegarde
+LARGE_STORES = ('chats', 'message_mapping')
+LARGE_STORE_FORMAT = os.getenv('TELEFEED_LARGE_STORE_FORMAT', 'json')
+
+# Taille (octets) au-delà de laquelle un journal de mutations est compacté dans son instantané
+JOURNAL_COMPACT_BYTES = int(os.getenv('TELEFEED_JOURNAL_COMPACT_BYTES', str(256 * 1024)))
+
 def load_json_data(filename):
-    """Charge les données JSON"""
+    """Charge les données d'un store (JSON ou format binaire, détecté automatiquement)"""
     try:
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+        return store_serializers.load_file(filename)
     except Exception as e:
         print(f"Erreur lors du chargement {filename}: {e}")
         return {}
 
-def save_json_data(filename, data):
-    """Sauvegarde les données JSON"""
+def write_file_atomic(filename, payload):
+    """Écrit un fichier via un fichier temporaire puis un renommage atomique"""
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+
+def serializer_for_store(store):
+    """Sérialiseur utilisé pour écrire un store"""
+    if store in LARGE_STORES:
+        return store_serializers.get_serializer(LARGE_STORE_FORMAT)
+    return store_serializers.JSON
+
+def save_json_data(filename, data, serializer=store_serializers.JSON):
+    """Sauvegarde les données (JSON par défaut) et retourne le nombre d'octets écrits (0 en cas d'erreur)"""
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        return True
+        payload = store_serializers.dumps(data, serializer)
+        write_file_atomic(filename, payload)
+        return len(payload)
     except Exception as e:
         print(f"Erreur lors de la sauvegarde {filename}: {e}")
-        return False
+        return 0
+
+def write_store_batch(batch):
+    """Écrit une liste de (unité, fichier, données) et retourne [(unité, octets écrits)]
+
+    Exécutée dans un thread par l'écriture différée : les données doivent être
+    une copie indépendante des dictionnaires manipulés par la boucle asyncio.
+    """
+    return [
+        (unit, save_json_data(filename, data, serializer_for_store(unit[0])))
+        for unit, filename, data in batch
+    ]
+
+class ShardedStore:
+    """Store TeleFeed découpé en un fichier par compte
+    
+    Se comporte comme le dictionnaire historique {téléphone: données}, mais
+    chaque compte est stocké dans ACCOUNTS_DIR/<téléphone>/<store>.json et n'est
+    lu qu'au premier accès à ce compte (en pratique à la connexion de son client).
+    
+    Les modifications ponctuelles passent par apply() : elles sont ajoutées au
+    journal <store>.journal du compte, rejoué par-dessus le fichier .json au
+    chargement, au lieu de réécrire tout le fichier.
+    """
+    
+    def __init__(self, name, base_dir=ACCOUNTS_DIR):
+        self.name = name
+        self.base_dir = base_dir
+        self._shards = {}
+        self._journals = {}
+    
+    def shard_path(self, phone_number):
+        """Chemin du fichier d'un compte"""
+        return os.path.join(self.base_dir, str(phone_number), f"{self.name}.json")
+    
+    def journal(self, phone_number):
+        """Journal de mutations d'un compte"""
+        phone_number = str(phone_number)
+        journal = self._journals.get(phone_number)
+        if journal is None:
+            path = os.path.join(self.base_dir, phone_number, f"{self.name}{JOURNAL_SUFFIX}")
+            journal = self._journals[phone_number] = MutationJournal(path)
+        return journal
+    
+    def load(self, phone_number):
+        """Charge une seule fois les données d'un compte (None si le compte n'a pas de fichier)"""
+        phone_number = str(phone_number)
+        if phone_number not in self._shards:
+            path = self.shard_path(phone_number)
+            journal = self.journal(phone_number)
+            if not os.path.exists(path) and not journal.exists():
+                return None
+            data = load_json_data(path)
+            journal.replay(data)
+            self._shards[phone_number] = data
+        return self._shards[phone_number]
+    
+    def apply(self, phone_number, record):
+        """Applique une mutation en mémoire, l'ajoute au journal et retourne la taille du journal"""
+        apply_mutation(self.setdefault(phone_number, {}), record)
+        journal = self.journal(phone_number)
+        journal.append(record)
+        return journal.size()
+    
+    def loaded_phones(self):
+        """Comptes actuellement chargés en mémoire"""
+        return list(self._shards)
+    
+    def phones(self):
+        """Tous les comptes ayant des données (sur disque ou en mémoire)"""
+        phones = set(self._shards)
+        if os.path.isdir(self.base_dir):
+            for phone_number in os.listdir(self.base_dir):
+                if os.path.exists(self.shard_path(phone_number)) or self.journal(phone_number).exists():
+                    phones.add(phone_number)
+        return sorted(phones)
+    
+    def migrate_flat_file(self, flat_filename):
+        """Découpe une fois l'ancien fichier commun en fichiers par compte
+        
+        Le fichier d'origine est renommé en .migrated une fois tous les comptes écrits.
+        """
+        if not os.path.exists(flat_filename):
+            return 0
+        
+        data = load_json_data(flat_filename)
+        for phone_number, shard in data.items():
+            path = self.shard_path(phone_number)
+            if not os.path.exists(path) and not save_json_data(path, shard, serializer_for_store(self.name)):
+                return 0
+        
+        os.replace(flat_filename, f"{flat_filename}.migrated")
+        print(f"📦 {flat_filename} découpé en {len(data)} fichier(s) de compte")
+        return len(data)
+    
+    def get(self, phone_number, default=None):
+        data = self.load(phone_number)
+        return default if data is None else data
+    
+    def setdefault(self, phone_number, default=None):
+        data = self.load(phone_number)
+        if data is None:
+            data = self._shards[str(phone_number)] = default
+        return data
+    
+    def __getitem__(self, phone_number):
+        data = self.load(phone_number)
+        if data is None:
+            raise KeyError(phone_number)
+        return data
+    
+    def __setitem__(self, phone_number, data):
+        self._shards[str(phone_number)] = data
+    
+    def __contains__(self, phone_number):
+        return self.load(phone_number) is not None
+    
+    def __iter__(self):
+        return iter(self.phones())
+    
+    def __len__(self):
+        return len(self.phones())
+    
+    def keys(self):
+        return self.phones()
+    
+    def items(self):
+        return [(phone_number, self[phone_number]) for phone_number in self.phones()]
+    
+    def values(self):
+        return [self[phone_number] for phone_number in self.phones()]
+
+class WriteBehindWriter:
+    """Écriture différée des stores TeleFeed
+    
+    Les modifications sont regroupées en mémoire et écrites FLUSH_INTERVAL secondes
+    après la première, ou immédiatement après FLUSH_MAX_CHANGES modifications.
+    La sérialisation et l'écriture sont faites dans un thread pour ne pas bloquer
+    la boucle Telethon.
+    """
+    
+    def __init__(self, manager, interval=FLUSH_INTERVAL, max_changes=FLUSH_MAX_CHANGES):
+        self.manager = manager
+        self.interval = interval
+        self.max_changes = max_changes
+        self.pending_changes = 0
+        self._timer = None
+        self._flush_task = None
+        self._lock = None
+        self.stats = {
+            'flushes': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+    
+    def schedule(self, changes=1):
+        """Enregistre des modifications et planifie l'écriture"""
+        self.pending_changes += changes
+        
+        if self.pending_changes >= self.max_changes and not self.is_flushing():
+            self._start_flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.interval, self._start_flush)
+    
+    def is_flushing(self):
+        return self._flush_task is not None and not self._flush_task.done()
+    
+    def _start_flush(self):
+        self._cancel_timer()
+        self._flush_task = asyncio.ensure_future(self.flush())
+    
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+    
+    async def flush(self):
+        """Écrit immédiatement tous les stores en attente et retourne le nombre d'octets écrits"""
+        self._cancel_timer()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            self.pending_changes = 0
+            batch = self.manager.take_dirty_batch()
+            if not batch:
+                return 0
+            
+            start = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(None, write_store_batch, batch)
+            save_bytes = self.manager.record_save(results)
+            
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.stats['flushes'] += 1
+            self.stats['last_flush_ms'] = elapsed_ms
+            self.stats['max_flush_ms'] = max(self.stats['max_flush_ms'], elapsed_ms)
+            self.stats['total_flush_ms'] += elapsed_ms
+        
+        # Des stores en échec ou modifiés pendant l'écriture restent à écrire
+        if self.manager.dirty_stores and self._timer is None:
+            self._timer = loop.call_later(self.interval, self._start_flush)
+        
+        return save_bytes
+    
+    def get_stats(self):
+        """Latence d'écriture et profondeur de la file d'attente"""
+        flushes = self.stats['flushes']
+        return {
+            'queue_depth': len(self.manager.dirty_stores),
+            'pending_changes': self.pending_changes,
+            'flushes': flushes,
+            'last_flush_ms': round(self.stats['last_flush_ms'], 2),
+            'avg_flush_ms': round(self.stats['total_flush_ms'] / flushes, 2) if flushes else 0.0,
+            'max_flush_ms': round(self.stats['max_flush_ms'], 2)
+        }
 
 def is_user_authorized(user_id):
     """Vérifie si l'utilisateur est autorisé (a une licence active)"""
-    try:
-        with open('users.json', 'r', encoding='utf-8') as f:
-            users = json.load(f)
+    licence_cache = get_licence_cache('users.json')
+    
+    user_data = licence_cache.get(user_id)
+    if not user_data:
+        return False
         
-        user_data = users.get(str(user_id))
-        if not user_data:
-            return False
-            
-        if user_data.get('status') != 'active':
-            return False
-            
-        # Vérifier l'expiration
-        expire_date = user_data.get('expires')
-        if expire_date:
-            expire_datetime = datetime.fromisoformat(expire_date)
-            if datetime.now() > expire_datetime:
-                return False
-                
-        return True
-    except:
+    if user_data.get('status') != 'active':
         return False
+        
+    # Vérifier l'expiration (date déjà analysée par le cache)
+    expire_datetime = licence_cache.expiry(user_id)
+    if expire_datetime is not None and licence_now() > expire_datetime:
+        return False
+            
+    return True
 
 class TeleFeedManager:
     """Gestionnaire principal pour les fonctionnalités TeleFeed"""
     
     def __init__(self):
         self.sessions = load_json_data(DATA_FILES['sessions'])
-        self.redirections = load_json_data(DATA_FILES['redirections'])
-        self.transformations = load_json_data(DATA_FILES['transformations'])
-        self.filters = load_json_data(DATA_FILES['filters'])
-        self.whitelist = load_json_data(DATA_FILES['whitelist'])
-        self.blacklist = load_json_data(DATA_FILES['blacklist'])
-        self.settings = load_json_data(DATA_FILES['settings'])
-        self.chats = load_json_data(DATA_FILES['chats'])
-        self.delay = load_json_data(DATA_FILES['delay'])
-        
-        # Mapping des messages pour édition
-        self.message_mapping = load_json_data('telefeed_message_mapping.json')
+        
+        # Données par compte, chargées à la connexion du client (ou au premier accès)
+        for store in SHARDED_STORES:
+            sharded_store = ShardedStore(store)
+            sharded_store.migrate_flat_file(DATA_FILES[store])
+            setattr(self, store, sharded_store)
+        
+        # Mapping des messages pour édition (ouvert au premier message redirigé)
+        self._message_mapping = None
         
         # Clients connectés
         self.clients = {}
         
+        # Tables de routage compilées par compte {téléphone: RoutingTable}
+        self.routing = {}
+        
+        # Destinations résolues par compte {téléphone: DestinationCache}
+        self.destination_caches = {}
+        
+        # Files d'envoi par compte {téléphone: OutboundDispatcher}
+        self.dispatchers = {}
+        
+        # Envois de médias par compte {téléphone: MediaFanout}
+        self.media_fanouts = {}
+        
+        # Empreintes des contenus redirigés {(téléphone, redirection): DuplicateFilter}
+        self.duplicate_filters = {}
+        
+        # Éditions en attente par compte {téléphone: EditCoalescer}
+        self.edit_coalescers = {}
+        # Empreinte du dernier texte envoyé par (chat source, message source, destination)
+        self.sent_hashes = SentTextHashes(SENT_HASH_MAX_ENTRIES)
+        # Message destination auquel répondre pour une réponse dans un chat source
+        self.reply_resolver = ReplyResolver(
+            lambda source_chat, source_msg, dest_chat: self.message_mapping.get(source_chat, source_msg, dest_chat),
+            REPLY_CACHE_SIZE,
+            REPLY_NEGATIVE_TTL
+        )
+        
+        # Albums en cours de collecte par compte {téléphone: AlbumCollector}
+        self.album_collectors = {}
+        
+        # Envois différés par compte {téléphone: DelayedDispatcher}
+        self.delayed_dispatchers = {}
+        # Délais du bot historique {redirection: {'seconds': n}}, pour les redirections sans délai propre
+        self.legacy_delay = load_json_data(LEGACY_DELAY_FILE) if os.path.exists(LEGACY_DELAY_FILE) else {}
+        
+        # Gestionnaires de redirection enregistrés par compte
+        # {téléphone: {'client', 'callbacks', 'sources', 'stats'}}
+        self.event_handlers = {}
+        # Un seul gestionnaire par (compte, type d'événement) attaché aux clients
+        self.handler_registry = HandlerRegistry()
+        
+        # Unités (store, téléphone) modifiées depuis la dernière sauvegarde
+        # (téléphone à None pour les stores non découpés)
+        self.dirty_stores = set()
+        
+        # Statistiques de persistance (octets écrits par sauvegarde)
+        self.save_stats = {
+            'saves': 0,
+            'stores_written': 0,
+            'bytes_written': 0,
+            'last_save_bytes': 0,
+            'bytes_by_store': {},
+            'journal_records': 0,
+            'journal_bytes': 0,
+            'compactions': 0
+        }
+        
+        # Taille de chaque journal au moment où son instantané a été copié pour écriture
+        self._journal_offsets = {}
+        
+        # Écriture différée des stores depuis la boucle asyncio
+        self.writer = WriteBehindWriter(self)
+        
         # Note: La restauration des sessions se fait lors du premier appel
+    
+    @property
+    def message_mapping(self):
+        """Backend du mapping des messages, ouvert (et migré) au premier accès"""
+        if self._message_mapping is None:
+            self._message_mapping = open_message_mapping(
+                MAPPING_BACKEND,
+                DATA_FILES['message_mapping'],
+                MAPPING_DB_FILE,
+                MAPPING_RETENTION_DAYS
+            )
+        return self._message_mapping
+    
+    def load_account(self, phone_number):
+        """Charge les données de routage d'un compte dont le client vient d'être connecté"""
+        for store in ACCOUNT_HOT_STORES:
+            getattr(self, store).load(phone_number)
+        self.rebuild_routing(phone_number)
+    
+    def rebuild_routing(self, phone_number):
+        """Recompile la table de routage d'un compte et la remplace en une seule affectation"""
+        phone_number = str(phone_number)
+        self.routing[phone_number] = RoutingTable(
+            self.redirections.get(phone_number, {}),
+            self.transformations.get(phone_number, {}),
+            self.whitelist.get(phone_number, {}),
+            self.blacklist.get(phone_number, {}),
+            self.settings.get(phone_number, {})
+        )
+        self.refresh_source_filters(phone_number)
+        return self.routing[phone_number]
+    
+    def refresh_source_filters(self, phone_number):
+        """Réenregistre les gestionnaires d'un compte si ses chats source ont changé
+        
+        Les gestionnaires sont enregistrés avec chats=<chats source> : Telethon écarte
+        les autres mises à jour avant d'appeler le moindre gestionnaire. Le retrait et
+        le nouvel enregistrement se font sans await intermédiaire, donc aucune mise à
+        jour ne peut être distribuée entre les deux. Le registre remplace aussi les
+        gestionnaires d'une configuration précédente du compte (aucun doublon).
+        """
+        registration = self.event_handlers.get(str(phone_number))
+        if registration is None:
+            return False
+        
+        sources = self.routing[str(phone_number)].source_chats
+        if sources == registration['sources']:
+            return False
+        
+        client = registration['client']
+        for builder_class, callback in registration['callbacks'].items():
+            builder = builder_class(chats=sorted(sources), stats=registration['stats'])
+            self.handler_registry.register(phone_number, client, callback, builder)
+        registration['sources'] = sources
+        return True
+    
+    def get_filter_stats(self, phone_number):
+        """Mises à jour traitées / écartées par le filtre chats= d'un compte (None si aucun gestionnaire)"""
+        registration = self.event_handlers.get(str(phone_number))
+        if registration is None:
+            return None
+        stats = registration['stats'].get_stats()
+        stats['source_chats'] = len(registration['sources'] or ())
+        return stats
+    
+    def routing_table(self, phone_number):
+        """Table de routage d'un compte (compilée au premier appel)"""
+        table = self.routing.get(str(phone_number))
+        if table is None:
+            table = self.rebuild_routing(phone_number)
+        return table
+    
+    def mark_dirty(self, *stores, phone=None):
+        """Marque des stores comme modifiés pour la prochaine sauvegarde
+        
+        Pour un store découpé par compte, seul le fichier de phone est réécrit
+        (ou ceux de tous les comptes chargés si phone n'est pas précisé).
+        """
+        for store in stores:
+            if store not in DATA_FILES:
+                raise ValueError(f"Store inconnu: {store}")
+            if store not in SHARDED_STORES:
+                self.dirty_stores.add((store, None))
+            elif phone is not None:
+                self.dirty_stores.add((store, str(phone)))
+            else:
+                for phone_number in getattr(self, store).loaded_phones():
+                    self.dirty_stores.add((store, phone_number))
+    
+    def update_store(self, store, phone_number, path, value):
+        """Affecte une valeur dans le store d'un compte (ex: path=[redirection_id])
+        
+        La modification est journalisée (une ligne ajoutée) au lieu de réécrire le fichier.
+        """
+        self._journal_mutation(store, phone_number, set_record(path, value))
+    
+    def delete_from_store(self, store, phone_number, path):
+        """Supprime une clé du store d'un compte (journalisé)"""
+        self._journal_mutation(store, phone_number, delete_record(path))
+    
+    def _journal_mutation(self, store, phone_number, record):
+        if store not in SHARDED_STORES:
+            raise ValueError(f"Store non journalisé: {store}")
+        
+        sharded_store = getattr(self, store)
+        before = sharded_store.journal(phone_number).size()
+        journal_size = sharded_store.apply(phone_number, record)
+        self.save_stats['journal_records'] += 1
+        self.save_stats['journal_bytes'] += journal_size - before
+        
+        if store in ROUTING_STORES:
+            self.rebuild_routing(phone_number)
+        
+        if journal_size > JOURNAL_COMPACT_BYTES:
+            self.save_all_data(store, phone=phone_number)
+    
+    def record_mapping(self, source_chat, source_msg, dest_chat, dest_msg, text=None):
+        """Enregistre la correspondance d'un message redirigé (et l'empreinte du texte envoyé)"""
+        if text is not None:
+            self.sent_hashes.record((source_chat, source_msg, dest_chat), text)
+        self.reply_resolver.remember(source_chat, source_msg, dest_chat, dest_msg)
+        
+        mapping = self.message_mapping
+        mapping.add(source_chat, source_msg, dest_chat, dest_msg)
+        
+        # Backend JSON : l'ajout est journalisé, le fichier n'est réécrit qu'à la compaction ;
+        # backend SQLite : le commit est groupé avec la prochaine sauvegarde différée
+        journal = getattr(mapping, 'journal', None)
+        if journal is None or journal.size() > JOURNAL_COMPACT_BYTES:
+            self.save_all_data('message_mapping')
+    
+    def remove_mapping(self, source_chat, source_msg):
+        """Supprime les correspondances d'un message source (message supprimé)"""
+        self.reply_resolver.forget(source_chat, source_msg)
+        mapping = self.message_mapping
+        removed = mapping.remove(source_chat, source_msg)
+        
+        journal = getattr(mapping, 'journal', None)
+        if removed and (journal is None or journal.size() > JOURNAL_COMPACT_BYTES):
+            self.save_all_data('message_mapping')
+        return removed
+    
+    def resolve_deleted(self, phone_number, chat_id, deleted_ids):
+        """Messages destination à supprimer pour des messages source supprimés
+
+        chat_id est None pour les chats non-canaux (Telethon ne le fournit pas) :
+        les ids sont alors retrouvés par recherche inverse dans le mapping, parmi
+        les chats source non-canaux du compte. Les correspondances trouvées sont
+        retirées du mapping et les envois différés encore en attente annulés.
+        Retourne {destination: [messages destination]} limité aux redirections
+        dont process_delete est actif.
+        """
+        table = self.routing_table(phone_number)
+        if chat_id is not None:
+            if chat_id not in table.source_chats:
+                return {}
+            candidates = {chat_id}
+        else:
+            candidates = {
+                source for source in table.source_chats
+                if utils.resolve_id(source)[1] is not PeerChannel
+            }
+            if not candidates:
+                return {}
+        
+        # Destinations où la suppression est propagée, par chat source
+        allowed = {}
+        for source in candidates:
+            allowed[source] = {
+                dest_id
+                for route in table.get(source) if route.settings.get('process_delete', True)
+                for dest_id in route.destinations
+            }
         
-    def save_all_data(self):
-        """Sauvegarde toutes les données"""
-        # Filtrer les sessions pour exclure les clients TelegramClient
-        sessions_to_save = {}
-        for phone, session_data in self.sessions.items():
-            if isinstance(session_data, dict):
-                # Créer une copie sans les objets TelegramClient
-                filtered_session = {k: v for k, v in session_data.items() if k != 'client'}
-                sessions_to_save[phone] = filtered_session
+        delayed = self.delayed_dispatchers.get(str(phone_number))
+        if delayed is not None and len(delayed):
+            delayed.cancel(candidates, deleted_ids, {
+                route.redirection_id
+                for source in candidates
+                for route in table.get(source) if route.settings.get('process_delete', True)
+            })
+        
+        deletions = {}
+        for msg_id in deleted_ids:
+            if chat_id is not None:
+                found = {chat_id: self.message_mapping.get_all(chat_id, msg_id)}
             else:
-                sessions_to_save[phone] = session_data
-        
-        save_json_data(DATA_FILES['sessions'], sessions_to_save)
-        save_json_data(DATA_FILES['redirections'], self.redirections)
-        save_json_data(DATA_FILES['transformations'], self.transformations)
-        save_json_data(DATA_FILES['filters'], self.filters)
-        save_json_data(DATA_FILES['whitelist'], self.whitelist)
-        save_json_data(DATA_FILES['blacklist'], self.blacklist)
-        save_json_data(DATA_FILES['settings'], self.settings)
-        save_json_data(DATA_FILES['chats'], self.chats)
-        save_json_data(DATA_FILES['delay'], self.delay)
-        save_json_data('telefeed_message_mapping.json', self.message_mapping)
+                found = self.message_mapping.find_by_source_msg(msg_id)
+            for source_chat, dests in found.items():
+                if source_chat not in candidates or not dests:
+                    continue
+                for dest_chat, dest_msg in dests.items():
+                    if dest_chat in allowed[source_chat]:
+                        deletions.setdefault(dest_chat, []).append(dest_msg)
+                self.remove_mapping(source_chat, msg_id)
+        return deletions
+    
+    def _unit_journal(self, unit):
+        """Journal de mutations d'une unité de sauvegarde (None si elle n'en a pas)"""
+        store, phone_number = unit
+        if phone_number is not None:
+            return getattr(self, store).journal(phone_number)
+        if store == 'message_mapping':
+            return getattr(self.message_mapping, 'journal', None)
+        return None
+    
+    def _unit_file(self, unit):
+        """Fichier d'une unité de sauvegarde (store, téléphone)"""
+        store, phone_number = unit
+        if phone_number is None:
+            return DATA_FILES[store]
+        return getattr(self, store).shard_path(phone_number)
+    
+    def _store_data(self, unit):
+        """Retourne les données sérialisables d'une unité de sauvegarde (store, téléphone)"""
+        store, phone_number = unit
+        if phone_number is not None:
+            return getattr(self, store).get(phone_number, {})
+        if store == 'sessions':
+            # Filtrer les sessions pour exclure les clients TelegramClient
+            sessions_to_save = {}
+            for phone, session_data in self.sessions.items():
+                if isinstance(session_data, dict):
+                    # Créer une copie sans les objets TelegramClient
+                    filtered_session = {k: v for k, v in session_data.items() if k != 'client'}
+                    sessions_to_save[phone] = filtered_session
+                else:
+                    sessions_to_save[phone] = session_data
+            return sessions_to_save
+        if store == 'message_mapping':
+            return self.message_mapping.to_dict()
+        return getattr(self, store)
+        
+    def save_all_data(self, *stores, phone=None):
+        """Sauvegarde les stores modifiés (les stores passés en argument sont marqués au préalable)
+        
+        Depuis la boucle asyncio, l'écriture est confiée à self.writer et la méthode
+        retourne 0 sans attendre le disque. Hors boucle, les stores sont écrits
+        immédiatement et le nombre d'octets écrits est retourné.
+        """
+        self.mark_dirty(*stores, phone=phone)
+        if not self.dirty_stores:
+            return 0
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self.record_save(write_store_batch(self.take_dirty_batch(copy_data=False)))
+        
+        self.writer.schedule(max(len(stores), 1))
+        return 0
+    
+    def take_dirty_batch(self, copy_data=True):
+        """Retire les unités modifiées et retourne [(unité, fichier, données)]
+        
+        Avec copy_data, les données sont copiées pour pouvoir être sérialisées
+        dans un thread pendant que la boucle continue de les modifier.
+        """
+        batch = []
+        for unit in list(self.dirty_stores):
+            if unit[0] == 'message_mapping' and self.message_mapping.persists_itself:
+                # Le backend SQLite écrit lui-même chaque correspondance : il suffit
+                # de valider en une transaction celles reçues depuis la dernière sauvegarde
+                self.message_mapping.commit()
+                continue
+            data = self._store_data(unit)
+            # Le mapping est déjà reconstruit à chaque appel de to_dict()
+            if copy_data and unit[0] != 'message_mapping':
+                data = copy.deepcopy(data)
+            
+            # L'instantané contient tout le journal écrit jusqu'ici
+            journal = self._unit_journal(unit)
+            if journal is not None:
+                self._journal_offsets[unit] = journal.size()
+            
+            batch.append((unit, self._unit_file(unit), data))
+        self.dirty_stores.clear()
+        return batch
+    
+    def record_save(self, results):
+        """Comptabilise une sauvegarde [(unité, octets)] et remarque les unités en échec"""
+        save_bytes = 0
+        for unit, written in results:
+            if not written:
+                # Une unité dont l'écriture échoue sera retentée à la prochaine sauvegarde
+                self.dirty_stores.add(unit)
+                continue
+            
+            # Compaction : retirer du journal les mutations incluses dans l'instantané
+            offset = self._journal_offsets.pop(unit, 0)
+            if offset:
+                try:
+                    self._unit_journal(unit).discard_prefix(offset)
+                    self.save_stats['compactions'] += 1
+                except OSError as e:
+                    print(f"⚠️ Compaction du journal impossible pour {unit}: {e}")
+            
+            store = unit[0]
+            save_bytes += written
+            self.save_stats['stores_written'] += 1
+            self.save_stats['bytes_by_store'][store] = self.save_stats['bytes_by_store'].get(store, 0) + written
+        
+        self.save_stats['saves'] += 1
+        self.save_stats['bytes_written'] += save_bytes
+        self.save_stats['last_save_bytes'] = save_bytes
+        return save_bytes
+    
+    async def flush(self):
+        """Force l'écriture de tous les stores en attente (arrêt du bot)"""
+        return await self.writer.flush()
+    
+    async def drain_outbound(self, timeout):
+        """Attend la fin des envois en file puis arrête les workers"""
+        for collector in list(self.album_collectors.values()):
+            await collector.flush()
+        for coalescer in list(self.edit_coalescers.values()):
+            await coalescer.flush()
+        # Envois différés : non échus, ils restent dans leur journal jusqu'au redémarrage
+        for delayed in list(self.delayed_dispatchers.values()):
+            delayed.close()
+        
+        dispatchers = list(self.dispatchers.values())
+        if not dispatchers:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(dispatcher.join() for dispatcher in dispatchers)),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"⚠️ Envois encore en file après {timeout}s, abandonnés")
+        for dispatcher in dispatchers:
+            dispatcher.close()
     
     async def restore_existing_sessions(self):
         """Restaure automatiquement les sessions existantes"""
@@ -124,6 +856,10 @@ class TeleFeedManager:
         
         for phone_number, session_data in self.sessions.items():
             if isinstance(session_data, dict) and session_data.get('connected'):
+                # Client déjà actif : ne pas en ouvrir un second sur la même session
+                existing = self.clients.get(phone_number)
+                if existing is not None and existing.is_connected():
+                    continue
                 try:
                     # Créer le client avec le nom de session existant
                     session_name = f"telefeed_{phone_number}"
@@ -139,6 +875,7 @@ class TeleFeedManager:
                         # Vérifier si la session est toujours valide
                         if await client.is_user_authorized():
                             self.clients[phone_number] = client
+                            self.load_account(phone_number)
                             # Marquer la session comme restaurée
                             self.sessions[phone_number]['restored_at'] = datetime.now().isoformat()
                             print(f"✅ Session restaurée pour {phone_number}")
@@ -161,135 +898,165 @@ class TeleFeedManager:
                     self.sessions[phone_number]['error'] = str(e)
         
         # Sauvegarder les changements
-        self.save_all_data()
+        self.save_all_data('sessions')
         print(f"🔄 {len(self.clients)} sessions restaurées")
     
     async def setup_redirection_handlers(self, client, phone_number):
         """Configure les gestionnaires de redirection pour un client TeleFeed"""
-        from telethon import events
+        def message_sends(route, event, text):
+            """Envois d'un nouveau message accepté par une redirection, par destination"""
+            # Appliquer les transformations
+            processed_text = route.pipeline.transform(text)
+            
+            # Réponse : envoyée en réponse au message destination correspondant (résolu à l'envoi)
+            reply = bool(route.settings.get('process_reply', True) and getattr(event, 'reply_to_msg_id', None))
+            
+            # Message transmis tel quel : transfert côté serveur, regroupé par destination
+            if FORWARD_FAST_PATH and route.pipeline.is_identity and not reply:
+                return [
+                    (dest_id, BatchSend(
+                        ('forward', event.chat_id), event,
+                        functools.partial(self.forward_to_destination, client, phone_number, dest_id),
+                        FORWARD_BATCH_SIZE
+                    ))
+                    for dest_id in route.destinations
+                ]
+            
+            # Envoyer vers les destinations
+            return [
+                (dest_id, functools.partial(
+                    self.send_to_destination, client, phone_number, event, dest_id, processed_text, reply))
+                for dest_id in route.destinations
+            ]
         
-        async def message_handler(event, is_edit=False):
+        def album_sends(route, album_events):
+            """Envois groupés d'un album accepté par une redirection, par destination"""
+            reply = bool(route.settings.get('process_reply', True)
+                         and getattr(album_events[0], 'reply_to_msg_id', None))
+            
+            if FORWARD_FAST_PATH and route.pipeline.is_identity and not reply:
+                return [
+                    (dest_id, functools.partial(
+                        self.forward_to_destination, client, phone_number, dest_id, album_events))
+                    for dest_id in route.destinations
+                ]
+            
+            captions = [route.pipeline.transform(event.raw_text or '') for event in album_events]
+            return [
+                (dest_id, functools.partial(
+                    self.send_album_to_destination, client, phone_number, album_events, dest_id, captions, reply))
+                for dest_id in route.destinations
+            ]
+        
+        async def message_handler(event, is_edit=False, received_at=None):
             """Gestionnaire des messages pour redirection"""
-            # Vérifier les redirections pour ce numéro
-            redirections = self.redirections.get(phone_number, {})
+            if received_at is None:
+                received_at = time.monotonic()
+            
+            # Redirections actives dont ce chat est une source (une recherche dans la table compilée)
+            routes = self.routing_table(phone_number).get(event.chat_id)
+            if not routes:
+                return
+            
+            # Partie d'album : traitée avec les autres parties une fois l'album complet
+            if not is_edit and event.grouped_id and ALBUM_COLLECT_WINDOW > 0:
+                self.album_collectors[str(phone_number)].add(event, received_at)
+                return
             
-            for redir_id, redir_data in redirections.items():
-                if not redir_data.get('active', True):
+            delayed = self.delayed_dispatchers[str(phone_number)]
+            # Édition d'un message dont l'envoi différé est en attente : il partira édité
+            pending = delayed.update(event) if is_edit and len(delayed) else ()
+            
+            sends = []
+            digest = None
+            for route in routes:
+                text = event.raw_text or ''
+                
+                # Vérifier les filtres
+                if not route.pipeline.accepts(text):
                     continue
                 
-                # Vérifier si ce chat est dans les sources
-                if event.chat_id in redir_data.get('sources', []):
-                    text = event.raw_text or ''
-                    
-                    # Vérifier les filtres
-                    if not self.should_process_message(text, phone_number, redir_id):
+                # Contenu déjà redirigé récemment par cette redirection : aucun envoi
+                if not is_edit and route.settings.get('drop_duplicates', False):
+                    if digest is None:
+                        digest = content_hash([event])
+                    if self.is_duplicate(phone_number, route.redirection_id, digest):
                         continue
-                    
-                    # Appliquer les transformations
-                    processed_text = self.apply_transformations(text, phone_number, redir_id)
-                    
-                    # Envoyer vers les destinations
-                    for dest_id in redir_data.get('destinations', []):
-                        try:
-                            # Clé unique pour ce message source
-                            source_key = f"{event.chat_id}_{event.id}"
-                            
-                            if is_edit:
-                                # Message édité - essayer de modifier le message existant
-                                dest_message_id = self.message_mapping.get(source_key, {}).get(str(dest_id))
-                                if dest_message_id:
-                                    try:
-                                        # Éditer en tant que canal/groupe
-                                        await client.edit_message(
-                                            dest_id, 
-                                            dest_message_id, 
-                                            processed_text,
-                                            schedule=None
-                                        )
-                                        print(f"✅ Message édité dans {dest_id}")
-                                        continue
-                                    except Exception as e:
-                                        print(f"⚠️ Impossible d'éditer: {e}")
-                                        # Si l'édition échoue, ne pas envoyer un nouveau message
-                                        continue
-                                else:
-                                    # Pas de correspondance trouvée pour ce message édité
-                                    print(f"⚠️ Aucune correspondance trouvée pour édition {source_key}")
-                                    continue
-                            else:
-                                # Nouveau message - envoyer AUTHENTIQUEMENT comme le canal de destination
-                                try:
-                                    # Obtenir l'entité du canal de destination
-                                    destination_entity = await client.get_entity(dest_id)
-                                    
-                                    # CORRECTION : Envoyer comme le canal lui-même (pas le client)
-                                    if hasattr(destination_entity, 'broadcast') and destination_entity.broadcast:
-                                        # Pour un canal : Utiliser send_message avec from_peer
-                                        try:
-                                            # Envoyer comme si c'était le canal qui poste
-                                            sent_message = await client.send_message(
-                                                destination_entity,
-                                                processed_text,
-                                                silent=False,
-                                                from_peer=destination_entity  # CLEF : Envoyer AU NOM DU CANAL
-                                            )
-                                            print(f"✅ Message authentique envoyé par canal {dest_id}")
-                                        except Exception as auth_error:
-                                            print(f"⚠️ Échec authentique: {auth_error}")
-                                            # Fallback : Message normal avec indication
-                                            sent_message = await client.send_message(
-                                                destination_entity,
-                                                f"🔄 {processed_text}",
-                                                silent=False
-                                            )
-                                            print(f"✅ Message normal envoyé vers canal {dest_id}")
-                                    elif hasattr(destination_entity, 'megagroup') and destination_entity.megagroup:
-                                        # Pour un supergroupe : Tenter envoi authentique
-                                        try:
-                                            sent_message = await client.send_message(
-                                                destination_entity,
-                                                processed_text,
-                                                from_peer=destination_entity
-                                            )
-                                            print(f"✅ Message authentique envoyé par groupe {dest_id}")
-                                        except Exception:
-                                            # Fallback normal
-                                            sent_message = await client.send_message(
-                                                destination_entity,
-                                                processed_text
-                                            )
-                                            print(f"✅ Message normal envoyé vers groupe {dest_id}")
-                                    else:
-                                        # Groupe normal : envoyer normalement
-                                        sent_message = await client.send_message(
-                                            destination_entity,
-                                            processed_text
-                                        )
-                                        print(f"✅ Message envoyé vers groupe {dest_id}")
-                                    
-                                    # Sauvegarder la correspondance pour futures éditions
-                                    if source_key not in self.message_mapping:
-                                        self.message_mapping[source_key] = {}
-                                    self.message_mapping[source_key][str(dest_id)] = sent_message.id
-                                    self.save_all_data()
-                                    
-                                except Exception as e:
-                                    print(f"❌ Erreur envoi: {e}")
-                                    try:
-                                        # Fallback: envoyer avec ID direct
-                                        sent_message = await client.send_message(dest_id, processed_text)
-                                        
-                                        if source_key not in self.message_mapping:
-                                            self.message_mapping[source_key] = {}
-                                        self.message_mapping[source_key][str(dest_id)] = sent_message.id
-                                        self.save_all_data()
-                                        
-                                        print(f"✅ Message envoyé vers {dest_id} (fallback)")
-                                    except Exception as e2:
-                                        print(f"❌ Erreur fallback: {e2}")
-                            
-                        except Exception as e:
-                            print(f"❌ Erreur redirection vers {dest_id}: {e}")
+                
+                if is_edit:
+                    if route.redirection_id in pending:
+                        continue
+                    processed_text = route.pipeline.transform(text)
+                    for dest_id in route.destinations:
+                        sends.append((dest_id, functools.partial(
+                            self.edit_destination, client, phone_number, event, dest_id, processed_text)))
+                    continue
+                
+                # Redirection avec délai : envoi programmé, transmis aux files à son échéance
+                delay = self.route_delay(phone_number, route.redirection_id)
+                if delay > 0:
+                    delayed.schedule(route.redirection_id, [event], delay,
+                                     route.settings.get('delay_spread_mode', False))
+                    continue
+                
+                sends.extend(message_sends(route, event, text))
+            
+            # Mise en file par destination : les envois partent en parallèle entre
+            # destinations, dans l'ordre des messages pour chacune, sans bloquer la réception
+            key = (event.chat_id, event.id, 'edit') if is_edit else None
+            await self.dispatcher(phone_number).submit(received_at, sends, key=key)
+        
+        async def album_handler(album_events, received_at):
+            """Gestionnaire des albums complets : un seul envoi groupé par destination"""
+            routes = self.routing_table(phone_number).get(album_events[0].chat_id)
+            
+            # La légende de l'album (portée par l'une des parties) décide des filtres
+            caption = '\n'.join(event.raw_text for event in album_events if event.raw_text)
+            
+            sends = []
+            digest = None
+            for route in routes:
+                if not route.pipeline.accepts(caption):
+                    continue
+                
+                if route.settings.get('drop_duplicates', False):
+                    if digest is None:
+                        digest = content_hash(album_events)
+                    if self.is_duplicate(phone_number, route.redirection_id, digest):
+                        continue
+                
+                delay = self.route_delay(phone_number, route.redirection_id)
+                if delay > 0:
+                    self.delayed_dispatchers[str(phone_number)].schedule(
+                        route.redirection_id, album_events, delay, route.settings.get('delay_spread_mode', False))
+                    continue
+                
+                sends.extend(album_sends(route, album_events))
+            
+            await self.dispatcher(phone_number).submit(received_at, sends)
+        
+        async def delayed_handler(record, delayed_events):
+            """Envoi différé arrivé à échéance (messages relus s'il vient du journal)"""
+            received_at = time.monotonic()
+            route = next((
+                route for route in self.routing_table(phone_number).get(record['chat'])
+                if route.redirection_id == record['redirection']
+            ), None)
+            if route is None:
+                return  # Redirection supprimée ou désactivée entre-temps
+            
+            if delayed_events is None:
+                messages = await client.get_messages(record['chat'], ids=record['msgs'])
+                delayed_events = [events.NewMessage.Event(message) for message in messages if message is not None]
+                if not delayed_events:
+                    print(f"⚠️ Envoi différé abandonné : messages {record['msgs']} de {record['chat']} introuvables")
+                    return
+            
+            if len(delayed_events) > 1:
+                sends = album_sends(route, delayed_events)
+            else:
+                sends = message_sends(route, delayed_events[0], delayed_events[0].raw_text or '')
+            await self.dispatcher(phone_number).submit(received_at, sends)
         
         async def new_message_handler(event):
             """Gestionnaire spécifique pour nouveaux messages"""
@@ -297,12 +1064,366 @@ class TeleFeedManager:
         
         async def edit_message_handler(event):
             """Gestionnaire spécifique pour messages édités"""
+            # Rafale d'éditions d'un message : seule la dernière de la fenêtre est traitée
+            if EDIT_DEBOUNCE_WINDOW > 0:
+                if self.routing_table(phone_number).get(event.chat_id):
+                    self.edit_coalescers[str(phone_number)].add(event)
+                return
             await message_handler(event, is_edit=True)
         
-        # Enregistrer les gestionnaires séparés sur ce client
-        client.add_event_handler(new_message_handler, events.NewMessage)
-        client.add_event_handler(edit_message_handler, events.MessageEdited)
-        print(f"📡 Gestionnaire de redirection activé pour {phone_number} (messages + éditions)")
+        async def deleted_message_handler(event):
+            """Gestionnaire des messages supprimés : suppression groupée dans les destinations"""
+            received_at = time.monotonic()
+            deletions = self.resolve_deleted(phone_number, event.chat_id, event.deleted_ids)
+            
+            sends = []
+            for dest_id, dest_msg_ids in deletions.items():
+                delete = functools.partial(self.delete_in_destination, client, phone_number, dest_id)
+                for dest_msg_id in dest_msg_ids:
+                    sends.append((dest_id, BatchSend(('delete',), dest_msg_id, delete, DELETE_BATCH_SIZE)))
+            await self.dispatcher(phone_number).submit(received_at, sends)
+        
+        async def debounced_edit_handler(event, received_at):
+            """Dernière édition d'un message à la fin de sa fenêtre de regroupement"""
+            await message_handler(event, is_edit=True, received_at=received_at)
+        
+        # Reconfiguration : transmettre les albums et éditions encore en attente
+        previous_collector = self.album_collectors.get(str(phone_number))
+        if previous_collector is not None:
+            await previous_collector.flush()
+        previous_coalescer = self.edit_coalescers.get(str(phone_number))
+        if previous_coalescer is not None:
+            await previous_coalescer.flush()
+        self.album_collectors[str(phone_number)] = AlbumCollector(ALBUM_COLLECT_WINDOW, album_handler)
+        self.edit_coalescers[str(phone_number)] = EditCoalescer(EDIT_DEBOUNCE_WINDOW, debounced_edit_handler)
+        
+        # Envois différés : un seul tas par compte, reprogrammé depuis son journal
+        previous = self.delayed_dispatchers.get(str(phone_number))
+        if previous is not None:
+            previous.close()
+        delayed = self.delayed_dispatchers[str(phone_number)] = DelayedDispatcher(
+            os.path.join(ACCOUNTS_DIR, str(phone_number), DELAYED_JOURNAL_NAME),
+            delayed_handler,
+            DELAYED_COMPACT_RECORDS,
+            DELAY_SPREAD_SLOTS
+        )
+        restored = delayed.load()
+        delayed.start()
+        if restored:
+            print(f"⏳ {restored} envoi(s) différé(s) reprogrammé(s) pour {phone_number}")
+        
+        # Destinations résolues une fois par client, pré-chargées en tâche de fond
+        cache = self.destination_cache(phone_number, client)
+        cache.schedule_warm(self.routing_table(phone_number).destination_chats())
+        
+        # Enregistrer les gestionnaires séparés sur ce client, filtrés sur les chats source
+        self.event_handlers[str(phone_number)] = {
+            'client': client,
+            'callbacks': {
+                CountingNewMessage: new_message_handler,
+                CountingMessageEdited: edit_message_handler
+            },
+            'sources': None,
+            'stats': FilterStats()
+        }
+        self.routing_table(phone_number)
+        self.refresh_source_filters(phone_number)
+        
+        # Suppressions : sans filtre chats=, le chat n'est connu que pour les canaux
+        self.handler_registry.register(phone_number, client, deleted_message_handler, events.MessageDeleted())
+        print(f"📡 Gestionnaire de redirection activé pour {phone_number} (messages + éditions + suppressions)")
+    
+    def dispatcher(self, phone_number):
+        """Files d'envoi d'un compte"""
+        phone_number = str(phone_number)
+        dispatcher = self.dispatchers.get(phone_number)
+        if dispatcher is None:
+            dispatcher = self.dispatchers[phone_number] = OutboundDispatcher(
+                FANOUT_CONCURRENCY,
+                OUTBOUND_QUEUE_SIZE,
+                OUTBOUND_OVERFLOW_POLICY,
+                RateScheduler(
+                    ACCOUNT_SEND_RATE, ACCOUNT_SEND_RATE,
+                    CHAT_SENDS_PER_MINUTE / 60, CHAT_SENDS_PER_MINUTE
+                )
+            )
+        return dispatcher
+    
+    def destination_cache(self, phone_number, client=None):
+        """Cache des destinations d'un compte (recréé si le client a changé)"""
+        phone_number = str(phone_number)
+        cache = self.destination_caches.get(phone_number)
+        if client is None:
+            client = self.clients.get(phone_number)
+        if cache is None or (client is not None and cache.client is not client):
+            cache = self.destination_caches[phone_number] = DestinationCache(client, DESTINATION_CACHE_TTL)
+        return cache
+    
+    def media_fanout(self, phone_number, client=None):
+        """Envois de médias d'un compte (recréés si le client a changé)"""
+        phone_number = str(phone_number)
+        fanout = self.media_fanouts.get(phone_number)
+        if client is None:
+            client = self.clients.get(phone_number)
+        if fanout is None or (client is not None and fanout.client is not client):
+            fanout = self.media_fanouts[phone_number] = MediaFanout(
+                client, MEDIA_CACHE_DIR, MEDIA_UPLOAD_TTL, MEDIA_CACHE_MAX_MB * 1024 * 1024
+            )
+        return fanout
+    
+    async def send_media_to_destination(self, client, phone_number, event, dest_id, processed_text, reply_to=None):
+        """Envoie le média d'un message (légende transformée) ; None si l'envoi a échoué"""
+        cache = self.destination_cache(phone_number, client)
+        try:
+            destination = await cache.get(dest_id)
+            sent_message = await self.media_fanout(phone_number, client).send(
+                destination.peer, event.message, processed_text, reply_to
+            )
+        except Exception as e:
+            if flood_wait_seconds(e) is not None:
+                raise
+            cache.invalidate_on_error(dest_id, e)
+            print(f"⚠️ Média non envoyé vers {dest_id} ({e}), envoi du texte seul")
+            return None
+        
+        self.record_mapping(event.chat_id, event.id, dest_id, sent_message.id, processed_text)
+        print(f"✅ Média envoyé vers {dest_id}")
+        return sent_message
+    
+    def reply_target(self, event, dest_id):
+        """Message destination auquel répondre si event est une réponse (None sinon ou si inconnu)"""
+        reply_to_msg_id = getattr(event, 'reply_to_msg_id', None)
+        if not reply_to_msg_id:
+            return None
+        return self.reply_resolver.resolve(event.chat_id, reply_to_msg_id, dest_id)
+    
+    async def send_to_destination(self, client, phone_number, event, dest_id, processed_text, reply=False):
+        """Envoie un nouveau message vers une destination et enregistre la correspondance
+        
+        Avec reply, une réponse dans le chat source est envoyée en réponse au message
+        destination correspondant. Les envois d'une destination partant dans l'ordre,
+        le message répondu est déjà dans le mapping s'il a été redirigé.
+        """
+        cache = self.destination_cache(phone_number, client)
+        reply_to = self.reply_target(event, dest_id) if reply else None
+        
+        # Photo ou document : envoyé avec sa légende (référence réutilisée ou upload unique)
+        if MediaFanout.is_media(getattr(event, 'message', None)):
+            sent_message = await self.send_media_to_destination(
+                client, phone_number, event, dest_id, processed_text, reply_to
+            )
+            if sent_message is not None:
+                return sent_message
+        
+        # Nouveau message - envoyer AUTHENTIQUEMENT comme le canal de destination
+        try:
+            # Entité du canal de destination (résolue une seule fois, puis en cache)
+            destination = await cache.get(dest_id)
+            peer = destination.peer
+            
+            # CORRECTION : Envoyer comme le canal lui-même (pas le client)
+            if destination.kind == 'channel':
+                # Pour un canal : Utiliser send_message avec from_peer
+                try:
+                    # Envoyer comme si c'était le canal qui poste
+                    sent_message = await client.send_message(
+                        peer,
+                        processed_text,
+                        silent=False,
+                        from_peer=peer,  # CLEF : Envoyer AU NOM DU CANAL
+                        reply_to=reply_to
+                    )
+                    print(f"✅ Message authentique envoyé par canal {dest_id}")
+                except Exception as auth_error:
+                    if flood_wait_seconds(auth_error) is not None or cache.invalidate_on_error(dest_id, auth_error):
+                        raise
+                    print(f"⚠️ Échec authentique: {auth_error}")
+                    # Fallback : Message normal avec indication
+                    sent_message = await client.send_message(
+                        peer,
+                        f"🔄 {processed_text}",
+                        silent=False,
+                        reply_to=reply_to
+                    )
+                    print(f"✅ Message normal envoyé vers canal {dest_id}")
+            elif destination.kind == 'megagroup':
+                # Pour un supergroupe : Tenter envoi authentique
+                try:
+                    sent_message = await client.send_message(
+                        peer,
+                        processed_text,
+                        from_peer=peer,
+                        reply_to=reply_to
+                    )
+                    print(f"✅ Message authentique envoyé par groupe {dest_id}")
+                except Exception as auth_error:
+                    if flood_wait_seconds(auth_error) is not None or cache.invalidate_on_error(dest_id, auth_error):
+                        raise
+                    # Fallback normal
+                    sent_message = await client.send_message(
+                        peer,
+                        processed_text,
+                        reply_to=reply_to
+                    )
+                    print(f"✅ Message normal envoyé vers groupe {dest_id}")
+            else:
+                # Groupe normal : envoyer normalement
+                sent_message = await client.send_message(
+                    peer,
+                    processed_text,
+                    reply_to=reply_to
+                )
+                print(f"✅ Message envoyé vers groupe {dest_id}")
+            
+            # Sauvegarder la correspondance pour futures éditions
+            self.record_mapping(event.chat_id, event.id, dest_id, sent_message.id, processed_text)
+            return sent_message
+            
+        except Exception as e:
+            # FloodWait : l'envoi sera retenté par le RateScheduler de la file
+            if flood_wait_seconds(e) is not None:
+                raise
+            cache.invalidate_on_error(dest_id, e)
+            print(f"❌ Erreur envoi: {e}")
+            try:
+                # Fallback: envoyer avec ID direct
+                sent_message = await client.send_message(dest_id, processed_text, reply_to=reply_to)
+                
+                self.record_mapping(event.chat_id, event.id, dest_id, sent_message.id, processed_text)
+                
+                print(f"✅ Message envoyé vers {dest_id} (fallback)")
+                return sent_message
+            except Exception as e2:
+                if flood_wait_seconds(e2) is not None:
+                    raise
+                print(f"❌ Erreur fallback: {e2}")
+                return None
+    
+    async def forward_to_destination(self, client, phone_number, dest_id, source_events):
+        """Transfère des messages d'un même chat source vers une destination en un appel
+
+        drop_author=True publie une copie (médias compris) sans mention « Transféré de ».
+        Si le transfert est refusé (contenu protégé...), chaque message est renvoyé en texte ;
+        un FloodWait pendant ces renvois est attendu ici et seul le message concerné est
+        retenté (le lot n'est pas rejoué, les messages déjà renvoyés ne sont pas dupliqués).
+        """
+        cache = self.destination_cache(phone_number, client)
+        source_chat = source_events[0].chat_id
+        try:
+            destination = await cache.get(dest_id)
+            sent_messages = await client.forward_messages(
+                destination.peer,
+                [event.id for event in source_events],
+                from_peer=source_chat,
+                drop_author=True
+            )
+        except Exception as e:
+            if flood_wait_seconds(e) is not None:
+                raise
+            cache.invalidate_on_error(dest_id, e)
+            print(f"⚠️ Transfert impossible vers {dest_id} ({e}), renvoi du texte")
+            scheduler = self.dispatcher(phone_number).scheduler
+            for event in source_events:
+                while True:
+                    try:
+                        await self.send_to_destination(client, phone_number, event, dest_id, event.raw_text or '')
+                        break
+                    except Exception as send_error:
+                        seconds = flood_wait_seconds(send_error)
+                        if seconds is None:
+                            raise
+                        print(f"⏳ FloodWait de {seconds}s pour {dest_id} pendant le renvoi du message {event.id}")
+                        scheduler.flood_wait(dest_id, seconds)
+                        await scheduler.acquire(dest_id)
+            return None
+        
+        if not isinstance(sent_messages, list):
+            sent_messages = [sent_messages]
+        for event, sent_message in zip(source_events, sent_messages):
+            if sent_message is not None:
+                self.record_mapping(source_chat, event.id, dest_id, sent_message.id, event.raw_text or '')
+        print(f"✅ {len(source_events)} message(s) transféré(s) vers {dest_id}")
+        return sent_messages
+    
+    async def send_album_to_destination(self, client, phone_number, album_events, dest_id, captions, reply=False):
+        """Envoie un album (médias des parties, légendes transformées) en un seul envoi groupé
+
+        Chaque partie source est associée au message envoyé correspondant, pour les éditions.
+        """
+        cache = self.destination_cache(phone_number, client)
+        reply_to = self.reply_target(album_events[0], dest_id) if reply else None
+        try:
+            destination = await cache.get(dest_id)
+            sent_messages = await self.media_fanout(phone_number, client).send_album(
+                destination.peer,
+                [event.message for event in album_events],
+                captions,
+                reply_to
+            )
+        except Exception as e:
+            if flood_wait_seconds(e) is not None:
+                raise
+            cache.invalidate_on_error(dest_id, e)
+            print(f"❌ Erreur envoi album vers {dest_id}: {e}")
+            return None
+        
+        if not isinstance(sent_messages, list):
+            sent_messages = [sent_messages]
+        for event, caption, sent_message in zip(album_events, captions, sent_messages):
+            if sent_message is not None:
+                self.record_mapping(event.chat_id, event.id, dest_id, sent_message.id, caption)
+        print(f"✅ Album de {len(album_events)} médias envoyé vers {dest_id}")
+        return sent_messages
+    
+    async def delete_in_destination(self, client, phone_number, dest_id, dest_msg_ids):
+        """Supprime des messages redirigés dans une destination en un appel (au plus 100)"""
+        cache = self.destination_cache(phone_number, client)
+        try:
+            destination = await cache.get(dest_id)
+            await client.delete_messages(destination.peer, dest_msg_ids, revoke=True)
+        except Exception as e:
+            if flood_wait_seconds(e) is not None:
+                raise
+            cache.invalidate_on_error(dest_id, e)
+            print(f"⚠️ Suppression impossible dans {dest_id}: {e}")
+            return False
+        print(f"🗑️ {len(dest_msg_ids)} message(s) supprimé(s) dans {dest_id}")
+        return True
+    
+    async def edit_destination(self, client, phone_number, event, dest_id, processed_text):
+        """Répercute l'édition d'un message source sur le message envoyé à une destination"""
+        # Message édité - essayer de modifier le message existant
+        dest_message_id = self.message_mapping.get(event.chat_id, event.id, dest_id)
+        if not dest_message_id:
+            # Pas de correspondance trouvée pour ce message édité
+            print(f"⚠️ Aucune correspondance trouvée pour édition {event.chat_id}_{event.id}")
+            return False
+        
+        # Texte transformé identique au dernier envoyé : rien à éditer
+        sent_key = (event.chat_id, event.id, dest_id)
+        if self.sent_hashes.unchanged(sent_key, processed_text):
+            return True
+        
+        cache = self.destination_cache(phone_number, client)
+        try:
+            destination = await cache.get(dest_id)
+            # Éditer en tant que canal/groupe
+            await client.edit_message(
+                destination.peer,
+                dest_message_id,
+                processed_text,
+                schedule=None
+            )
+            self.sent_hashes.record(sent_key, processed_text)
+            print(f"✅ Message édité dans {dest_id}")
+            return True
+        except Exception as e:
+            if flood_wait_seconds(e) is not None:
+                raise
+            cache.invalidate_on_error(dest_id, e)
+            # Si l'édition échoue, ne pas envoyer un nouveau message
+            print(f"⚠️ Impossible d'éditer: {e}")
+            return False
     
     async def connect_account(self, phone_number, api_id, api_hash):
         """Connecte un compte Telegram avec persistance automatique"""
@@ -323,8 +1444,9 @@ class TeleFeedManager:
                         
                         if await client.is_user_authorized():
                             self.clients[phone_number] = client
+                            self.load_account(phone_number)
                             self.sessions[phone_number]['restored_at'] = datetime.now().isoformat()
-                            self.save_all_data()
+                            self.save_all_data('sessions')
                             
                             # Enregistrer le gestionnaire de redirection sur ce client restauré
                             await self.setup_redirection_handlers(client, phone_number)
@@ -352,12 +1474,13 @@ class TeleFeedManager:
             else:
                 # Déjà autorisé (session valide)
                 self.clients[phone_number] = client
+                self.load_account(phone_number)
                 self.sessions[phone_number] = {
                     'connected': True,
                     'connected_at': datetime.now().isoformat(),
                     'session_file': f"{session_name}.session"
                 }
-                self.save_all_data()
+                self.save_all_data('sessions')
                 
                 # Enregistrer le gestionnaire de redirection sur ce client
                 await self.setup_redirection_handlers(client, phone_number)
@@ -375,6 +1498,7 @@ class TeleFeedManager:
             
             # Enregistrer le client et la session
             self.clients[phone_number] = client
+            self.load_account(phone_number)
             session_name = f"telefeed_{phone_number}"
             self.sessions[phone_number] = {
                 'connected': True,
@@ -382,7 +1506,7 @@ class TeleFeedManager:
                 'session_file': f"{session_name}.session",
                 'verified_with_code': True
             }
-            self.save_all_data()
+            self.save_all_data('sessions')
             
             # Enregistrer le gestionnaire de redirection sur ce client
             await self.setup_redirection_handlers(client, phone_number)
@@ -428,7 +1552,7 @@ class TeleFeedManager:
             
             # Sauvegarder les chats
             self.chats[phone_number] = chats
-            self.save_all_data()
+            self.save_all_data('chats', phone=phone_number)
             
             return {'status': 'success', 'chats': chats}
             
@@ -438,21 +1562,15 @@ class TeleFeedManager:
     def add_redirection(self, phone_number, redirection_id, sources, destinations):
         """Ajoute une redirection"""
         try:
-            if phone_number not in self.redirections:
-                self.redirections[phone_number] = {}
-            
-            self.redirections[phone_number][redirection_id] = {
+            self.update_store('redirections', phone_number, [redirection_id], {
                 'sources': sources,
                 'destinations': destinations,
                 'created_at': datetime.now().isoformat(),
                 'active': True
-            }
+            })
             
             # Paramètres par défaut
-            if phone_number not in self.settings:
-                self.settings[phone_number] = {}
-            
-            self.settings[phone_number][redirection_id] = {
+            self.update_store('settings', phone_number, [redirection_id], {
                 'process_reply': True,
                 'process_edit': True,
                 'process_delete': True,
@@ -460,10 +1578,13 @@ class TeleFeedManager:
                 'process_forward': False,
                 'process_raw': False,
                 'process_duplicates': True,
+                'drop_duplicates': False,
                 'delay_spread_mode': False
-            }
+            })
             
-            self.save_all_data()
+            # Résoudre les destinations avant le premier message
+            if phone_number in self.clients:
+                self.destination_cache(phone_number).schedule_warm(destinations)
             return True
             
         except Exception as e:
@@ -473,108 +1594,110 @@ class TeleFeedManager:
     def remove_redirection(self, phone_number, redirection_id):
         """Supprime une redirection"""
         try:
-            if phone_number in self.redirections and redirection_id in self.redirections[phone_number]:
-                del self.redirections[phone_number][redirection_id]
+            if redirection_id in self.redirections.get(phone_number, {}):
+                self.delete_from_store('redirections', phone_number, [redirection_id])
                 
-            if phone_number in self.settings and redirection_id in self.settings[phone_number]:
-                del self.settings[phone_number][redirection_id]
-                
-            self.save_all_data()
+            if redirection_id in self.settings.get(phone_number, {}):
+                self.delete_from_store('settings', phone_number, [redirection_id])
+            
+            self.duplicate_filters.pop((str(phone_number), redirection_id), None)
             return True
         except:
             return False
     
-    def apply_transformations(self, text, phone_number, redirection_id):
-        """Applique les transformations sur le texte"""
-        if not text:
-            return text
-            
-        # Format transformation
-        format_data = self.transformations.get(phone_number, {}).get(redirection_id, {}).get('format')
-        if format_data:
-            template = format_data.get('template', '[[Message.Text]]')
-            text = template.replace('[[Message.Text]]', text)
-        
-        # Power transformation
-        power_data = self.transformations.get(phone_number, {}).get(redirection_id, {}).get('power')
-        if power_data:
-            rules = power_data.get('rules', [])
-            for rule in rules:
-                if '=' in rule:
-                    # Regex rule
-                    pattern, replacement = rule.split('=', 1)
-                    try:
-                        text = re.sub(pattern, replacement, text, flags=re.MULTILINE | re.DOTALL)
-                    except:
-                        pass
-                elif '","' in rule:
-                    # Simple replacement
-                    rule = rule.strip('"')
-                    if '","' in rule:
-                        old, new = rule.split('","', 1)
-                        text = text.replace(old, new)
-        
-        # Remove lines transformation
-        remove_lines_data = self.transformations.get(phone_number, {}).get(redirection_id, {}).get('removeLines')
-        if remove_lines_data:
-            keywords = remove_lines_data.get('keywords', [])
-            lines = text.split('\n')
-            filtered_lines = []
-            
-            for line in lines:
-                should_remove = False
-                for keyword in keywords:
-                    if keyword in line:
-                        should_remove = True
-                        break
-                if not should_remove:
-                    filtered_lines.append(line)
-            
-            text = '\n'.join(filtered_lines)
+    def is_duplicate(self, phone_number, redirection_id, digest):
+        """Vrai si la redirection a déjà transmis ce contenu dans la fenêtre DEDUPE_WINDOW"""
+        key = (str(phone_number), redirection_id)
+        duplicate_filter = self.duplicate_filters.get(key)
+        if duplicate_filter is None:
+            duplicate_filter = self.duplicate_filters[key] = DuplicateFilter(DEDUPE_WINDOW, DEDUPE_MAX_ENTRIES)
+        if duplicate_filter.is_duplicate(digest):
+            print(f"🔁 Doublon ignoré pour la redirection {redirection_id}")
+            return True
+        return False
+    
+    def route_delay(self, phone_number, redirection_id):
+        """Délai (secondes) d'une redirection : telefeed_delay du compte, sinon delay.json"""
+        entry = self.delay.get(str(phone_number), {}).get(redirection_id)
+        if entry is None:
+            entry = self.legacy_delay.get(redirection_id)
+        if not isinstance(entry, dict):
+            return 0
+        try:
+            seconds = float(entry.get('seconds', 0))
+        except (TypeError, ValueError):
+            return 0
+        # Valeur invalide (nan, inf, négative) écrite à la main : aucun délai ; au-delà du maximum : borné
+        if not math.isfinite(seconds) or seconds <= 0:
+            return 0
+        return min(seconds, MAX_ROUTE_DELAY)
+    
+    def set_route_delay(self, redirection_id, seconds=None):
+        """Définit (ou supprime avec seconds=None) le délai d'une redirection
+        
+        La redirection est recherchée dans tous les comptes ; retourne les comptes modifiés.
+        Lève ValueError pour un délai non fini, négatif ou supérieur à MAX_ROUTE_DELAY.
+        """
+        if seconds is not None and not (math.isfinite(seconds) and 0 <= seconds <= MAX_ROUTE_DELAY):
+            raise ValueError(f"Délai invalide: {seconds}")
+        phones = [
+            phone for phone in self.redirections.phones()
+            if redirection_id in self.redirections.get(phone, {})
+        ]
+        for phone in phones:
+            if seconds is None:
+                if redirection_id in self.delay.get(phone, {}):
+                    self.delete_from_store('delay', phone, [redirection_id])
+            else:
+                self.update_store('delay', phone, [redirection_id], {
+                    'seconds': seconds,
+                    'updated_at': datetime.now().isoformat()
+                })
+        return phones
+    
+    def set_route_setting(self, redirection_id, key, value):
+        """Modifie un paramètre (telefeed_settings) d'une redirection dans tous ses comptes
         
-        return text
+        Retourne les comptes modifiés ; la table de routage est recompilée.
+        """
+        phones = [
+            phone for phone in self.redirections.phones()
+            if redirection_id in self.redirections.get(phone, {})
+        ]
+        for phone in phones:
+            self.update_store('settings', phone, [redirection_id, key], value)
+        return phones
+    
+    def get_duplicate_stats(self, phone_number):
+        """Doublons écartés sur l'ensemble des redirections d'un compte (None si aucune vérification)"""
+        phone_number = str(phone_number)
+        filters = [f for (phone, _), f in self.duplicate_filters.items() if phone == phone_number]
+        checked = sum(f.checked for f in filters)
+        if not checked:
+            return None
+        hits = sum(f.hits for f in filters)
+        return {
+            'checked': checked,
+            'hits': hits,
+            'hit_rate': round(hits / checked, 3),
+            'size': sum(len(f) for f in filters)
+        }
+    
+    def compile_pipeline(self, phone_number, redirection_id):
+        """Compile les filtres et transformations d'une redirection"""
+        return CompiledPipeline(
+            self.transformations.get(phone_number, {}).get(redirection_id),
+            self.whitelist.get(phone_number, {}).get(redirection_id),
+            self.blacklist.get(phone_number, {}).get(redirection_id)
+        )
+    
+    def apply_transformations(self, text, phone_number, redirection_id):
+        """Applique les transformations (format, power, removeLines) sur le texte"""
+        return self.compile_pipeline(phone_number, redirection_id).transform(text)
     
     def should_process_message(self, text, phone_number, redirection_id):
         """Vérifie si le message doit être traité (whitelist/blacklist)"""
-        # Vérifier la blacklist
-        blacklist_data = self.blacklist.get(phone_number, {}).get(redirection_id, {})
-        if blacklist_data and blacklist_data.get('active', False):
-            patterns = blacklist_data.get('patterns', [])
-            for pattern in patterns:
-                if isinstance(pattern, str):
-                    if pattern.startswith('"') and pattern.endswith('"'):
-                        # Simple text match
-                        if pattern[1:-1] in text:
-                            return False
-                    else:
-                        # Regex match
-                        try:
-                            if re.search(pattern, text, re.MULTILINE | re.DOTALL):
-                                return False
-                        except:
-                            pass
-        
-        # Vérifier la whitelist
-        whitelist_data = self.whitelist.get(phone_number, {}).get(redirection_id, {})
-        if whitelist_data and whitelist_data.get('active', False):
-            patterns = whitelist_data.get('patterns', [])
-            if patterns:
-                for pattern in patterns:
-                    if isinstance(pattern, str):
-                        if pattern.startswith('"') and pattern.endswith('"'):
-                            # Simple text match
-                            if pattern[1:-1] in text:
-                                return True
-                        else:
-                            # Regex match
-                            try:
-                                if re.search(pattern, text, re.MULTILINE | re.DOTALL):
-                                    return True
-                            except:
-                                pass
-                return False  # Whitelist active but no match
-        
-        return True
+        return self.compile_pipeline(phone_number, redirection_id).accepts(text)
     
     def get_session_status(self, phone_number=None):
         """Récupère le statut des sessions"""
@@ -606,11 +1729,31 @@ class TeleFeedManager:
             
             return status
 
-# Instance globale
-telefeed_manager = TeleFeedManager()
+# Instance globale, créée au premier accès plutôt qu'à l'import du module
+_telefeed_manager = None
+
+def get_telefeed_manager():
+    """Retourne l'instance globale de TeleFeedManager (créée au premier appel)"""
+    global _telefeed_manager
+    if _telefeed_manager is None:
+        _telefeed_manager = TeleFeedManager()
+    return _telefeed_manager
+
+def __getattr__(name):
+    # Compatibilité : telefeed_commands.telefeed_manager crée l'instance à la demande
+    if name == 'telefeed_manager':
+        return get_telefeed_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def flush_pending_writes(drain_timeout=OUTBOUND_DRAIN_TIMEOUT):
+    """Termine les envois en file (au plus drain_timeout secondes) puis écrit les stores en attente"""
+    if _telefeed_manager is not None:
+        await _telefeed_manager.drain_outbound(drain_timeout)
+        await _telefeed_manager.flush()
 
 async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
     """Enregistre tous les handlers TeleFeed et les redirections."""
+    telefeed_manager = get_telefeed_manager()
     
     @bot.on(events.NewMessage(pattern=r'/connect (\d+)'))
     async def connect_handler(event):
@@ -719,7 +1862,14 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
         message = "📊 **STATUT DES SESSIONS TELEFEED**\n\n"
         message += f"📈 **Résumé:**\n"
         message += f"• Sessions enregistrées: {status['total_sessions']}\n"
-        message += f"• Clients actifs: {status['active_clients']}\n\n"
+        message += f"• Clients actifs: {status['active_clients']}\n"
+
+        save_stats = telefeed_manager.save_stats
+        message += f"• Sauvegardes: {save_stats['saves']} ({save_stats['bytes_written']:,} octets, dernière: {save_stats['last_save_bytes']:,})\n"
+        message += f"• Journal: {save_stats['journal_records']} mutation(s) ({save_stats['journal_bytes']:,} octets), {save_stats['compactions']} compaction(s)\n"
+        
+        writer_stats = telefeed_manager.writer.get_stats()
+        message += f"• Écriture différée: {writer_stats['queue_depth']} store(s) en attente, dernière {writer_stats['last_flush_ms']} ms (max {writer_stats['max_flush_ms']} ms)\n\n"
         
         if status['sessions']:
             message += "📱 **Détails des sessions:**\n\n"
@@ -738,6 +1888,75 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 if 'session_file' in session_data:
                     message += f"   💾 Fichier: {session_data['session_file']}\n"
                 
+                filter_stats = telefeed_manager.get_filter_stats(phone)
+                if filter_stats:
+                    message += (f"   📡 {filter_stats['source_chats']} chat(s) source, "
+                                f"{filter_stats['processed_per_s']}/s traités, "
+                                f"{filter_stats['discarded_per_s']}/s écartés "
+                                f"(total {filter_stats['processed']}/{filter_stats['discarded']})\n")
+                
+                duplicate_stats = telefeed_manager.get_duplicate_stats(phone)
+                if duplicate_stats:
+                    message += (f"   🔁 Doublons: {duplicate_stats['hits']}/{duplicate_stats['checked']} "
+                                f"écartés ({duplicate_stats['hit_rate']:.1%}), "
+                                f"{duplicate_stats['size']} empreinte(s) en mémoire\n")
+                
+                coalescer = telefeed_manager.edit_coalescers.get(phone)
+                if coalescer is not None and coalescer.stats['received']:
+                    edit_stats = coalescer.get_stats()
+                    message += (f"   ✏️ Éditions: {edit_stats['received']} reçue(s), "
+                                f"{edit_stats['coalesced']} regroupée(s), "
+                                f"{telefeed_manager.sent_hashes.skipped} sans changement ignorée(s) (tous comptes)\n")
+                
+                handler_count = telefeed_manager.handler_registry.handlers_per_client().get(str(phone))
+                if handler_count is not None:
+                    message += f"   🧩 Gestionnaires sur le client: {handler_count}\n"
+                
+                fanout = telefeed_manager.media_fanouts.get(phone)
+                if fanout is not None and (fanout.stats['by_reference'] or fanout.stats['by_upload']):
+                    media_stats = fanout.get_stats()
+                    message += (f"   📤 Médias: {media_stats['by_reference']} par référence, "
+                                f"{media_stats['by_upload']} par upload ({media_stats['downloads']} téléchargement(s), "
+                                f"{media_stats['uploads']} upload(s))\n")
+                
+                collector = telefeed_manager.album_collectors.get(phone)
+                if collector is not None and collector.stats['albums']:
+                    album_stats = collector.get_stats()
+                    message += (f"   🖼️ Albums: {album_stats['albums']} regroupé(s) "
+                                f"({album_stats['parts']} parties), {album_stats['pending']} en collecte\n")
+                
+                delayed = telefeed_manager.delayed_dispatchers.get(phone)
+                if delayed is not None and (delayed.stats['scheduled'] or len(delayed)):
+                    delayed_stats = delayed.get_stats()
+                    next_due = '' if delayed_stats['next_due_s'] is None else f", prochain dans {delayed_stats['next_due_s']}s"
+                    message += (f"   ⏳ Envois différés: {delayed_stats['pending']} en attente{next_due}, "
+                                f"{delayed_stats['sent']} transmis, {delayed_stats['spread']} étalé(s), "
+                                f"{delayed_stats['cancelled']} annulé(s), {delayed_stats['restored']} reprogrammé(s)\n")
+                
+                dispatcher = telefeed_manager.dispatchers.get(phone)
+                if dispatcher is not None and dispatcher.latency.count:
+                    latency = dispatcher.get_stats()
+                    message += (f"   ⏱️ Latence réception → dernier envoi: p50 {latency['p50_ms']} ms, "
+                                f"p95 {latency['p95_ms']} ms, max {latency['max_ms']} ms\n")
+                    message += (f"   📬 Files d'envoi ({latency['overflow_policy']}): {latency['queued']} en attente, "
+                                f"{latency['dropped']} abandonné(s), {latency['coalesced']} fusionné(s), "
+                                f"{latency['batches']} transfert(s) groupé(s)\n")
+                    for dest_id, depth in dispatcher.queue_depths().items():
+                        if depth:
+                            message += f"      • {dest_id}: {depth}\n"
+                    
+                    rate_stats = dispatcher.scheduler.get_stats()
+                    message += (f"   🚦 Cadencement: {rate_stats['throttled']} envoi(s) espacé(s), "
+                                f"{rate_stats['flood_waits']} FloodWait ({rate_stats['flood_wait_seconds']}s)\n")
+                    for chat_id, remaining in rate_stats['paused_chats'].items():
+                        message += f"      ⏸️ {chat_id}: pause {remaining}s\n"
+                
+                cache = telefeed_manager.destination_caches.get(phone)
+                if cache is not None:
+                    cache_stats = cache.get_stats()
+                    message += (f"   🎯 Destinations en cache: {cache_stats['size']} "
+                                f"({cache_stats['hits']} succès, {cache_stats['misses']} résolutions)\n")
+                
                 message += "\n"
         else:
             message += "📭 Aucune session enregistrée\n"
@@ -1057,32 +2276,25 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
         try:
             response = await asyncio.wait_for(response_future, timeout=120)
             
-            # Initialiser la structure si nécessaire
-            if phone_number not in telefeed_manager.transformations:
-                telefeed_manager.transformations[phone_number] = {}
-            if redirection_id not in telefeed_manager.transformations[phone_number]:
-                telefeed_manager.transformations[phone_number][redirection_id] = {}
-            
-            # Configurer selon le type de transformation
+            # Configurer selon le type de transformation (structure créée si nécessaire)
             if feature == 'format':
-                telefeed_manager.transformations[phone_number][redirection_id]['format'] = {
+                telefeed_manager.update_store('transformations', phone_number, [redirection_id, 'format'], {
                     'template': response.raw_text,
                     'active': True
-                }
+                })
             elif feature == 'power':
                 rules = response.raw_text.split('\n')
-                telefeed_manager.transformations[phone_number][redirection_id]['power'] = {
+                telefeed_manager.update_store('transformations', phone_number, [redirection_id, 'power'], {
                     'rules': rules,
                     'active': True
-                }
+                })
             elif feature == 'removeLines':
                 keywords = [k.strip() for k in response.raw_text.split(',')]
-                telefeed_manager.transformations[phone_number][redirection_id]['removeLines'] = {
+                telefeed_manager.update_store('transformations', phone_number, [redirection_id, 'removeLines'], {
                     'keywords': keywords,
                     'active': True
-                }
+                })
             
-            telefeed_manager.save_all_data()
             await event.reply(f"✅ Transformation **{feature}** configurée pour **{redirection_id}**!")
             
         except asyncio.TimeoutError:
@@ -1121,15 +2333,10 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             
             patterns = response.raw_text.split('\n')
             
-            if phone_number not in telefeed_manager.whitelist:
-                telefeed_manager.whitelist[phone_number] = {}
-            
-            telefeed_manager.whitelist[phone_number][redirection_id] = {
+            telefeed_manager.update_store('whitelist', phone_number, [redirection_id], {
                 'patterns': patterns,
                 'active': True
-            }
-            
-            telefeed_manager.save_all_data()
+            })
             await event.reply(f"✅ Whitelist configurée pour **{redirection_id}**!")
             
         except asyncio.TimeoutError:
@@ -1168,15 +2375,10 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             
             patterns = response.raw_text.split('\n')
             
-            if phone_number not in telefeed_manager.blacklist:
-                telefeed_manager.blacklist[phone_number] = {}
-            
-            telefeed_manager.blacklist[phone_number][redirection_id] = {
+            telefeed_manager.update_store('blacklist', phone_number, [redirection_id], {
                 'patterns': patterns,
                 'active': True
-            }
-            
-            telefeed_manager.save_all_data()
+            })
             await event.reply(f"✅ Blacklist configurée pour **{redirection_id}**!")
             
         except asyncio.TimeoutError:
@@ -1392,6 +2594,8 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 'telefeed_chats.json',
                 'telefeed_delay.json',
                 'telefeed_message_mapping.json',
+                'telefeed_message_mapping.journal',
+                'telefeed_message_mapping.db',
                 'users.json',
                 'redirections.json',
                 'filters.json',
@@ -1403,11 +2607,29 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 'telefeed_commands.py'
             ]
             
+            # Écrire les stores en attente (et valider le mapping SQLite) avant la copie
+            await telefeed_manager.flush()
+            
             # Créer l'archive avec les fichiers de configuration
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 for file in config_files:
-                    if os.path.exists(file):
-                        zipf.write(file, file)
+                    if not os.path.exists(file):
+                        continue
+                    if file == MAPPING_DB_FILE:
+                        # Base en WAL : archiver une copie cohérente plutôt que le seul fichier .db
+                        with tempfile.TemporaryDirectory() as tmp_dir:
+                            db_copy = os.path.join(tmp_dir, file)
+                            backup_database(file, db_copy)
+                            zipf.write(db_copy, file)
+                        continue
+                    zipf.write(file, file)
+                
+                # Fichiers de configuration par compte
+                for root, dirs, files in os.walk(ACCOUNTS_DIR):
+                    for file in files:
+                        if file.endswith(('.json', JOURNAL_SUFFIX)):
+                            file_path = os.path.join(root, file)
+                            zipf.write(file_path, file_path)
             
             # Envoyer l'archive
             await event.respond(
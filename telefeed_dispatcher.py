@@ -0,0 +1,275 @@
+"""
+Envoi TeleFeed vers les destinations : une file bornée et un worker par destination
+La réception d'un message ne fait que mettre les envois en file
+"""
+
+import time
+import asyncio
+import functools
+from collections import deque
+
+# Politiques quand la file d'une destination est pleine
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'coalesce')
+
+
+class LatencyStats:
+    """Latences (réception du message source → dernier envoi) sur les derniers messages"""
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.max_seconds = 0.0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def get_stats(self):
+        ordered = sorted(self.samples)
+
+        def percentile(fraction):
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 1)
+
+        return {
+            'count': self.count,
+            'avg_ms': round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0.0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(self.max_seconds * 1000, 1)
+        }
+
+
+class Delivery:
+    """Envois restants d'un message source, pour mesurer la latence jusqu'au dernier"""
+
+    __slots__ = ('received_at', 'remaining')
+
+    def __init__(self, received_at, remaining):
+        self.received_at = received_at
+        self.remaining = remaining
+
+
+class OutboundItem:
+    """Envoi en attente dans la file d'une destination"""
+
+    __slots__ = ('dest_id', 'send', 'delivery', 'key')
+
+    def __init__(self, dest_id, send, delivery, key=None):
+        self.dest_id = dest_id
+        self.send = send
+        self.delivery = delivery
+        self.key = key
+
+
+class BatchSend:
+    """Envoi regroupable : les envois consécutifs de même batch_key d'une file
+    partent en un seul appel send_batch([payload, ...]) (au plus max_batch)"""
+
+    __slots__ = ('batch_key', 'payload', 'send_batch', 'max_batch')
+
+    def __init__(self, batch_key, payload, send_batch, max_batch=100):
+        self.batch_key = batch_key
+        self.payload = payload
+        self.send_batch = send_batch
+        self.max_batch = max_batch
+
+    def accepts(self, other):
+        return isinstance(other, BatchSend) and other.batch_key == self.batch_key
+
+    async def __call__(self):
+        return await self.send_batch([self.payload])
+
+
+class DestinationQueue:
+    """File bornée et worker d'une destination"""
+
+    __slots__ = ('queue', 'put_lock', 'worker', 'pending_keys', 'sent', 'dropped', 'coalesced', 'batches')
+
+    def __init__(self, max_size):
+        self.queue = asyncio.Queue(max_size)
+        # Mise en file une par une (FIFO) : un envoi en attente de place ne peut pas être doublé
+        self.put_lock = asyncio.Lock()
+        self.worker = None
+        # Envois en file portant une clé de fusion {clé: OutboundItem}
+        self.pending_keys = {}
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.batches = 0
+
+
+class OutboundDispatcher:
+    """Envois d'un compte vers ses destinations
+
+    Chaque destination a sa file asyncio.Queue bornée (queue_size) et son
+    worker : les envois d'une destination partent dans l'ordre de réception des
+    messages source, une destination lente ou en FloodWait ne bloque que sa
+    propre file, et au plus max_concurrency envois sont en cours pour le compte.
+    Avec un scheduler (RateScheduler), chaque envoi attend son budget avant de
+    prendre une place de concurrence, et un envoi en FloodWait reste en tête de
+    sa file jusqu'à ce qu'il passe.
+
+    File pleine, selon overflow_policy :
+    - block : la réception attend qu'une place se libère (contre-pression)
+    - drop_oldest : l'envoi le plus ancien de la file est abandonné
+    - coalesce : un envoi portant la même clé (édition d'un même message) remplace
+      celui déjà en file, à tout moment ; sinon la réception attend comme avec block
+    """
+
+    def __init__(self, max_concurrency=8, queue_size=100, overflow_policy='block', scheduler=None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            print(f"⚠️ Politique de file inconnue '{overflow_policy}', utilisation de 'block'")
+            overflow_policy = 'block'
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_size = max(1, queue_size)
+        self.overflow_policy = overflow_policy
+        self.scheduler = scheduler
+        self._semaphore = None
+        self._destinations = {}
+        self.in_flight = 0
+        self.latency = LatencyStats()
+
+    def _destination(self, dest_id):
+        destination = self._destinations.get(dest_id)
+        if destination is None:
+            destination = self._destinations[dest_id] = DestinationQueue(self.queue_size)
+        if destination.worker is None or destination.worker.done():
+            destination.worker = asyncio.ensure_future(self._worker(destination))
+        return destination
+
+    async def submit(self, received_at, sends, key=None):
+        """Met en file les envois [(dest_id, fonction async sans argument)] d'un message source
+
+        received_at est l'instant time.monotonic() de réception du message source ;
+        key identifie les envois fusionnables (politique coalesce).
+        Ne retourne qu'une fois les envois en file, sans attendre le réseau.
+        """
+        if not sends:
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        delivery = Delivery(received_at, len(sends))
+        for dest_id, send in sends:
+            await self._enqueue(self._destination(dest_id), OutboundItem(dest_id, send, delivery, key))
+
+    async def _enqueue(self, destination, item):
+        async with destination.put_lock:
+            await self._put(destination, item)
+
+    async def _put(self, destination, item):
+        queue = destination.queue
+
+        if self.overflow_policy == 'coalesce' and item.key is not None:
+            queued = destination.pending_keys.get(item.key)
+            if queued is not None:
+                # Le dernier envoi remplace celui en file, qui garde sa place
+                queued.send = item.send
+                destination.coalesced += 1
+                self._finish(item)
+                return
+
+        if queue.full() and self.overflow_policy == 'drop_oldest':
+            oldest = queue.get_nowait()
+            queue.task_done()
+            self._forget_key(destination, oldest)
+            destination.dropped += 1
+            self._finish(oldest)
+            print(f"⚠️ File pleine pour {oldest.dest_id} : envoi le plus ancien abandonné")
+
+        await queue.put(item)
+        if item.key is not None:
+            destination.pending_keys[item.key] = item
+
+    def _forget_key(self, destination, item):
+        if item.key is not None and destination.pending_keys.get(item.key) is item:
+            del destination.pending_keys[item.key]
+
+    def _finish(self, item):
+        delivery = item.delivery
+        delivery.remaining -= 1
+        if delivery.remaining == 0:
+            self.latency.record(time.monotonic() - delivery.received_at)
+
+    def _take_batch(self, destination, item):
+        """Complète un BatchSend avec les envois compatibles qui le suivent dans la file
+
+        Retourne (envois du lot, premier envoi incompatible retiré de la file ou None).
+        """
+        items = [item]
+        if not isinstance(item.send, BatchSend):
+            return items, None
+
+        queue = destination.queue
+        while len(items) < item.send.max_batch and not queue.empty():
+            following = queue.get_nowait()
+            if not item.send.accepts(following.send):
+                return items, following
+            items.append(following)
+        return items, None
+
+    async def _worker(self, destination):
+        queue = destination.queue
+        carry = None
+        while True:
+            item = carry if carry is not None else await queue.get()
+            items, carry = self._take_batch(destination, item)
+            for batch_item in items:
+                self._forget_key(destination, batch_item)
+            try:
+                send = functools.partial(self._send, items)
+                if self.scheduler is not None:
+                    await self.scheduler.run(item.dest_id, send)
+                else:
+                    await send()
+                destination.sent += len(items)
+                if len(items) > 1:
+                    destination.batches += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Erreur redirection vers {item.dest_id}: {e}")
+            finally:
+                for batch_item in items:
+                    queue.task_done()
+                    self._finish(batch_item)
+
+    async def _send(self, items):
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                if len(items) == 1:
+                    return await items[0].send()
+                return await items[0].send.send_batch([batch_item.send.payload for batch_item in items])
+            finally:
+                self.in_flight -= 1
+
+    async def join(self):
+        """Attend que toutes les files soient vides"""
+        for destination in list(self._destinations.values()):
+            await destination.queue.join()
+
+    def close(self):
+        """Arrête les workers (les envois encore en file sont abandonnés)"""
+        for destination in self._destinations.values():
+            if destination.worker is not None:
+                destination.worker.cancel()
+                destination.worker = None
+
+    def queue_depths(self):
+        """Profondeur de la file de chaque destination"""
+        return {dest_id: destination.queue.qsize() for dest_id, destination in self._destinations.items()}
+
+    def get_stats(self):
+        stats = self.latency.get_stats()
+        stats['in_flight'] = self.in_flight
+        stats['max_concurrency'] = self.max_concurrency
+        stats['overflow_policy'] = self.overflow_policy
+        stats['queued'] = sum(self.queue_depths().values())
+        stats['dropped'] = sum(destination.dropped for destination in self._destinations.values())
+        stats['coalesced'] = sum(destination.coalesced for destination in self._destinations.values())
+        stats['batches'] = sum(destination.batches for destination in self._destinations.values())
+        return stats
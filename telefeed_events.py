@@ -0,0 +1,74 @@
+"""
+Événements Telethon des clients TeleFeed
+Builders filtrés sur les chats source, avec comptage des mises à jour écartées
+"""
+
+import time
+from collections import deque
+from telethon import events
+
+
+class FilterStats:
+    """Compteurs des mises à jour traitées / écartées par le filtre chats= d'un client
+
+    Les totaux sont conservés depuis le démarrage ; les débits sont calculés
+    sur les WINDOW dernières secondes (un compteur par seconde).
+    """
+
+    WINDOW = 60
+
+    def __init__(self):
+        self.processed = 0
+        self.discarded = 0
+        self._seconds = deque(maxlen=self.WINDOW)
+
+    def record(self, accepted):
+        second = int(time.monotonic())
+        if not self._seconds or self._seconds[-1][0] != second:
+            self._seconds.append([second, 0, 0])
+        if accepted:
+            self.processed += 1
+            self._seconds[-1][1] += 1
+        else:
+            self.discarded += 1
+            self._seconds[-1][2] += 1
+
+    def get_stats(self):
+        """Totaux et débits moyens (par seconde) sur la fenêtre glissante"""
+        now = int(time.monotonic())
+        recent = [bucket for bucket in self._seconds if now - bucket[0] < self.WINDOW]
+        span = max(1, now - recent[0][0] + 1) if recent else 1
+        return {
+            'processed': self.processed,
+            'discarded': self.discarded,
+            'processed_per_s': round(sum(bucket[1] for bucket in recent) / span, 2),
+            'discarded_per_s': round(sum(bucket[2] for bucket in recent) / span, 2)
+        }
+
+
+class CountingNewMessage(events.NewMessage):
+    """events.NewMessage qui comptabilise ses décisions de filtrage dans un FilterStats"""
+
+    def __init__(self, *args, stats=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+
+    def filter(self, event):
+        result = super().filter(event)
+        if self.stats is not None and self.resolved:
+            self.stats.record(bool(result))
+        return result
+
+
+class CountingMessageEdited(events.MessageEdited):
+    """events.MessageEdited qui comptabilise ses décisions de filtrage dans un FilterStats"""
+
+    def __init__(self, *args, stats=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+
+    def filter(self, event):
+        result = super().filter(event)
+        if self.stats is not None and self.resolved:
+            self.stats.record(bool(result))
+        return result
@@ -0,0 +1,139 @@
+"""
+Journal de mutations TeleFeed (append-only)
+Chaque modification est ajoutée en une ligne JSON à la fin d'un fichier .journal
+et rejouée au chargement par-dessus le dernier instantané
+"""
+
+import json
+import os
+
+JOURNAL_SUFFIX = '.journal'
+
+
+def set_record(path, value):
+    """Mutation : affecte value à la clé désignée par path"""
+    return {'op': 'set', 'path': list(path), 'value': value}
+
+
+def delete_record(path):
+    """Mutation : supprime la clé désignée par path (sans erreur si absente)"""
+    return {'op': 'del', 'path': list(path)}
+
+
+def apply_mutation(data, record):
+    """Applique une mutation à un dictionnaire
+
+    Les mutations sont idempotentes : rejouer un journal déjà inclus dans
+    l'instantané (arrêt entre l'écriture de l'instantané et la troncature du
+    journal) donne le même résultat.
+    """
+    path = record['path']
+    if not path:
+        raise ValueError("Mutation sans chemin")
+
+    parent = data
+    for key in path[:-1]:
+        child = parent.get(key)
+        if not isinstance(child, dict):
+            if record['op'] == 'del':
+                return
+            child = parent[key] = {}
+        parent = child
+
+    if record['op'] == 'set':
+        parent[path[-1]] = record['value']
+    elif record['op'] == 'del':
+        parent.pop(path[-1], None)
+    else:
+        raise ValueError(f"Mutation inconnue: {record['op']}")
+
+
+class MutationJournal:
+    """Fichier de mutations d'un store, une ligne JSON par modification
+
+    Un ajout n'écrit que la mutation elle-même ; l'instantané complet n'est
+    réécrit qu'à la compaction, après quoi la partie du journal qu'il contient
+    est supprimée (discard_prefix).
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, *records):
+        """Ajoute des mutations à la fin du journal et retourne le nombre d'octets écrits"""
+        payload = ''.join(
+            json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+            for record in records
+        ).encode('utf-8')
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(payload)
+        return len(payload)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def size(self):
+        """Taille du journal en octets (0 s'il n'existe pas)"""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def replay(self, data):
+        """Rejoue le journal sur data et retourne le nombre de mutations appliquées
+
+        Une dernière ligne incomplète (arrêt pendant un ajout) est ignorée puis
+        retirée du fichier pour que les ajouts suivants restent lisibles.
+        """
+        if not os.path.exists(self.path):
+            return 0
+
+        with open(self.path, 'rb') as f:
+            content = f.read()
+
+        applied = 0
+        offset = 0
+        valid_end = 0
+        while offset < len(content):
+            newline = content.find(b'\n', offset)
+            if newline == -1:
+                break  # Ligne incomplète en fin de fichier
+            line = content[offset:newline]
+            offset = newline + 1
+            valid_end = offset
+            if not line.strip():
+                continue
+            try:
+                apply_mutation(data, json.loads(line))
+                applied += 1
+            except Exception as e:
+                print(f"⚠️ Mutation illisible ignorée dans {self.path}: {e}")
+
+        if valid_end < len(content):
+            print(f"⚠️ Fin de journal incomplète ignorée dans {self.path}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_end)
+
+        return applied
+
+    def discard_prefix(self, offset):
+        """Supprime les offset premiers octets (déjà inclus dans l'instantané)"""
+        if offset <= 0 or not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            remainder = f.read()
+
+        if not remainder:
+            os.remove(self.path)
+            return
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(remainder)
+        os.replace(tmp_path, self.path)
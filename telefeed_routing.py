@@ -0,0 +1,176 @@
+"""
+Table de routage TeleFeed compilée : chat source → redirections actives
+Les filtres et transformations de chaque redirection sont préparés une seule fois
+"""
+
+import re
+
+REGEX_FLAGS = re.MULTILINE | re.DOTALL
+
+
+def compile_patterns(patterns):
+    """Prépare des motifs whitelist/blacklist : texte entre guillemets ou regex
+
+    Retourne (sous-chaînes, regex compilées) ; les regex invalides sont ignorées.
+    """
+    substrings = []
+    regexes = []
+    for pattern in patterns or []:
+        if not isinstance(pattern, str):
+            continue
+        if pattern.startswith('"') and pattern.endswith('"'):
+            substrings.append(pattern[1:-1])
+        else:
+            try:
+                regexes.append(re.compile(pattern, REGEX_FLAGS))
+            except re.error:
+                pass
+    return tuple(substrings), tuple(regexes)
+
+
+def matches_any(text, substrings, regexes):
+    return any(s in text for s in substrings) or any(r.search(text) for r in regexes)
+
+
+class CompiledPipeline:
+    """Filtres (blacklist, whitelist) et transformations (format, power, removeLines) d'une redirection"""
+
+    __slots__ = ('blacklist', 'whitelist', 'template', 'power_rules', 'remove_keywords')
+
+    def __init__(self, transformations=None, whitelist=None, blacklist=None):
+        self.blacklist = None
+        if blacklist and blacklist.get('active', False):
+            self.blacklist = compile_patterns(blacklist.get('patterns', []))
+
+        self.whitelist = None
+        if whitelist and whitelist.get('active', False) and whitelist.get('patterns'):
+            self.whitelist = compile_patterns(whitelist['patterns'])
+
+        transformations = transformations or {}
+
+        format_data = transformations.get('format')
+        self.template = format_data.get('template', '[[Message.Text]]') if format_data else None
+
+        # Règles power : ('regex', motif compilé, remplacement) ou ('text', ancien, nouveau)
+        self.power_rules = []
+        power_data = transformations.get('power')
+        for rule in (power_data.get('rules', []) if power_data else []):
+            if '=' in rule:
+                pattern, replacement = rule.split('=', 1)
+                try:
+                    self.power_rules.append(('regex', re.compile(pattern, REGEX_FLAGS), replacement))
+                except re.error:
+                    pass
+            elif '","' in rule:
+                rule = rule.strip('"')
+                if '","' in rule:
+                    old, new = rule.split('","', 1)
+                    self.power_rules.append(('text', old, new))
+
+        remove_lines_data = transformations.get('removeLines')
+        self.remove_keywords = tuple(remove_lines_data.get('keywords', [])) if remove_lines_data else ()
+
+    @property
+    def is_identity(self):
+        """Vrai si la redirection n'a ni filtre ni transformation (message transmis tel quel)"""
+        return (self.blacklist is None and self.whitelist is None and self.template is None
+                and not self.power_rules and not self.remove_keywords)
+
+    def accepts(self, text):
+        """Vérifie si le message doit être traité (whitelist/blacklist)"""
+        if self.blacklist is not None and matches_any(text, *self.blacklist):
+            return False
+        if self.whitelist is not None:
+            return matches_any(text, *self.whitelist)
+        return True
+
+    def transform(self, text):
+        """Applique les transformations sur le texte"""
+        if not text:
+            return text
+
+        if self.template is not None:
+            text = self.template.replace('[[Message.Text]]', text)
+
+        for kind, old, new in self.power_rules:
+            if kind == 'regex':
+                try:
+                    text = old.sub(new, text)
+                except (re.error, IndexError):
+                    pass
+            else:
+                text = text.replace(old, new)
+
+        if self.remove_keywords:
+            text = '\n'.join(
+                line for line in text.split('\n')
+                if not any(keyword in line for keyword in self.remove_keywords)
+            )
+
+        return text
+
+
+class Route:
+    """Redirection active compilée, telle que vue depuis un chat source"""
+
+    __slots__ = ('redirection_id', 'destinations', 'pipeline', 'settings')
+
+    def __init__(self, redirection_id, destinations, pipeline, settings):
+        self.redirection_id = redirection_id
+        self.destinations = destinations
+        self.pipeline = pipeline
+        self.settings = settings
+
+
+class RoutingTable:
+    """Index {chat source: (Route, ...)} d'un compte
+
+    Un message d'un chat sans redirection est écarté en une seule recherche
+    dans un dictionnaire. La table est immuable : elle est reconstruite puis
+    remplacée en une affectation à chaque modification des redirections.
+    """
+
+    __slots__ = ('routes', 'source_chats')
+
+    def __init__(self, redirections=None, transformations=None, whitelist=None, blacklist=None, settings=None):
+        transformations = transformations or {}
+        whitelist = whitelist or {}
+        blacklist = blacklist or {}
+        settings = settings or {}
+
+        routes = {}
+        for redirection_id, redirection in (redirections or {}).items():
+            if not redirection.get('active', True):
+                continue
+
+            route = Route(
+                redirection_id,
+                tuple(redirection.get('destinations', [])),
+                CompiledPipeline(
+                    transformations.get(redirection_id),
+                    whitelist.get(redirection_id),
+                    blacklist.get(redirection_id)
+                ),
+                settings.get(redirection_id, {})
+            )
+            for source in dict.fromkeys(redirection.get('sources', [])):
+                routes.setdefault(source, []).append(route)
+
+        self.routes = {source: tuple(source_routes) for source, source_routes in routes.items()}
+        self.source_chats = frozenset(self.routes)
+
+    def destination_chats(self):
+        """Destinations de toutes les routes (sans doublon)"""
+        destinations = {}
+        for source_routes in self.routes.values():
+            for route in source_routes:
+                destinations.update(dict.fromkeys(route.destinations))
+        return list(destinations)
+
+    def get(self, chat_id):
+        """Routes d'un chat source (tuple vide si le chat n'est pas une source)"""
+        return self.routes.get(chat_id, ())
+
+    def __len__(self):
+        return len(self.routes)
+
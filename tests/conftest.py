@@ -0,0 +1,54 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Modules du bot à la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClient:
+    """Client Telethon minimal : handlers enregistrés et messages envoyés"""
+
+    def __init__(self):
+        self.handlers = []
+        self.sent = []
+        self.next_id = 100
+
+    def add_event_handler(self, callback, event=None):
+        self.handlers.append((callback, event))
+
+    def remove_event_handler(self, callback, event=None):
+        self.handlers = [handler for handler in self.handlers if handler[0] is not callback]
+
+    def list_event_handlers(self):
+        return self.handlers
+
+    def handler(self, event_type):
+        """Callback enregistré pour un type d'événement (ex: 'CountingNewMessage')"""
+        return next(callback for callback, event in self.handlers if type(event).__name__ == event_type)
+
+    async def get_entity(self, chat_id):
+        return SimpleNamespace(id=chat_id, broadcast=False, megagroup=False)
+
+    async def send_message(self, entity, text, **kwargs):
+        self.next_id += 1
+        self.sent.append((entity.id, text))
+        return SimpleNamespace(id=self.next_id)
+
+
+def source_message(msg_id, chat_id, text):
+    """Nouveau message texte d'un chat source"""
+    return SimpleNamespace(id=msg_id, chat_id=chat_id, grouped_id=None, raw_text=text, text=text,
+                           media=None, reply_to_msg_id=None, message=SimpleNamespace(media=None))
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """TeleFeedManager neuf dont les fichiers sont écrits dans un répertoire temporaire"""
+    import telefeed_commands
+    monkeypatch.chdir(tmp_path)
+    manager = telefeed_commands.TeleFeedManager()
+    monkeypatch.setattr(telefeed_commands, '_telefeed_manager', manager)
+    return manager
@@ -0,0 +1,94 @@
+"""
+Tests des envois différés (DelayedDispatcher)
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import delayed_dispatch
+from delayed_dispatch import DelayedDispatcher
+
+SOURCE = -1005
+
+
+def source_event(msg_id):
+    return SimpleNamespace(chat_id=SOURCE, id=msg_id)
+
+
+async def ignore(record, events):
+    pass
+
+
+def fake_clock(monkeypatch, start=1000.0):
+    clock = [start]
+    monkeypatch.setattr(delayed_dispatch.time, 'time', lambda: clock[0])
+    return clock
+
+
+def test_spread_mode_spaces_a_burst_within_the_delay(tmp_path, monkeypatch):
+    clock = fake_clock(monkeypatch)
+    dispatcher = DelayedDispatcher(str(tmp_path / 'delayed.journal'), ignore, spread_slots=10)
+
+    dues = [dispatcher.schedule('r1', [source_event(i)], 60, spread=True) for i in range(5)]
+
+    assert [due - clock[0] for due in dues] == [6, 12, 18, 24, 30]
+
+
+def test_spread_mode_bounds_latency_under_sustained_traffic(tmp_path, monkeypatch):
+    clock = fake_clock(monkeypatch)
+    dispatcher = DelayedDispatcher(str(tmp_path / 'delayed.journal'), ignore, spread_slots=10)
+    delay = 60
+
+    # Un message par seconde pendant une heure : dix fois plus que les créneaux du délai
+    latencies = []
+    for msg_id in range(3600):
+        due = dispatcher.schedule('r1', [source_event(msg_id)], delay, spread=True)
+        latencies.append(due - clock[0])
+        clock[0] += 1
+        # Envois échus retirés comme le ferait la tâche
+        while dispatcher._next_delay() is not None and dispatcher._next_delay() <= 0:
+            dispatcher._remove(dispatcher._heap[0][2])
+
+    assert max(latencies) <= delay
+    assert len(dispatcher) <= delay + 1
+
+
+def test_send_interrupted_by_close_is_restored(tmp_path):
+    journal_path = str(tmp_path / 'delayed.journal')
+
+    async def run():
+        started = asyncio.Event()
+
+        async def never_finishes(record, events):
+            started.set()
+            await asyncio.Event().wait()
+
+        dispatcher = DelayedDispatcher(journal_path, never_finishes)
+        dispatcher.schedule('r1', [source_event(1)], 0.01)
+        await asyncio.wait_for(started.wait(), 1)
+        task = dispatcher._task
+        dispatcher.close()
+        await asyncio.gather(task, return_exceptions=True)
+        assert len(dispatcher) == 1
+
+    asyncio.run(run())
+    assert DelayedDispatcher(journal_path, ignore).load() == 1
+
+
+def test_completed_send_is_removed_from_the_journal(tmp_path):
+    journal_path = str(tmp_path / 'delayed.journal')
+
+    async def run():
+        sent = asyncio.Event()
+
+        async def on_due(record, events):
+            sent.set()
+
+        dispatcher = DelayedDispatcher(journal_path, on_due)
+        dispatcher.schedule('r1', [source_event(1)], 0.01)
+        await asyncio.wait_for(sent.wait(), 1)
+        await asyncio.sleep(0)
+        dispatcher.close()
+
+    asyncio.run(run())
+    assert DelayedDispatcher(journal_path, ignore).load() == 0
@@ -0,0 +1,67 @@
+"""
+Tests de la suppression des doublons (drop_duplicates, /settings duplicates)
+"""
+
+import asyncio
+
+from bot_handlers import BotHandlers
+from config import ADMIN_ID
+from conftest import FakeClient, source_message
+
+SOURCE = -1005
+DESTINATION = -9
+
+
+class FakeEvent:
+    """Commande reçue par le bot"""
+
+    def __init__(self, text):
+        self.raw_text = text
+        self.sender_id = ADMIN_ID
+        self.replies = []
+
+    async def reply(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def admin_handlers():
+    """BotHandlers sans bot ni gestionnaire d'utilisateurs (seules les commandes admin sont appelées)"""
+    return object.__new__(BotHandlers)
+
+
+def redirect_twice(manager, client):
+    async def run():
+        await manager.setup_redirection_handlers(client, '1')
+        handler = client.handler('CountingNewMessage')
+        await handler(source_message(1, SOURCE, 'Match ce soir'))
+        await handler(source_message(2, SOURCE, 'Match ce soir'))
+        await manager.drain_outbound(5)
+
+    asyncio.run(run())
+    return [text for _, text in client.sent]
+
+
+def test_duplicates_are_forwarded_by_default(manager):
+    client = FakeClient()
+    manager.clients['1'] = client
+    manager.add_redirection('1', 'r1', [SOURCE], [DESTINATION])
+
+    assert redirect_twice(manager, client) == ['Match ce soir', 'Match ce soir']
+
+
+def test_settings_command_enables_drop_duplicates(manager):
+    client = FakeClient()
+    manager.clients['1'] = client
+    manager.add_redirection('1', 'r1', [SOURCE], [DESTINATION])
+
+    handlers = admin_handlers()
+    command = FakeEvent('/settings duplicates r1 on')
+    asyncio.run(handlers.settings_handler(command))
+    assert command.replies[0].startswith('✅')
+    assert manager.settings.get('1')['r1']['drop_duplicates'] is True
+
+    assert redirect_twice(manager, client) == ['Match ce soir']
+
+    show = FakeEvent('/settings duplicates r1')
+    asyncio.run(handlers.settings_handler(show))
+    assert 'écartés' in show.replies[0]
@@ -0,0 +1,68 @@
+"""
+Tests de l'expiration des licences (UserManager et sweeper du cache de licences)
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+
+import user_manager
+from bot_handlers import BotHandlers
+from licence_cache import licence_now
+from user_manager import UserManager
+
+
+def active_user(expires):
+    return {
+        "status": "active",
+        "plan": "semaine",
+        "license_key": "ABCDEF12",
+        "start_time": licence_now().isoformat(),
+        "expires": expires.isoformat()
+    }
+
+
+def test_lapsed_licence_expires_at_startup_without_full_scan(tmp_path, monkeypatch):
+    now = licence_now()
+    users = {str(i): active_user(now + timedelta(days=30)) for i in range(1000)}
+    users['lapsing'] = active_user(now + timedelta(seconds=0.3))
+    users_file = tmp_path / 'users.json'
+    users_file.write_text(json.dumps(users))
+    monkeypatch.setattr(user_manager, 'USERS_FILE', str(users_file))
+
+    manager = UserManager()
+    expired_batches = []
+    expire_users = manager.expire_users
+
+    def record_expired(user_ids):
+        expired_batches.append(list(user_ids))
+        return expire_users(user_ids)
+
+    def full_scan(*args, **kwargs):
+        raise AssertionError("parcours de tous les utilisateurs")
+
+    monkeypatch.setattr(manager, 'expire_users', record_expired)
+    monkeypatch.setattr(manager, 'cleanup_expired_users', full_scan)
+    monkeypatch.setattr(manager.licence_cache, 'user_ids', full_scan)
+
+    async def run():
+        bot = SimpleNamespace(loop=asyncio.get_running_loop(), add_event_handler=lambda *args: None)
+        BotHandlers(bot, manager)
+        sweeper = manager._expiry_sweeper
+        assert sweeper is not None
+        assert manager.start_expiry_sweeper() is sweeper
+        try:
+            for _ in range(40):
+                await asyncio.sleep(0.05)
+                if expired_batches:
+                    break
+        finally:
+            sweeper.cancel()
+
+    asyncio.run(run())
+
+    assert expired_batches == [['lapsing']]
+    saved = json.loads(users_file.read_text())
+    assert saved['lapsing']['status'] == 'expired'
+    assert sum(1 for user in saved.values() if user['status'] == 'active') == 1000
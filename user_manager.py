@@ -1,33 +1,30 @@
-import json
+import asyncio
 import datetime
 import uuid
 from typing import Dict, Any, Tuple, Optional
 from config import USERS_FILE, PLANS
+from licence_cache import get_licence_cache, run_expiry_sweeper, licence_now, INVALID_EXPIRY
 
 class UserManager:
     """Gestionnaire des utilisateurs et licences"""
     
     def __init__(self):
-        self.users = self.load_users()
+        self.licence_cache = get_licence_cache(USERS_FILE)
+        self._expiry_sweeper = None
+    
+    @property
+    def users(self) -> Dict[str, Any]:
+        """Utilisateurs partagés via le cache de licences"""
+        return self.licence_cache.users
     
     def load_users(self) -> Dict[str, Any]:
-        """Charge les utilisateurs depuis le fichier JSON"""
-        try:
-            with open(USERS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-        except json.JSONDecodeError:
-            print(f"Erreur de lecture du fichier {USERS_FILE}, création d'un nouveau fichier")
-            return {}
+        """Recharge les utilisateurs depuis le fichier JSON"""
+        self.licence_cache.reload()
+        return self.users
     
-    def save_users(self) -> None:
+    def save_users(self, *user_ids: str) -> None:
         """Sauvegarde les utilisateurs dans le fichier JSON"""
-        try:
-            with open(USERS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Erreur lors de la sauvegarde : {e}")
+        self.licence_cache.save(*user_ids)
     
     def register_new_user(self, user_id: str) -> Dict[str, Any]:
         """Enregistre un nouvel utilisateur avec statut d'attente"""
@@ -41,7 +38,7 @@ class UserManager:
         }
         
         self.users[user_id] = user_data
-        self.save_users()
+        self.save_users(user_id)
         return user_data
     
     def activate_user(self, user_id: str, plan: str) -> Tuple[str, datetime.date]:
@@ -49,7 +46,7 @@ class UserManager:
         if plan not in PLANS:
             raise ValueError(f"Plan invalide. Plans disponibles : {', '.join(PLANS.keys())}")
         
-        now = datetime.datetime.utcnow()
+        now = licence_now()
         delta = datetime.timedelta(days=PLANS[plan]["duration_days"])
         expires = now + delta
         
@@ -66,7 +63,7 @@ class UserManager:
             "activated_at": now.isoformat()
         }
         
-        self.save_users()
+        self.save_users(user_id)
         return license_key, expires.date()
     
     def check_user_access(self, user_id: str) -> bool:
@@ -80,15 +77,12 @@ class UserManager:
         if user_data["status"] != "active":
             return False
         
-        # Vérification de la date d'expiration
-        if user_data["expires"] is None:
+        # Vérification de la date d'expiration (analysée par le cache)
+        expires_date = self.licence_cache.expiry(user_id)
+        if expires_date is None:
             return False
         
-        try:
-            expires_date = datetime.datetime.fromisoformat(user_data["expires"])
-            return expires_date > datetime.datetime.utcnow()
-        except (ValueError, TypeError):
-            return False
+        return expires_date > licence_now()
     
     def get_user_info(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Récupère les informations d'un utilisateur"""
@@ -110,31 +104,39 @@ class UserManager:
     
     def get_expiration_date(self, user_id: str) -> Optional[str]:
         """Retourne la date d'expiration d'un utilisateur"""
-        user_data = self.get_user_info(user_id)
-        if user_data and user_data.get("expires"):
-            try:
-                expires_date = datetime.datetime.fromisoformat(user_data["expires"])
-                return expires_date.strftime("%d/%m/%Y")
-            except (ValueError, TypeError):
-                return None
-        return None
+        expires_date = self.licence_cache.expiry(user_id)
+        if expires_date is None or expires_date is INVALID_EXPIRY:
+            return None
+        return expires_date.strftime("%d/%m/%Y")
     
     def cleanup_expired_users(self) -> int:
         """Nettoie les utilisateurs expirés (optionnel)"""
-        cleaned_count = 0
-        current_time = datetime.datetime.utcnow()
-        
-        for user_id, user_data in list(self.users.items()):
-            if user_data["status"] == "active" and user_data["expires"]:
-                try:
-                    expires_date = datetime.datetime.fromisoformat(user_data["expires"])
-                    if expires_date < current_time:
-                        self.users[user_id]["status"] = "expired"
-                        cleaned_count += 1
-                except (ValueError, TypeError):
-                    continue
+        self.licence_cache.expire_due()
+        return self.expire_users(self.licence_cache.user_ids("active", valid=False))
+    
+    def expire_users(self, user_ids) -> int:
+        """Passe au statut 'expired' les licences actives échues parmi user_ids"""
+        expired = []
+        for user_id in user_ids:
+            user_data = self.users.get(user_id)
+            if not user_data or user_data["status"] != "active":
+                continue
+            
+            expires_date = self.licence_cache.expiry(user_id)
+            if expires_date is None or expires_date is INVALID_EXPIRY:
+                continue
+            
+            user_data["status"] = "expired"
+            expired.append(user_id)
         
-        if cleaned_count > 0:
-            self.save_users()
+        if expired:
+            self.save_users(*expired)
         
-        return cleaned_count
+        return len(expired)
+    
+    def start_expiry_sweeper(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> asyncio.Task:
+        """Démarre (une seule fois) la tâche de fond qui expire les licences dès leur échéance"""
+        if self._expiry_sweeper is None or self._expiry_sweeper.done():
+            loop = loop or asyncio.get_running_loop()
+            self._expiry_sweeper = loop.create_task(run_expiry_sweeper(self.licence_cache, self.expire_users))
+        return self._expiry_sweeper